@@ -0,0 +1,173 @@
+"""
+离线音频处理工具 (批量转写 batch_transcribe.py 使用)。
+
+- load_audio(): 读取 16-bit PCM WAV (标准库 wave)，其他格式通过 ffmpeg 解码；统一为 16kHz 单声道 float32
+- frame_features(): 按帧计算能量 (dBFS) 与过零率，NumPy 向量化
+- EnergyVAD: 流式语音活动检测 (能量 + 过零率 + 自适应噪声底 + 挂起时间)
+- split_on_silence(): 按静音切分长音频，每段长度落在 [min_chunk, max_chunk] 内
+
+依赖 NumPy (pip install numpy)；实时识别主程序不需要。
+"""
+import wave
+import shutil
+import subprocess
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+
+
+def load_audio(path, sample_rate=SAMPLE_RATE):
+    """返回 float32 单声道采样 (范围 [-1, 1])"""
+    if path.lower().endswith(".wav"):
+        try:
+            with wave.open(path, "rb") as w:
+                if w.getsampwidth() == 2 and w.getcomptype() == "NONE":
+                    channels, rate = w.getnchannels(), w.getframerate()
+                    pcm = np.frombuffer(w.readframes(w.getnframes()), dtype="<i2")
+                    samples = pcm.reshape(-1, channels).mean(axis=1) / 32768.0
+                    return resample(samples.astype(np.float32), rate, sample_rate)
+        except wave.Error:
+            pass  # 非 PCM WAV (如 float/ADPCM)，交给 ffmpeg
+
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError(f"{path}: only 16-bit PCM WAV is supported without ffmpeg on PATH")
+    proc = subprocess.run([ffmpeg, "-nostdin", "-loglevel", "error", "-i", path,
+                           "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-"],
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed on {path}: {proc.stderr.decode(errors='replace').strip()}")
+    return np.frombuffer(proc.stdout, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def resample(samples, rate, target_rate):
+    """线性插值重采样 (语音识别对此精度足够)"""
+    if rate == target_rate or len(samples) == 0:
+        return samples
+    duration = len(samples) / rate
+    target_len = int(round(duration * target_rate))
+    positions = np.linspace(0, len(samples) - 1, target_len)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def to_pcm16(samples):
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def frame_features(samples, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS):
+    """返回 (energy_db, zcr)，每帧一个值；不足一帧的尾部丢弃"""
+    frame_len = sample_rate * frame_ms // 1000
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(frames * frames, axis=1) + 1e-12)
+    energy_db = 20.0 * np.log10(rms)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_len - 1)
+    return energy_db.astype(np.float32), zcr.astype(np.float32)
+
+
+class EnergyVAD:
+    """
+    帧级语音活动检测：
+    - 能量高于噪声底 margin_db 以上判为候选语音；噪声底取最近静音帧能量的慢速跟踪值
+    - 过零率过高 (> max_zcr) 的帧视为摩擦噪声/嘶声，除非能量明显更高
+    - 进入语音需连续 start_frames 帧，退出需静音持续 hangover_frames 帧，避免句中停顿被切断
+    """
+    def __init__(self, margin_db=12.0, floor_db=-60.0, max_zcr=0.35, start_frames=3, hangover_frames=15,
+                 floor_adapt=0.05):
+        self.margin_db = margin_db
+        self.noise_floor = floor_db
+        self.min_floor = floor_db
+        self.max_zcr = max_zcr
+        self.start_frames = start_frames
+        self.hangover_frames = hangover_frames
+        self.floor_adapt = floor_adapt
+        self.in_speech = False
+        self._run = 0
+
+    def classify(self, energy_db, zcr):
+        """逐帧判定，返回布尔数组 (该帧处于语音段内)"""
+        candidate = energy_db > self.noise_floor + self.margin_db
+        # 高过零率且能量不突出的帧更像噪声
+        candidate &= (zcr <= self.max_zcr) | (energy_db > self.noise_floor + 2 * self.margin_db)
+        out = np.zeros(len(energy_db), dtype=bool)
+        for i in range(len(energy_db)):
+            if not candidate[i]:
+                # 静音帧：慢速跟踪噪声底
+                self.noise_floor += self.floor_adapt * (max(energy_db[i], self.min_floor) - self.noise_floor)
+            if self.in_speech:
+                self._run = 0 if candidate[i] else self._run + 1
+                if self._run >= self.hangover_frames:
+                    self.in_speech = False
+                    self._run = 0
+            else:
+                self._run = self._run + 1 if candidate[i] else 0
+                if self._run >= self.start_frames:
+                    self.in_speech = True
+                    self._run = 0
+            out[i] = self.in_speech
+        return out
+
+
+def speech_regions(speech, min_silence_frames):
+    """布尔帧序列 -> 语音区间 [(start, end)]，间隔短于 min_silence_frames 的相邻区间合并"""
+    regions = []
+    n = len(speech)
+    i = 0
+    while i < n:
+        if speech[i]:
+            j = i
+            while j < n and speech[j]:
+                j += 1
+            if regions and i - regions[-1][1] < min_silence_frames:
+                regions[-1] = (regions[-1][0], j)
+            else:
+                regions.append((i, j))
+            i = j
+        else:
+            i += 1
+    return regions
+
+
+def split_on_silence(samples, sample_rate=SAMPLE_RATE, min_silence=0.5, min_chunk=3.0, max_chunk=20.0,
+                     frame_ms=FRAME_MS):
+    """
+    返回 [(start_sample, end_sample)]。相邻语音区间累积成块，块长达到 min_chunk 后、再加下一段会超过
+    max_chunk 时，在两段之间静音的中点切开；单段语音超过 max_chunk 时在能量最低的帧处强制切开。
+    长时间静音不输出。
+    """
+    energy_db, zcr = frame_features(samples, sample_rate, frame_ms)
+    if len(energy_db) == 0:
+        return []
+    vad = EnergyVAD(floor_db=float(np.percentile(energy_db, 10)))
+    regions = speech_regions(vad.classify(energy_db, zcr), max(1, int(min_silence * 1000 / frame_ms)))
+    frame_len = sample_rate * frame_ms // 1000
+    min_frames = int(min_chunk * 1000 / frame_ms)
+    max_frames = int(max_chunk * 1000 / frame_ms)
+    pad = max(1, int(0.2 * 1000 / frame_ms))  # 块两端各保留约 200ms 静音，避免切掉弱音节
+    n = len(energy_db)
+
+    chunks = []
+    chunk_start = chunk_end = None
+    for start, end in regions:
+        if chunk_start is None:
+            chunk_start, chunk_end = max(0, start - pad), end
+        elif end - chunk_start > max_frames and chunk_end - chunk_start >= min_frames:
+            cut = (chunk_end + start) // 2
+            chunks.append((chunk_start, min(cut, chunk_end + pad)))
+            chunk_start, chunk_end = max(cut, start - pad), end
+        else:
+            chunk_end = end
+        # 单段过长：在 [min, max] 窗口内能量最低处切开
+        while chunk_end - chunk_start > max_frames:
+            lo = chunk_start + min_frames
+            cut = lo + int(np.argmin(energy_db[lo:chunk_start + max_frames]))
+            chunks.append((chunk_start, cut))
+            chunk_start = cut
+    if chunk_start is not None:
+        chunks.append((chunk_start, min(n, chunk_end + pad)))
+    return [(s * frame_len, min(len(samples), e * frame_len)) for s, e in chunks if e > s]
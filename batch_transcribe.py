@@ -0,0 +1,269 @@
+"""
+离线批量转写 + 翻译 (不依赖浏览器，适合处理历史录音)。
+
+流程：解码音频 -> 按静音切块 -> 进程池并行识别 (本地识别后端) -> 翻译 (ITranslator，与实时模式同一条翻译链)
+-> 输出双语 SRT / WebVTT 字幕和文本转写。
+
+识别后端 (按需安装，模型文件需自行下载):
+    vosk      pip install vosk           batch.model_path 指向解压后的 Vosk 模型目录
+    whisper   pip install faster-whisper batch.model_path 为模型名 (如 "small") 或本地目录
+另需 NumPy；非 WAV 格式需要 PATH 中有 ffmpeg。
+
+用法:
+    python batch_transcribe.py recordings/*.wav --out-dir subtitles/
+    python batch_transcribe.py talk.mp3 --backend whisper --model small --workers 4
+    python batch_transcribe.py talk.wav --scaling          # 只测识别阶段在 1..N 个进程下的吞吐
+"""
+import os
+import sys
+import json
+import glob
+import time
+import logging
+import argparse
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger("BatchTranscribe")
+
+
+class RecognizerBackend:
+    """本地识别后端基类：输入一段 16kHz PCM16 音频，返回 [(start_s, end_s, text)] (相对该段起点)"""
+    name = ""
+    requires = ""  # 需要安装的 Python 包 (导入名)
+
+    def __init__(self, batch_cfg: dict, language: str):
+        self.batch_cfg = batch_cfg
+        self.language = language
+
+    def transcribe(self, pcm16: bytes, sample_rate: int):
+        raise NotImplementedError
+
+
+class VoskBackend(RecognizerBackend):
+    name = "vosk"
+    requires = "vosk"
+
+    def __init__(self, batch_cfg, language):
+        super().__init__(batch_cfg, language)
+        from vosk import Model, SetLogLevel
+        SetLogLevel(-1)
+        model_path = batch_cfg.get("model_path")
+        if not model_path or not os.path.isdir(model_path):
+            raise RuntimeError("batch.model_path must point to an unpacked Vosk model directory")
+        self.model = Model(model_path)
+
+    def transcribe(self, pcm16, sample_rate):
+        from vosk import KaldiRecognizer
+        rec = KaldiRecognizer(self.model, sample_rate)
+        rec.SetWords(True)
+        results = []
+        step = sample_rate  # 字节数，PCM16 下即每次送 0.5 秒
+        for pos in range(0, len(pcm16), step):
+            if rec.AcceptWaveform(pcm16[pos:pos + step]):
+                results.append(json.loads(rec.Result()))
+        results.append(json.loads(rec.FinalResult()))
+
+        segments = []
+        for res in results:
+            words = res.get("result") or []
+            text = res.get("text", "").strip()
+            if words and text:
+                segments.append((words[0]["start"], words[-1]["end"], text))
+        return segments
+
+
+class WhisperBackend(RecognizerBackend):
+    name = "whisper"
+    requires = "faster_whisper"
+
+    def __init__(self, batch_cfg, language):
+        super().__init__(batch_cfg, language)
+        from faster_whisper import WhisperModel
+        # 并行度由进程池提供，每个进程只用一个线程，避免超额订阅 CPU
+        self.model = WhisperModel(batch_cfg.get("model_path") or "small", device="cpu",
+                                  compute_type=batch_cfg.get("compute_type", "int8"), cpu_threads=1)
+
+    def transcribe(self, pcm16, sample_rate):
+        import numpy as np
+        samples = np.frombuffer(pcm16, dtype="<i2").astype(np.float32) / 32768.0
+        segments, _ = self.model.transcribe(samples, language=self.language.split("-")[0] or None,
+                                            vad_filter=False, beam_size=self.batch_cfg.get("beam_size", 1))
+        return [(seg.start, seg.end, seg.text.strip()) for seg in segments if seg.text.strip()]
+
+
+BACKENDS = {
+    VoskBackend.name: VoskBackend,
+    WhisperBackend.name: WhisperBackend,
+}
+
+# --- 进程池工作进程 ---
+_backend = None
+
+
+def _init_worker(backend_name, batch_cfg, language):
+    global _backend
+    _backend = BACKENDS[backend_name](batch_cfg, language)
+
+
+def _recognize(task):
+    """task: (file_index, offset_s, pcm16) -> (file_index, [(start, end, text)]，时间已换算为文件内绝对时间)"""
+    file_index, offset, pcm16 = task
+    from audio_utils import SAMPLE_RATE
+    segments = _backend.transcribe(pcm16, SAMPLE_RATE)
+    return file_index, [(offset + start, offset + end, text) for start, end, text in segments]
+
+
+def _warmup(_):
+    # 让每个工作进程先完成初始化 (加载模型)，吞吐测量不含模型加载时间
+    time.sleep(0.2)
+    return os.getpid()
+
+
+def prepare_chunks(paths, batch_cfg):
+    """解码并切块，返回 (tasks, 每个文件的音频时长)"""
+    from audio_utils import load_audio, split_on_silence, to_pcm16, SAMPLE_RATE
+    tasks = []
+    durations = []
+    for index, path in enumerate(paths):
+        samples = load_audio(path)
+        durations.append(len(samples) / SAMPLE_RATE)
+        chunks = split_on_silence(samples, SAMPLE_RATE,
+                                  min_silence=batch_cfg.get("min_silence", 0.5),
+                                  min_chunk=batch_cfg.get("min_chunk", 3.0),
+                                  max_chunk=batch_cfg.get("max_chunk", 20.0))
+        for start, end in chunks:
+            tasks.append((index, start / SAMPLE_RATE, to_pcm16(samples[start:end])))
+        logger.info(f"{path}: {durations[-1]:.1f}s audio, {len(chunks)} chunks")
+    return tasks, durations
+
+
+def recognize_all(tasks, num_files, backend_name, batch_cfg, language, workers):
+    """进程池并行识别，返回 (每个文件按时间排序的分段列表, 识别阶段墙钟时间)"""
+    results = [[] for _ in range(num_files)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(backend_name, batch_cfg, language)) as pool:
+        list(pool.map(_warmup, range(workers)))
+        start = time.perf_counter()
+        # 长的块先提交，减少尾部只有一个进程在忙的时间
+        ordered = sorted(tasks, key=lambda t: len(t[2]), reverse=True)
+        futures = [pool.submit(_recognize, task) for task in ordered]
+        for future in as_completed(futures):
+            file_index, segments = future.result()
+            results[file_index].extend(segments)
+        elapsed = time.perf_counter() - start
+    for segments in results:
+        segments.sort()
+    return results, elapsed
+
+
+def translate_segments(config, segments, workers):
+    """翻译所有分段 (去重后并发请求)，返回 {原文: 译文}"""
+    from translator_service import create_translator
+    translator = create_translator(config)
+    texts = sorted({text for _, _, text in segments})
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        translations = dict(zip(texts, pool.map(translator.translate, texts)))
+    return translations
+
+
+def write_outputs(path, segments, translations, out_dir, formats):
+    from subtitle_export import SubtitleExporter
+    stem = os.path.splitext(os.path.basename(path))[0]
+    base = os.path.join(out_dir or os.path.dirname(path), stem)
+    # SubtitleExporter 会对路径做 strftime，文件名中的 % 需要转义
+    exporter = SubtitleExporter({"path": base.replace("%", "%%"), "formats": formats, "fsync_every": 1000}, origin=0.0)
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        for start, end, text in segments:
+            translation = translations.get(text)
+            if translation and translation.startswith("[Err"):
+                translation = None
+            exporter.submit({"start": start, "end": end, "text": text, "translation": translation})
+            f.write(f"[{start:8.2f} - {end:8.2f}] {text}\n")
+            if translation:
+                f.write(f"{' ' * 22}{translation}\n")
+    exporter.close()
+    return base
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe and translate audio files offline with a local recognizer.")
+    parser.add_argument("inputs", nargs="+", help="audio files (glob patterns allowed)")
+    parser.add_argument("--config", default="config.json", help="config file (translation / glossary / batch sections)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="override batch.backend")
+    parser.add_argument("--model", help="override batch.model_path")
+    parser.add_argument("--workers", type=int, help="recognition processes (default: batch.workers or CPU count)")
+    parser.add_argument("--translate-workers", type=int, default=4, help="concurrent translation requests")
+    parser.add_argument("--no-translate", action="store_true")
+    parser.add_argument("--out-dir", help="output directory (default: next to each input)")
+    parser.add_argument("--formats", default="srt,vtt", help="subtitle formats, comma separated")
+    parser.add_argument("--scaling", action="store_true", help="only benchmark recognition throughput for 1..N workers")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    config = {}
+    try:
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        logger.warning(f"{args.config} not found, using defaults")
+    batch_cfg = dict(config.get("batch", {}))
+    if args.model:
+        batch_cfg["model_path"] = args.model
+    backend_name = args.backend or batch_cfg.get("backend", VoskBackend.name)
+    language = config.get("speech_recognition", {}).get("language", "en-US")
+    workers = args.workers or batch_cfg.get("workers") or os.cpu_count() or 1
+    # 工作进程初始化失败只会表现为 BrokenProcessPool，依赖缺失在主进程提前报出
+    backend_cls = BACKENDS[backend_name]
+    if backend_cls.requires and importlib.util.find_spec(backend_cls.requires) is None:
+        print(f"Backend '{backend_name}' requires the '{backend_cls.requires}' package", file=sys.stderr)
+        return 1
+
+    paths = sorted({p for pattern in args.inputs for p in (glob.glob(pattern) or [pattern])})
+    wall_start = time.perf_counter()
+    try:
+        start = time.perf_counter()
+        tasks, durations = prepare_chunks(paths, batch_cfg)
+        prepare_time = time.perf_counter() - start
+    except ImportError as e:
+        print(f"Missing dependency: {e} (pip install numpy)", file=sys.stderr)
+        return 1
+    audio_seconds = sum(durations)
+    print(f"audio:        {len(paths)} files, {audio_seconds:.1f}s, {len(tasks)} chunks (decode+split {prepare_time:.2f}s)")
+
+    if args.scaling:
+        counts = sorted({1, *[n for n in (2, 4, 8, 16, 32) if n < workers], workers})
+        baseline = None
+        print(f"{'workers':>8s} {'wall s':>8s} {'audio-s/s':>10s} {'speedup':>8s} {'efficiency':>10s}")
+        for n in counts:
+            _, elapsed = recognize_all(tasks, len(paths), backend_name, batch_cfg, language, n)
+            baseline = baseline or elapsed
+            speedup = baseline / elapsed
+            print(f"{n:8d} {elapsed:8.2f} {audio_seconds / elapsed:10.1f} {speedup:8.2f} {speedup / n:10.0%}")
+        return 0
+
+    results, recog_time = recognize_all(tasks, len(paths), backend_name, batch_cfg, language, workers)
+    print(f"recognition:  {recog_time:.2f}s with {workers} workers "
+          f"({audio_seconds / recog_time:.1f} audio-s/s, {audio_seconds / recog_time / workers:.1f} per core)")
+
+    translations = {}
+    if not args.no_translate:
+        all_segments = [seg for segments in results for seg in segments]
+        start = time.perf_counter()
+        translations = translate_segments(config, all_segments, args.translate_workers)
+        print(f"translation:  {len(translations)} unique segments in {time.perf_counter() - start:.2f}s")
+
+    formats = [fmt.strip() for fmt in args.formats.split(",") if fmt.strip()]
+    for path, segments in zip(paths, results):
+        base = write_outputs(path, segments, translations, args.out_dir, formats)
+        print(f"wrote:        {base}.{{txt,{','.join(formats)}}} ({len(segments)} segments)")
+    wall = time.perf_counter() - wall_start
+    print(f"end-to-end:   {wall:.2f}s, {audio_seconds / wall:.1f} audio-s per wall-s (includes model load)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+启动编排：把相互独立的启动步骤 (重型模块导入、翻译服务初始化、Chrome 启动、HTTP/WS 端口绑定、连接预热)
+放到线程池里按依赖关系并发执行，并记录每个阶段的起止时间。
+
+时间线以进程启动为零点，写入日志并导出为指标 startup_phase_end_seconds / startup_phase_duration_seconds{phase=...}；
+除步骤外还可以 mark() 记录里程碑 (如浏览器连接、首次 "listening")。
+"""
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import registry
+
+logger = logging.getLogger("Bootstrap")
+
+_phase_end = {}
+_phase_duration = {}
+
+
+def _record_metric(phase, end, duration=None):
+    gauge = _phase_end.get(phase)
+    if gauge is None:
+        gauge = _phase_end[phase] = registry.gauge(
+            "startup_phase_end_seconds", "Seconds from process start until the startup phase finished", phase=phase)
+    gauge.set(end)
+    if duration is not None:
+        gauge = _phase_duration.get(phase)
+        if gauge is None:
+            gauge = _phase_duration[phase] = registry.gauge(
+                "startup_phase_duration_seconds", "Duration of each startup step", phase=phase)
+        gauge.set(duration)
+
+
+class Bootstrap:
+    """
+    用法:
+        boot = Bootstrap(process_start)
+        boot.add("import_speech", lambda: importlib.import_module("speech_service"))
+        boot.add("speech", start_speech, deps=["import_speech"])
+        boot.run()             # 阻塞直到全部步骤结束，返回 {步骤名: 返回值}
+        boot.mark("listening") # 之后的里程碑
+    某一步失败时，依赖它的步骤被跳过，run() 抛出第一个异常。
+    """
+    def __init__(self, origin=None):
+        self.origin = origin if origin is not None else time.time()
+        self._steps = {}  # name -> (func, deps)
+        self._order = []
+        self.timeline = []  # (name, start, end, status)，相对 origin 的秒数
+        self._lock = threading.Lock()
+
+    def add(self, name, func, deps=()):
+        self._steps[name] = (func, tuple(deps))
+        self._order.append(name)
+
+    def _now(self):
+        return time.time() - self.origin
+
+    def _record(self, name, start, end, status):
+        with self._lock:
+            self.timeline.append((name, start, end, status))
+        if status == "ok":
+            _record_metric(name, end, end - start if start is not None else None)
+
+    def mark(self, name):
+        """记录一个里程碑，仅首次有效；返回本次是否记录"""
+        now = self._now()
+        with self._lock:
+            if any(entry[0] == name for entry in self.timeline):
+                return False
+            self.timeline.append((name, None, now, "ok"))
+        _record_metric(name, now)
+        logger.info(f"Startup milestone '{name}' at {now:.2f}s")
+        return True
+
+    def run(self):
+        results = {}
+        errors = {}
+        done = {name: threading.Event() for name in self._order}
+
+        def execute(name):
+            func, deps = self._steps[name]
+            try:
+                for dep in deps:
+                    done[dep].wait()
+                failed = [dep for dep in deps if dep in errors]
+                if failed:
+                    errors[name] = RuntimeError(f"skipped, dependency failed: {failed[0]}")
+                    self._record(name, None, self._now(), "skipped")
+                    return
+                start = self._now()
+                try:
+                    results[name] = func()
+                except Exception as e:
+                    errors[name] = e
+                    self._record(name, start, self._now(), "failed")
+                    logger.error(f"Startup step '{name}' failed: {e}", exc_info=True)
+                    return
+                self._record(name, start, self._now(), "ok")
+            finally:
+                done[name].set()
+
+        # 步骤数不多，每步一个线程等待依赖，线程池大小覆盖全部步骤以避免依赖等待占满线程
+        with ThreadPoolExecutor(max_workers=max(1, len(self._order)), thread_name_prefix="Bootstrap") as pool:
+            for name in self._order:
+                pool.submit(execute, name)
+        for name in self._order:
+            if name in errors:
+                raise errors[name]
+        return results
+
+    def report(self):
+        """把当前时间线输出到日志 (按结束时间排序)"""
+        with self._lock:
+            entries = sorted(self.timeline, key=lambda e: e[2])
+        lines = []
+        for name, start, end, status in entries:
+            if start is None:
+                lines.append(f"  {end:7.2f}s  {'':19s} * {name}" + ("" if status == "ok" else f" ({status})"))
+            else:
+                bar = f"{start:6.2f}s -> {end:6.2f}s"
+                lines.append(f"  {end:7.2f}s  {bar:19s}   {name} ({(end - start) * 1000:.0f}ms)"
+                             + ("" if status == "ok" else f" [{status}]"))
+        logger.info("Startup timeline (seconds since process start):\n" + "\n".join(lines))
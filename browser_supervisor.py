@@ -0,0 +1,228 @@
+"""
+Chrome 资源监督：定期采样浏览器进程树 (chromedriver 及其全部子进程) 的内存与 CPU，
+超出预算时在安静时刻 (句间静音 / 页面 VAD 暂停) 回收浏览器，长时间运行的内存占用保持有界。
+
+- 采样来源：Linux 读取 /proc (stat + smaps_rollup)，其他平台在安装了 psutil 时使用 psutil，否则不启用
+- 内存预算以 PSS 计 (多进程共享页按比例分摊，比各进程 RSS 直接相加更接近真实占用)，不可用时退回 RSS
+- CPU 预算要求持续超标 cpu_window 秒，短暂峰值 (页面加载) 不触发
+- 超标后等待安静时刻再回收，最多推迟 max_defer 秒，避免一直有人说话时永远无法回收
+"""
+import os
+import time
+import logging
+import threading
+
+from metrics import registry
+
+logger = logging.getLogger("BrowserSupervisor")
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+_memory_bytes = {
+    kind: registry.gauge("browser_memory_bytes", "Memory of the browser process tree", kind=kind)
+    for kind in ("rss", "pss")
+}
+_cpu_percent = registry.gauge("browser_cpu_percent", "CPU usage of the browser process tree (100 = one core)")
+_process_count = registry.gauge("browser_processes", "Processes in the browser process tree")
+_uptime = registry.gauge("browser_uptime_seconds", "Seconds since the browser was (re)launched")
+_recycles = {
+    reason: registry.counter("browser_recycles_total", "Browser recycles triggered by the resource supervisor", reason=reason)
+    for reason in ("memory", "cpu", "uptime")
+}
+
+_PROC = "/proc"
+_CLK_TCK = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _read_stat(pid):
+    """返回 (ppid, cpu_seconds, rss_bytes)；进程已退出时返回 None"""
+    try:
+        with open(f"{_PROC}/{pid}/stat", "rb") as f:
+            data = f.read().decode("ascii", "replace")
+    except OSError:
+        return None
+    # 进程名可能含空格和括号，从最后一个 ")" 之后开始按字段切分
+    fields = data[data.rfind(")") + 2:].split()
+    ppid = int(fields[1])
+    cpu = (int(fields[11]) + int(fields[12])) / _CLK_TCK  # utime + stime
+    rss = int(fields[21]) * _PAGE_SIZE
+    return ppid, cpu, rss
+
+
+def _read_pss(pid):
+    try:
+        with open(f"{_PROC}/{pid}/smaps_rollup", "rb") as f:
+            for line in f:
+                if line.startswith(b"Pss:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def sample_tree(root_pid):
+    """
+    返回 {"processes", "rss", "pss", "cpu_seconds"}；pss 不可用时为 None。
+    进程树按 ppid 关系从 root_pid 向下收集，每次采样扫描一遍 /proc (进程数通常只有几百个)。
+    """
+    if os.path.isdir(_PROC):
+        stats = {}
+        children = {}
+        for name in os.listdir(_PROC):
+            if not name.isdigit():
+                continue
+            stat = _read_stat(int(name))
+            if stat is not None:
+                stats[int(name)] = stat
+                children.setdefault(stat[0], []).append(int(name))
+        if root_pid not in stats:
+            return None
+        tree = []
+        pending = [root_pid]
+        while pending:
+            pid = pending.pop()
+            tree.append(pid)
+            pending.extend(children.get(pid, ()))
+        pss_values = [_read_pss(pid) for pid in tree]
+        return {
+            "processes": len(tree),
+            "rss": sum(stats[pid][2] for pid in tree),
+            "pss": sum(pss_values) if None not in pss_values else None,
+            "cpu_seconds": sum(stats[pid][1] for pid in tree),
+        }
+    if psutil is not None:
+        try:
+            root = psutil.Process(root_pid)
+            procs = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return None
+        rss = cpu = 0.0
+        for proc in procs:
+            try:
+                rss += proc.memory_info().rss
+                times = proc.cpu_times()
+                cpu += times.user + times.system
+            except psutil.Error:
+                continue
+        return {"processes": len(procs), "rss": int(rss), "pss": None, "cpu_seconds": cpu}
+    return None
+
+
+def supported():
+    return os.path.isdir(_PROC) or psutil is not None
+
+
+class BrowserSupervisor:
+    """
+    后台线程：每 interval 秒采样一次，超出预算时在安静时刻调用 recycle(reason)。
+    get_root_pid() 返回当前浏览器进程树的根 (chromedriver) PID，浏览器未运行时返回 None；
+    is_quiet() 由语音服务根据 WS 识别流判断当前是否处于句间静音。
+    """
+    def __init__(self, cfg: dict, get_root_pid, is_quiet, recycle):
+        self.interval = cfg.get("interval", 5.0)
+        self.max_memory = cfg.get("max_memory_mb", 1500) * 1024 * 1024
+        self.max_cpu_percent = cfg.get("max_cpu_percent", 150)
+        self.cpu_window = cfg.get("cpu_window", 60.0)
+        self.max_uptime = cfg.get("max_uptime_hours", 12) * 3600
+        self.max_defer = cfg.get("max_defer", 300.0)
+        self.log_interval = cfg.get("log_interval", 300.0)
+        self.get_root_pid = get_root_pid
+        self.is_quiet = is_quiet
+        self.recycle = recycle
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._recycling = False  # 已请求回收、浏览器尚未重新启动
+        self._reset()
+
+    def _reset(self):
+        self._launched_at = time.monotonic()
+        self._last_cpu = None  # (monotonic, cpu_seconds)
+        self._cpu_over_since = None
+        self._pending_reason = None
+        self._pending_since = None
+        self._last_log = 0.0
+
+    def notify_relaunched(self):
+        """浏览器 (重新) 启动后调用，重置运行时长与 CPU 基线"""
+        self._reset()
+        self._recycling = False
+
+    def start(self):
+        if not supported():
+            logger.warning("Browser resource supervisor needs /proc or psutil, disabled")
+            return
+        self._thread = threading.Thread(target=self._loop, name="BrowserSupervisor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._tick()
+            except Exception as e:
+                logger.error(f"Browser supervisor error: {e}", exc_info=True)
+
+    def _tick(self):
+        root_pid = self.get_root_pid()
+        if root_pid is None or self._recycling:
+            return
+        sample = sample_tree(root_pid)
+        if sample is None:
+            return
+        now = time.monotonic()
+        memory = sample["pss"] if sample["pss"] is not None else sample["rss"]
+        _memory_bytes["rss"].set(sample["rss"])
+        if sample["pss"] is not None:
+            _memory_bytes["pss"].set(sample["pss"])
+        _process_count.set(sample["processes"])
+        uptime = now - self._launched_at
+        _uptime.set(uptime)
+
+        cpu_percent = None
+        if self._last_cpu is not None and now > self._last_cpu[0]:
+            cpu_percent = 100.0 * (sample["cpu_seconds"] - self._last_cpu[1]) / (now - self._last_cpu[0])
+            _cpu_percent.set(cpu_percent)
+        self._last_cpu = (now, sample["cpu_seconds"])
+
+        if now - self._last_log >= self.log_interval:
+            self._last_log = now
+            logger.info(f"Browser resources: {sample['processes']} processes, "
+                        f"{memory / 1048576:.0f}MB {'PSS' if sample['pss'] is not None else 'RSS'}, "
+                        f"CPU {cpu_percent or 0:.0f}%, up {uptime / 3600:.1f}h", extra={"category": "resource"})
+
+        reason = self._over_budget(now, memory, cpu_percent, uptime)
+        if reason and self._pending_reason is None:
+            self._pending_reason, self._pending_since = reason, now
+            logger.info(f"Browser over {reason} budget, recycling at the next quiet moment")
+        if self._pending_reason is None:
+            return
+        deferred = now - self._pending_since
+        if self.is_quiet() or deferred >= self.max_defer:
+            reason = self._pending_reason
+            logger.warning(f"Recycling browser ({reason}, memory {memory / 1048576:.0f}MB, "
+                           f"deferred {deferred:.0f}s{'' if deferred < self.max_defer else ', forced'})")
+            _recycles[reason].inc()
+            self._recycling = True
+            self.recycle(reason)
+
+    def _over_budget(self, now, memory, cpu_percent, uptime):
+        if self.max_memory and memory > self.max_memory:
+            return "memory"
+        if self.max_cpu_percent and cpu_percent is not None:
+            if cpu_percent > self.max_cpu_percent:
+                if self._cpu_over_since is None:
+                    self._cpu_over_since = now
+                elif now - self._cpu_over_since >= self.cpu_window:
+                    return "cpu"
+            else:
+                self._cpu_over_since = None
+        if self.max_uptime and uptime > self.max_uptime:
+            return "uptime"
+        return None
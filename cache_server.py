@@ -0,0 +1,142 @@
+"""
+局域网共享翻译缓存服务 (多台悬浮窗实例共用，避免整个机群重复翻译同样的句子)。
+
+协议：TCP 上的 JSON 行，请求与响应一一对应且按顺序返回，客户端可以连续发送多条请求后再依次读取 (流水线)。
+    {"op": "auth", "token": "..."}               -> {"ok": true}；令牌错误时返回 {"error": "unauthorized"} 并断开
+    {"op": "get", "key": "..."}                  -> {"value": "..."} 或 {"value": null}
+    {"op": "set", "key": "...", "value": "..."}  -> {"ok": true}
+    {"op": "stats"}                              -> {"entries": N, "hits": N, "misses": N, "sets": N}
+存储为内存 LRU，条目数超过上限时淘汰最久未使用的条目；不做持久化，重启后由各客户端重新填充。
+
+信任边界：各实例会直接显示从缓存读回的译文，能写入缓存的人就能往所有悬浮窗里注入字幕。
+监听局域网地址时务必设置共享令牌 (--token 或环境变量 CACHE_SERVER_TOKEN，与各实例 shared_cache.token 相同)，
+每条连接必须先以 auth 请求通过校验才能读写。令牌只防止网络内其他主机误用/注入，连接本身不加密，
+不要把端口暴露到不可信网络。
+
+用法:
+    CACHE_SERVER_TOKEN=<随机字符串> python cache_server.py --host 0.0.0.0 --port 9110 --max-entries 500000
+"""
+import os
+import sys
+import hmac
+import json
+import asyncio
+import logging
+import argparse
+from collections import OrderedDict
+
+logger = logging.getLogger("CacheServer")
+
+MAX_LINE = 64 * 1024
+
+
+class LRUStore:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self.hits = self.misses = self.sets = 0
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        self.sets += 1
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def stats(self):
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses, "sets": self.sets}
+
+
+def handle_request(store, msg):
+    op = msg.get("op")
+    if op == "get":
+        return {"value": store.get(msg["key"])}
+    if op == "set":
+        store.set(msg["key"], msg["value"])
+        return {"ok": True}
+    if op == "stats":
+        return store.stats()
+    return {"error": f"unknown op {op!r}"}
+
+
+def check_auth(token, msg):
+    """连接上的第一条请求：未配置令牌时任何请求都放行"""
+    if not token:
+        return True
+    return msg.get("op") == "auth" and hmac.compare_digest(str(msg.get("token", "")), token)
+
+
+async def _serve_client(store, token, reader, writer):
+    peer = writer.get_extra_info("peername")
+    logger.info(f"Client connected: {peer}")
+    authenticated = not token
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                msg = json.loads(line)
+                if not authenticated:
+                    if not check_auth(token, msg):
+                        logger.warning(f"Client {peer} rejected: missing or invalid token")
+                        writer.write(b'{"error": "unauthorized"}\n')
+                        await writer.drain()
+                        break
+                    authenticated = True
+                    response = {"ok": True}
+                elif msg.get("op") == "auth":
+                    response = {"ok": True}
+                else:
+                    response = handle_request(store, msg)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                response = {"error": str(e)}
+            writer.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+            # 写缓冲未超过高水位时 drain 立即返回，流水线请求不会逐条等待
+            await writer.drain()
+    except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+        logger.warning(f"Client {peer} dropped: {e}")
+    finally:
+        writer.close()
+        logger.info(f"Client disconnected: {peer}")
+
+
+async def serve(host, port, max_entries, token=""):
+    store = LRUStore(max_entries)
+    server = await asyncio.start_server(lambda r, w: _serve_client(store, token, r, w), host, port, limit=MAX_LINE)
+    addrs = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+    logger.info(f"Cache server listening on {addrs} (max {max_entries} entries, "
+                f"{'token required' if token else 'no authentication'})")
+    if not token and host not in ("127.0.0.1", "localhost", "::1"):
+        logger.warning("No token set: any host that can reach this port can write subtitles shown by every client")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared translation cache server")
+    parser.add_argument("--host", default="127.0.0.1", help="bind address (0.0.0.0 for the whole LAN)")
+    parser.add_argument("--port", type=int, default=9110)
+    parser.add_argument("--max-entries", type=int, default=500000)
+    parser.add_argument("--token", default=os.environ.get("CACHE_SERVER_TOKEN", ""),
+                        help="shared secret clients must send first (default: $CACHE_SERVER_TOKEN)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_entries, args.token))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import os
+import json
+import time
+import logging
+
+logger = logging.getLogger("Capture")
+
+
+class EventRecorder:
+    """
+    将浏览器发来的识别事件流录制为 JSONL，供 replay_bench.py 离线回放。
+    每行一条事件：{"t": WS 接收时间(秒), "text": ..., "is_final": ..., "ts": 浏览器事件时间(秒), ...}
+    在 WS 事件循环线程中调用，写入走文件缓冲，按条数批量 flush。
+    """
+    def __init__(self, path, flush_every=20):
+        self.path = time.strftime(path)
+        self.flush_every = flush_every
+        self._pending = 0
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "w", encoding="utf-8")
+        logger.info(f"Recording speech events to {self.path}")
+
+    def record(self, data, recv_time=None):
+        if self._file is None:
+            return
+        event = {"t": recv_time if recv_time is not None else time.time()}
+        for key, value in data.items():
+            # 浏览器时间戳为毫秒，统一转换为秒
+            event[key] = value / 1000.0 if key == "ts" else value
+        self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._pending += 1
+        if self._pending >= self.flush_every or event.get("is_final"):
+            self._file.flush()
+            self._pending = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def load_capture(path):
+    """读取录制文件，返回按时间排序的事件列表 (事件时间优先使用浏览器时间戳)"""
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                # 进程崩溃时最后一行可能不完整，跳过即可
+                logger.warning(f"{path}:{line_no}: skipping malformed line")
+                continue
+            event.setdefault("ts", event.get("t"))
+            events.append(event)
+    events.sort(key=lambda e: e["ts"])
+    return events
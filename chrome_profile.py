@@ -0,0 +1,210 @@
+"""
+临时 Chrome 用户目录：每次启动从预先初始化的模板复制一份到内存盘 (Linux 为 /dev/shm)，退出时删除。
+
+持久化的 chrome_data 目录会不断累积缓存、历史记录和崩溃状态，拖慢启动且偶尔损坏；
+改为模板 + 临时副本后，每次启动都是同样干净的最小目录，多个实例各用各的副本，互不抢占目录锁。
+
+- 模板目录 (默认 chrome_profile_template/)：不存在时自动生成最小骨架 (跳过首次运行引导)；
+  执行 `python chrome_profile.py --init-template` 可让 Chrome 真正初始化一次，再清除缓存类目录后保存
+- 麦克风权限：复制时写入 Default/Preferences，对识别页面的来源预先授予
+- 崩溃后遗留的副本：下次启动时按目录名中的 PID 判断原进程是否存活，已退出的删除
+
+用法:
+    python chrome_profile.py --init-template     # 用 Chrome 初始化模板 (需要 selenium 与 Chrome)
+    python chrome_profile.py --bench 5           # 比较持久目录与临时副本的冷启动耗时
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+
+logger = logging.getLogger("ChromeProfile")
+
+PREFIX = "speech-chrome-"
+# 这些目录只是缓存或运行时状态，不放进模板
+_PRUNE = ("Cache", "Code Cache", "GPUCache", "ShaderCache", "GrShaderCache", "GraphiteDawnCache", "DawnCache",
+          "Crashpad", "Crash Reports", "blob_storage", "Service Worker", "Session Storage", "Sessions",
+          "BrowserMetrics", "optimization_guide_model_store", "component_crx_cache", "Safe Browsing",
+          "SingletonLock", "SingletonSocket", "SingletonCookie", "DevToolsActivePort")
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True  # 存在但无权限，或平台不支持探测：保守地视为存活
+    return True
+
+
+def _default_base_dir():
+    # /dev/shm 为 tmpfs：启动时 Chrome 大量小文件读写不落盘
+    shm = "/dev/shm"
+    if os.path.isdir(shm) and os.access(shm, os.W_OK):
+        return shm
+    return tempfile.gettempdir()
+
+
+def _write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+class ChromeProfileManager:
+    def __init__(self, cfg: dict):
+        self.template_dir = os.path.abspath(cfg.get("template_dir", "chrome_profile_template"))
+        self.base_dir = cfg.get("tmp_dir") or _default_base_dir()
+        self._active = set()
+        self._lock = threading.Lock()
+        atexit.register(self.cleanup_all)
+
+    def ensure_template(self):
+        """模板不存在时生成最小骨架：Local State + 首次运行标记 + Default/Preferences"""
+        default_dir = os.path.join(self.template_dir, "Default")
+        if os.path.isfile(os.path.join(default_dir, "Preferences")):
+            return
+        os.makedirs(default_dir, exist_ok=True)
+        open(os.path.join(self.template_dir, "First Run"), "w").close()
+        _write_json(os.path.join(self.template_dir, "Local State"), {
+            "browser": {"has_seen_welcome_page": True},
+            "user_experience_metrics": {"reporting_enabled": False},
+        })
+        _write_json(os.path.join(default_dir, "Preferences"), {
+            "browser": {"has_seen_welcome_page": True, "check_default_browser": False},
+            "profile": {"exit_type": "Normal", "exited_cleanly": True},
+            "session": {"restore_on_startup": 5},
+        })
+        logger.info(f"Created minimal Chrome profile template at {self.template_dir}")
+
+    def cleanup_stale(self):
+        """删除此前崩溃的进程遗留的副本 (目录名中的 PID 已不存在)"""
+        try:
+            names = os.listdir(self.base_dir)
+        except OSError:
+            return
+        for name in names:
+            if not name.startswith(PREFIX):
+                continue
+            try:
+                pid = int(name[len(PREFIX):].split("-", 1)[0])
+            except ValueError:
+                continue
+            if not _pid_alive(pid):
+                shutil.rmtree(os.path.join(self.base_dir, name), ignore_errors=True)
+                logger.info(f"Removed stale Chrome profile {name}")
+
+    def create(self, mic_origins=()):
+        """复制模板到内存盘，返回副本路径；mic_origins 中的来源预先授予麦克风权限"""
+        start = time.perf_counter()
+        self.ensure_template()
+        path = tempfile.mkdtemp(prefix=f"{PREFIX}{os.getpid()}-", dir=self.base_dir)
+        shutil.copytree(self.template_dir, path, dirs_exist_ok=True)
+        prefs_path = os.path.join(path, "Default", "Preferences")
+        try:
+            with open(prefs_path, "r", encoding="utf-8") as f:
+                prefs = json.load(f)
+        except (OSError, ValueError):
+            prefs = {}
+        # 模板由 Chrome 初始化时会带上一次的退出状态，统一标记为正常退出，避免出现“恢复页面”提示
+        prefs.setdefault("profile", {}).update({"exit_type": "Normal", "exited_cleanly": True})
+        exceptions = prefs["profile"].setdefault("content_settings", {}).setdefault("exceptions", {})
+        mic = exceptions.setdefault("media_stream_mic", {})
+        for origin in mic_origins:
+            mic[f"{origin},*"] = {"last_modified": "0", "setting": 1}
+        os.makedirs(os.path.dirname(prefs_path), exist_ok=True)
+        _write_json(prefs_path, prefs)
+        with self._lock:
+            self._active.add(path)
+        logger.info(f"Chrome profile cloned to {path} in {(time.perf_counter() - start) * 1000:.1f}ms")
+        return path
+
+    def release(self, path):
+        with self._lock:
+            self._active.discard(path)
+        shutil.rmtree(path, ignore_errors=True)
+
+    def cleanup_all(self):
+        with self._lock:
+            paths, self._active = list(self._active), set()
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
+
+    def save_template(self, profile_dir):
+        """把 Chrome 初始化过的目录去掉缓存类内容后保存为模板"""
+        tmp = self.template_dir + ".new"
+        shutil.rmtree(tmp, ignore_errors=True)
+        shutil.copytree(profile_dir, tmp, ignore=shutil.ignore_patterns(*_PRUNE))
+        shutil.rmtree(self.template_dir, ignore_errors=True)
+        os.replace(tmp, self.template_dir)
+
+
+def _launch(config, profile_dir):
+    """启动一次 Chrome 打开空白页，返回 (driver, 耗时秒)"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    options = Options()
+    for arg in ("--no-sandbox", "--disable-gpu", "--no-first-run", "--disable-extensions",
+                "--remote-debugging-port=0", "--headless=new", f"--user-data-dir={profile_dir}"):
+        options.add_argument(arg)
+    binary_path = config.get("chrome", {}).get("binary_path", "")
+    if os.path.exists(binary_path):
+        options.binary_location = binary_path
+    start = time.perf_counter()
+    driver = webdriver.Chrome(options=options)
+    driver.get("about:blank")
+    return driver, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the Chrome profile template used by the speech worker")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--init-template", action="store_true", help="let Chrome initialize the template once")
+    parser.add_argument("--bench", type=int, metavar="N", help="compare N cold launches: persistent dir vs tmpfs clone")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(name)s - %(levelname)s - %(message)s")
+
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    manager = ChromeProfileManager(config.get("chrome", {}).get("profile", {}))
+
+    if args.init_template:
+        manager.ensure_template()
+        work = manager.create()
+        driver, elapsed = _launch(config, work)
+        driver.quit()
+        manager.save_template(work)
+        manager.release(work)
+        print(f"template initialized at {manager.template_dir} (first launch {elapsed:.2f}s)")
+    if args.bench:
+        persistent = os.path.abspath("chrome_data")
+        results = {"persistent": [], "ephemeral": []}
+        for _ in range(args.bench):
+            driver, elapsed = _launch(config, persistent)
+            driver.quit()
+            results["persistent"].append(elapsed)
+            start = time.perf_counter()
+            work = manager.create()
+            clone = time.perf_counter() - start
+            driver, elapsed = _launch(config, work)
+            driver.quit()
+            manager.release(work)
+            results["ephemeral"].append(clone + elapsed)
+        for name, times in results.items():
+            times.sort()
+            print(f"{name:10s} median {times[len(times) // 2]:.2f}s  min {times[0]:.2f}s  max {times[-1]:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""
+config.json 热更新：后台线程按修改时间轮询配置文件 (与术语表热更新同样的方式，不依赖文件系统通知)，
+解析成功后按顶层分区比较新旧配置，只把发生变化的分区交给回调，由各组件在最小范围内应用。
+解析失败 (编辑器写到一半、JSON 语法错误) 时保留当前配置，等待文件再次修改。
+"""
+import os
+import json
+import time
+import logging
+import threading
+
+from metrics import registry
+
+logger = logging.getLogger("ConfigWatcher")
+
+_config_reloads = {
+    result: registry.counter("config_reloads_total", "config.json reload attempts by result", result=result)
+    for result in ("applied", "error")
+}
+_apply_seconds = registry.histogram("config_apply_seconds", "Time to apply a changed config.json",
+                                    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+
+
+def changed_sections(old: dict, new: dict) -> set:
+    """返回新旧配置中内容不同的顶层分区名"""
+    return {key for key in set(old) | set(new) if old.get(key) != new.get(key)}
+
+
+class ConfigWatcher:
+    def __init__(self, path, config: dict, on_change, interval=1.0):
+        """
+        :param config: 当前生效的配置 (作为第一次比较的基准)
+        :param on_change: 回调 (new_config, changed_sections)，在监视线程中调用
+        """
+        self.path = path
+        self.config = config
+        self.on_change = on_change
+        self.interval = interval
+        self._mtime = self._stat()
+        self._stop_event = threading.Event()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def start(self):
+        if self.interval and self.interval > 0:
+            threading.Thread(target=self._watch, name="ConfigWatcher", daemon=True).start()
+            logger.info(f"Watching {self.path} for changes (every {self.interval}s)")
+
+    def stop(self):
+        self._stop_event.set()
+
+    def check(self):
+        """文件有变化时重新加载并应用；返回是否应用了新配置"""
+        mtime = self._stat()
+        if mtime is None or mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                new_config = json.load(f)
+        except (OSError, ValueError) as e:
+            _config_reloads["error"].inc()
+            logger.error(f"Ignoring invalid {self.path}: {e}")
+            return False
+        sections = changed_sections(self.config, new_config)
+        if not sections:
+            return False
+        start = time.perf_counter()
+        try:
+            self.on_change(new_config, sections)
+        except Exception as e:
+            _config_reloads["error"].inc()
+            logger.error(f"Failed to apply config change ({', '.join(sorted(sections))}): {e}", exc_info=True)
+            return False
+        self.config = new_config
+        elapsed = time.perf_counter() - start
+        _apply_seconds.observe(elapsed)
+        _config_reloads["applied"].inc()
+        logger.info(f"Config reloaded: {', '.join(sorted(sections))} in {elapsed * 1000:.1f}ms")
+        return True
+
+    def _watch(self):
+        while not self._stop_event.wait(self.interval):
+            self.check()
@@ -0,0 +1,344 @@
+"""
+术语表 / 专有名词保护。
+
+术语表在启动时编译成 Aho-Corasick 自动机，翻译前一次线性扫描把命中的术语替换为占位符 [T0] [T1] ...，
+翻译后再一次扫描把占位符还原为指定译名 (或原文)。耗时只与句子长度和命中数有关，与术语表大小无关。
+
+术语表文件格式 (按扩展名区分):
+    .tsv / .txt   每行 "原文<TAB>译名"，省略译名表示保持原文不翻译，# 开头为注释
+    .json         {"原文": "译名", "Kubernetes": null, ...}，null 或空串表示保持原文
+
+用法:
+    python glossary.py    # 不同术语表规模下的 mask/restore 吞吐
+"""
+import os
+import re
+import json
+import time
+import random
+import logging
+import threading
+from collections import deque
+
+from metrics import registry
+from translator_service import ITranslator
+
+logger = logging.getLogger("Glossary")
+
+_PLACEHOLDER_RE = re.compile(r"\[\s*T\s*(\d+)\s*\]")
+_LETTER_RE = re.compile(r"[^\W\d_]")
+
+_glossary_matches = registry.counter("glossary_terms_masked_total", "Glossary terms protected with placeholders")
+_glossary_restore_failures = registry.counter("glossary_restore_failures_total",
+                                              "Translations where a placeholder was lost and the unmasked text was retranslated")
+_glossary_reloads = registry.counter("glossary_reloads_total", "Glossary file reloads")
+
+
+def _needs_boundary(ch):
+    # 拉丁字母/数字的术语需要整词匹配 ("AI" 不能命中 "said")，中日韩术语不需要
+    return ch.isascii() and ch.isalnum()
+
+
+class TermAutomaton:
+    """
+    Aho-Corasick 多模式匹配自动机。
+    节点以并行列表存储 (goto 字典、失败指针、该节点结束的最长术语)，构建 O(总字符数)，
+    匹配 O(文本长度 + 命中数)。构建完成后只读，可在多线程间共享。
+    """
+    def __init__(self, terms, case_sensitive=False):
+        self.case_sensitive = case_sensitive
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [-1]       # 在该节点结束的术语下标 (-1 表示无)
+        self._dict_link = [0]  # 沿失败链最近的、有术语结束的节点
+        self.terms = []
+        for term in terms:
+            if term:
+                self._insert(term)
+        self._build_links()
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _fold(self, text):
+        if self.case_sensitive:
+            return text
+        folded = text.lower()
+        # 个别字符 lower() 后长度会变 (如 "İ")，此时退回原文以保证下标对齐
+        return folded if len(folded) == len(text) else text
+
+    def _insert(self, term):
+        node = 0
+        for ch in self._fold(term):
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(-1)
+                self._dict_link.append(0)
+            node = nxt
+        if self._out[node] == -1:
+            self._out[node] = len(self.terms)
+            self.terms.append(term)
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                fail = self._fail[child]
+                self._dict_link[child] = fail if self._out[fail] != -1 else self._dict_link[fail]
+
+    def find(self, text):
+        """
+        返回不重叠的命中列表 [(start, end, term_index)]，重叠时优先最靠左、其次最长。
+        """
+        folded = self._fold(text)
+        goto, fail, out, dict_link, terms = self._goto, self._fail, self._out, self._dict_link, self.terms
+        best_at = {}  # start -> (end, term_index)，同一起点只保留最长的一个
+        node = 0
+        n = len(text)
+        for i, ch in enumerate(folded):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            hit = node if out[node] != -1 else dict_link[node]
+            while hit:
+                idx = out[hit]
+                term = terms[idx]
+                start = i - len(term) + 1
+                end = i + 1
+                if ((not _needs_boundary(term[0]) or start == 0 or not text[start - 1].isalnum()) and
+                        (not _needs_boundary(term[-1]) or end == n or not text[end].isalnum())):
+                    prev = best_at.get(start)
+                    if prev is None or prev[0] < end:
+                        best_at[start] = (end, idx)
+                hit = dict_link[hit]
+
+        matches = []
+        last_end = 0
+        for start in sorted(best_at):
+            end, idx = best_at[start]
+            if start >= last_end:
+                matches.append((start, end, idx))
+                last_end = end
+        return matches
+
+
+class Glossary:
+    """术语表：原文 -> 译名 (None 表示保持原文)，附带编译好的自动机"""
+    def __init__(self, entries, case_sensitive=False, version=0):
+        self.entries = dict(entries)
+        self.automaton = TermAutomaton(self.entries.keys(), case_sensitive)
+        self.version = version
+        # 忽略大小写时按自动机中的规范写法查译名
+        self._targets = [self.entries[term] for term in self.automaton.terms]
+
+    def __len__(self):
+        return len(self.automaton)
+
+    def mask(self, text):
+        """
+        把术语替换为按出现顺序编号的占位符，返回 (masked_text, replacements)。
+        占位符只与出现顺序有关，"Ask Alice" 与 "Ask Bob" 得到相同的 masked_text，可共享翻译缓存。
+        """
+        matches = self.automaton.find(text)
+        if not matches:
+            return text, []
+        parts = []
+        replacements = []
+        pos = 0
+        for k, (start, end, idx) in enumerate(matches):
+            parts.append(text[pos:start])
+            parts.append(f"[T{k}]")
+            target = self._targets[idx]
+            replacements.append(target if target else text[start:end])
+            pos = end
+        parts.append(text[pos:])
+        return "".join(parts), replacements
+
+    @staticmethod
+    def restore(translated, replacements):
+        """
+        把译文中的占位符还原，返回 (text, ok)。
+        翻译引擎可能在占位符中插入空格，正则对此做了容错；任一占位符丢失或重复时 ok 为 False。
+        """
+        if not replacements:
+            return translated, True
+        seen = set()
+
+        def _sub(m):
+            k = int(m.group(1))
+            if k >= len(replacements):
+                return m.group(0)
+            seen.add(k)
+            return replacements[k]
+
+        restored = _PLACEHOLDER_RE.sub(_sub, translated)
+        return restored, len(seen) == len(replacements)
+
+
+def load_glossary_file(path):
+    """读取术语表文件，返回 {原文: 译名或 None}"""
+    entries = {}
+    if path.lower().endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for source, target in data.items():
+            source = source.strip()
+            if source:
+                entries[source] = (target or "").strip() or None
+        return entries
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            source, _, target = line.partition("\t")
+            source = source.strip()
+            if source:
+                entries[source] = target.strip() or None
+    return entries
+
+
+class GlossaryTranslator(ITranslator):
+    """
+    ITranslator 装饰器：翻译前屏蔽术语，翻译后还原。
+    - 传给内层翻译器的是屏蔽后的文本，内层 lru_cache 的键因此与具体术语无关，术语表更新后缓存仍可复用
+    - 只有占位符、没有其他可译内容的句子不发请求，直接还原
+    - 占位符被翻译引擎吞掉时，退回翻译原文，保证不丢内容
+    - 术语表文件修改后由后台线程重新编译，编译完成后整体替换引用，翻译线程无需加锁
+    """
+    def __init__(self, inner: ITranslator, glossary_cfg: dict):
+        self.inner = inner
+        self.path = glossary_cfg.get("path", "glossary.tsv")
+        self.case_sensitive = glossary_cfg.get("case_sensitive", False)
+        self.reload_interval = glossary_cfg.get("reload_interval", 2.0)
+        self.on_reload = None  # 回调 (glossary)，术语表热更新后调用 (例如清空翻译记忆)
+        self._mtime = None
+        self.glossary = Glossary({}, self.case_sensitive)
+        self._load()
+        registry.gauge("glossary_terms", "Terms in the active glossary", func=lambda: len(self.glossary))
+
+        self._stop_event = threading.Event()
+        if self.reload_interval and self.reload_interval > 0:
+            threading.Thread(target=self._watch, name="GlossaryWatcher", daemon=True).start()
+
+    @property
+    def version(self):
+        """术语表版本号，每次热更新加一；外部缓存可将其并入缓存键"""
+        return self.glossary.version
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            if self._mtime is None:
+                logger.warning(f"Glossary file not found: {self.path}")
+                self._mtime = 0
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            start = time.perf_counter()
+            entries = load_glossary_file(self.path)
+            glossary = Glossary(entries, self.case_sensitive, version=self.glossary.version + 1)
+        except Exception as e:
+            logger.error(f"Failed to load glossary {self.path}: {e}")
+            self._mtime = mtime  # 同一版本不再重复报错，等待文件再次修改
+            return False
+        self._mtime = mtime
+        self.glossary = glossary
+        logger.info(f"Glossary loaded: {len(glossary)} terms from {self.path} "
+                    f"in {(time.perf_counter() - start) * 1000:.1f}ms (v{glossary.version})")
+        return True
+
+    def _watch(self):
+        while not self._stop_event.wait(self.reload_interval):
+            if self._load():
+                _glossary_reloads.inc()
+                if self.on_reload:
+                    try:
+                        self.on_reload(self.glossary)
+                    except Exception as e:
+                        logger.error(f"Glossary reload callback failed: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+
+    def translate(self, text: str) -> str:
+        glossary = self.glossary  # 取一次引用，热更新期间本次翻译使用同一版本
+        masked, replacements = glossary.mask(text)
+        if not replacements:
+            return self.inner.translate(text)
+        _glossary_matches.inc(len(replacements))
+
+        if not _LETTER_RE.search(_PLACEHOLDER_RE.sub("", masked)):
+            restored, _ = Glossary.restore(masked, replacements)
+            return restored
+
+        translated = self.inner.translate(masked)
+        if translated.startswith("[Err"):
+            return translated
+        restored, ok = Glossary.restore(translated, replacements)
+        if not ok:
+            _glossary_restore_failures.inc()
+            logger.warning(f"Glossary placeholder lost in translation, retranslating unmasked: {masked} -> {translated}")
+            return self.inner.translate(text)
+        return restored
+
+
+def _benchmark(sizes=(10, 100, 1000, 10000, 100000), sentences=2000):
+    """python glossary.py：术语表规模对 mask+restore 耗时的影响，并与逐词 str.replace 对比"""
+    rng = random.Random(1)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+
+    def word():
+        return "".join(rng.choice(letters) for _ in range(rng.randint(3, 9)))
+
+    vocab = [word() for _ in range(5000)]
+    max_size = max(sizes)
+    all_terms = [" ".join(word().capitalize() for _ in range(rng.randint(1, 3))) for _ in range(max_size)]
+
+    print(f"{'terms':>8s} {'build ms':>10s} {'mask+restore us':>16s} {'naive replace us':>17s}")
+    for size in sizes:
+        terms = all_terms[:size]
+        start = time.perf_counter()
+        glossary = Glossary({t: f"<{t}>" for t in terms})
+        build_ms = (time.perf_counter() - start) * 1000
+
+        batch = []
+        for _ in range(sentences):
+            words = [rng.choice(vocab) for _ in range(rng.randint(8, 20))]
+            for _ in range(rng.randint(0, 2)):
+                words.insert(rng.randrange(len(words) + 1), rng.choice(terms))
+            batch.append(" ".join(words))
+
+        start = time.perf_counter()
+        for s in batch:
+            masked, replacements = glossary.mask(s)
+            Glossary.restore(masked, replacements)
+        ac_us = (time.perf_counter() - start) / len(batch) * 1e6
+
+        naive_us = float("nan")
+        if size <= 10000:
+            start = time.perf_counter()
+            for s in batch[:200]:
+                for t in terms:
+                    if t in s:
+                        s = s.replace(t, f"<{t}>")
+            naive_us = (time.perf_counter() - start) / 200 * 1e6
+        print(f"{size:8d} {build_ms:10.1f} {ac_us:16.1f} {naive_us:17.1f}")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,179 @@
+import re
+import math
+import logging
+import threading
+
+logger = logging.getLogger("LangID")
+
+# --- 文字系统 (script) 判定：非拉丁文字基本可以直接确定语言 ---
+_SCRIPTS = [
+    ("ja", re.compile(r"[\u3040-\u30ff]")),           # 平假名/片假名 (优先于汉字判断)
+    ("ko", re.compile(r"[\uac00-\ud7af\u1100-\u11ff]")),
+    ("zh", re.compile(r"[\u3400-\u9fff]")),
+    ("ru", re.compile(r"[\u0400-\u04ff]")),
+    ("ar", re.compile(r"[\u0600-\u06ff]")),
+    ("he", re.compile(r"[\u0590-\u05ff]")),
+    ("el", re.compile(r"[\u0370-\u03ff]")),
+    ("th", re.compile(r"[\u0e00-\u0e7f]")),
+    ("hi", re.compile(r"[\u0900-\u097f]")),
+]
+_LETTER_RE = re.compile(r"[^\W\d_]")
+_NON_LETTER_RE = re.compile(r"[\W\d_]+")
+
+# 拉丁文字语言少于这么多字母时不做判断 (太短的片段误判率高)
+MIN_LATIN_LETTERS = 12
+
+# --- 拉丁文字语言的常见字符三元组 (按频率从高到低，空格表示词边界) ---
+_PROFILES_RAW = {
+    "en": " th|the|he |ing|nd | an|and| of|of | to|ion|ed | in|er |tio|at |on |is |re |ent| a | is|to |es "
+          "|ng |for| fo|hat|tha| wh|her|ere|in |you| yo|ou |ter|it |nt |ly |st | be|al |all|ll |ave| ha|his|ver|wit|ith| wi|ght",
+    "fr": " de|es |de |le |ent| le|ion|nt | la|la | co|les|re |tio|ne | et|et |que| qu|ue | pa|ous|men|our| un"
+          "|une|ais|est| es|des| da|dan|ans|par| po|pou|eur| re|ons|au |ait|ell|qui|vou| vo|nou| no| ce|ce |eme",
+    "de": "en |er |ch |der|ie | di|die|ich|sch|ein|nd | de|und| un|cht| ei|ung|te |den|che|gen|ine| da|das|ist"
+          "| is|st |in |ten|nde| ge|ge |es |it | mi|mit|auf| au|ber|ver| ve| zu|zu |nic|ht |sie| si|wir| wi|ier|eit",
+    "es": " de|de |es | la|la |os |ent| qu|que|ue |el | el|en | en|ión|as | co|con|ado| lo|los|nte|ara| pa|par"
+          "|er | es|est| un|una|por| po|ien|mos|ar |sta|cio|ón |del|ero|com| se|tra|do |ara|ues|ame| y |ás ",
+    "it": " di|di |che|la | la|to | ch|he |re | de|del|ell|ent|zio|ion| co|one|per| pe|lla|er | il|il |no |ato"
+          "| in| un|non| no|are|con|ne |ono|sta|ere|gli|tti| so|ant|all|ett|ia |ra | è |sono|ame|ent|nte|tta",
+    "pt": " de|de |os |ão | qu|que|ue | co|ent|do |da |ar | da|ção| do|est|es |com| pa|par|ra |nte|ado|men|em "
+          "| se| um|uma|não| nã|ões|as | es|ido|ara|por| po|ica|mos|eu |sta|ela|ter|ós |voc|ocê|ava|ndo",
+    "nl": "en |de | de|an |et |van| va|het| he|ing|een| ee|er | en|and|nd |in | in|ij |sch|ver| ve|te |ond|den"
+          "|oor| vo|voo|aar|ie |ijk| is|is |cht|dat| da|nie|iet|ik | ik|wij|gen| ge|we | we|zij| zi|ook|ede",
+}
+
+
+# --- 各语言的高频功能词，命中一个即给对应语言加分 (对短句比三元组更可靠) ---
+_STOPWORDS_RAW = {
+    "en": "the and to of a in is it you that we for on with this are be have not so was what can do i my your our "
+          "they will about just like very thank thanks yes no there how all but if from at an as me he she going want",
+    "fr": "le la les de des du un une et est je tu il elle nous vous ils que qui pas pour dans sur avec ce cette "
+          "merci beaucoup bonjour oui non mais très aussi au aux sont être avoir c'est on",
+    "de": "der die das und ist nicht ich du wir sie ein eine zu mit auf für den dem von auch es danke ja nein sehr "
+          "aber heute wie was wenn noch nur sind haben kann",
+    "es": "el la los las de del y que en un una es por para con no se lo como más pero gracias hola sí muy todos "
+          "hoy vamos está son hay también yo",
+    "it": "il lo la gli le di del della e che è un una per con non sono mi ti ci grazie ciao buongiorno molto "
+          "tutti oggi anche come questo",
+    "pt": "o a os as de do da dos das e que em um uma é não para com por obrigado olá muito todos hoje você "
+          "vamos isso está são também",
+    "nl": "de het een en van ik je is dat niet op te zijn met voor wij we ze hij dank goedemorgen vandaag heel ook "
+          "maar wat hoe er",
+}
+_STOPWORD_BONUS = 4.0
+
+# 频率表中不存在的三元组按此概率计 (朴素贝叶斯平滑)
+_UNSEEN_LOG_P = math.log(1e-4)
+
+
+def _build_profiles():
+    """
+    按 Zipf 分布把排名换算成对数概率 (P ∝ 1 / (rank + 10))，
+    得分为文本中各三元组对数概率之和，相当于一个字符三元组朴素贝叶斯分类器。
+    """
+    profiles = {}
+    for lang, raw in _PROFILES_RAW.items():
+        grams = [g for g in raw.split("|") if len(g) == 3]
+        norm = sum(1.0 / (rank + 10) for rank in range(len(grams)))
+        weights = {}
+        for rank, gram in enumerate(grams):
+            # 把频率表覆盖的概率质量设为 0.3，其余留给未登录三元组
+            weights.setdefault(gram, math.log(0.3 / (rank + 10) / norm))
+        profiles[lang] = (weights, frozenset(_STOPWORDS_RAW.get(lang, "").split()))
+    return profiles
+
+
+class LanguageIdentifier:
+    """
+    轻量级本地语种识别：
+    1. 先按文字系统判断 (汉字/假名/谚文/西里尔等)，几微秒内即可确定
+    2. 拉丁文字再用内置的字符三元组频率表 + 高频功能词打分
+    三元组表在首次调用时才构建，不影响启动速度。
+    """
+    def __init__(self):
+        self._profiles = None
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        if self._profiles is None:
+            with self._lock:
+                if self._profiles is None:
+                    self._profiles = _build_profiles()
+                    logger.info(f"Language ID model loaded ({len(self._profiles)} latin profiles)")
+        return self._profiles
+
+    def detect(self, text):
+        """
+        返回 (语言代码, 置信度)；无法判断时返回 (None, 0.0)。
+        没有任何字母 (纯数字/标点/符号) 时返回 ("", 1.0)。
+        """
+        letters = len(_LETTER_RE.findall(text))
+        if letters == 0:
+            return "", 1.0
+
+        for lang, pattern in _SCRIPTS:
+            count = len(pattern.findall(text))
+            # 日文混有汉字，只要出现假名即判为日文；其余文字需占字母的多数
+            if count and (lang == "ja" or count * 2 >= letters):
+                return lang, count / letters
+
+        if letters < MIN_LATIN_LETTERS:
+            return None, 0.0
+
+        profiles = self._ensure_loaded()
+        padded = " " + _NON_LETTER_RE.sub(" ", text.lower()).strip() + " "
+        grams = [padded[i:i + 3] for i in range(len(padded) - 2)]
+        words = padded.split()
+        scores = {
+            lang: sum(weights.get(g, _UNSEEN_LOG_P) for g in grams)
+                  + _STOPWORD_BONUS * sum(1 for w in words if w in stopwords)
+            for lang, (weights, stopwords) in profiles.items()
+        }
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        best_lang, best = ranked[0]
+        # 置信度：每个三元组平均领先第二名的对数概率差，映射到 [0, 1)
+        margin = (best - ranked[1][1]) / len(grams)
+        confidence = 1.0 - math.exp(-margin)
+        return best_lang, confidence
+
+
+def base_lang(code):
+    """"zh-CN" -> "zh"，"en-US" -> "en" """
+    return (code or "").split("-")[0].split("_")[0].lower()
+
+
+_identifier = LanguageIdentifier()
+
+
+# 检测结果只有基础语言，无法区分简繁：这些子标签表示繁体中文，简体原文仍需转换
+_TRADITIONAL_CHINESE_SUBTAGS = {"hant", "tw", "hk", "mo"}
+
+
+def comparable_target(target_lang):
+    """
+    返回可与检测结果比较的目标语言代码；无法仅凭基础语言判断时返回 None：
+    - 地区子标签 (en-US、pt-BR、zh-CN、zh-SG) 与简体文字子标签 (zh-Hans) 按基础语言比较
+    - 繁体中文 (zh-TW、zh-HK、zh-Hant) 以及其他文字子标签 (sr-Latn 等) 不按目标语言跳过
+    """
+    parts = (target_lang or "").replace("_", "-").lower().split("-")
+    base, subtags = parts[0], parts[1:]
+    if base == "zh":
+        return None if _TRADITIONAL_CHINESE_SUBTAGS.intersection(subtags) else "zh"
+    if any(len(tag) == 4 and tag.isalpha() for tag in subtags):
+        return None
+    return base
+
+
+def skip_reason(text, target_lang, min_confidence=0.2):
+    """
+    判断文本是否无需发送到翻译后端：
+    - "untranslatable": 没有可翻译的字母 (数字、标点、符号)
+    - "target_lang": 文本已经是目标语言 (比较规则见 comparable_target)
+    返回 None 表示需要翻译。
+    """
+    lang, confidence = _identifier.detect(text)
+    if lang == "":
+        return "untranslatable"
+    target = comparable_target(target_lang)
+    if lang and target and lang == target and confidence >= min_confidence:
+        return "target_lang"
+    return None
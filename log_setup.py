@@ -0,0 +1,221 @@
+"""
+异步日志管线。
+
+调用 logger.info() 的线程 (Tk 主循环、WS 事件循环、翻译线程) 只做过滤和入队，
+控制台输出与文件写入由 QueueListener 后台线程完成：
+- 按类别限流/采样：高频的中间结果日志 (extra={"category": "interim"}) 每 N 条保留 1 条，并限制每秒条数
+- WARNING 及以上级别不受限流影响
+- app.log 按大小滚动，启动时把上次的日志滚动为 app.log.1 (替代原来的 mode='w' 覆盖)
+- 写入文件时去掉 ANSI 颜色码
+
+用法:
+    python log_setup.py    # 每条日志在调用线程上的开销：同步 FileHandler vs 队列 vs 被采样丢弃
+"""
+import os
+import re
+import sys
+import time
+import queue
+import logging
+import tempfile
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from metrics import registry
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+_ANSI_RE = re.compile(r"\033\[[0-9;]*m")
+
+# 默认限流规则：类别 -> {"sample_every": 每 N 条保留 1 条, "max_per_second": 每秒上限 (0 不限)}
+DEFAULT_RATE_LIMITS = {
+    "interim": {"sample_every": 5, "max_per_second": 5},
+}
+
+
+class PlainFormatter(logging.Formatter):
+    """文件日志去掉终端颜色码"""
+    def format(self, record):
+        return _ANSI_RE.sub("", super().format(record))
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    按类别采样 + 限流。类别取自 extra={"category": ...}，未指定类别的日志不受限制。
+    在调用线程上执行，只做计数比较，不格式化消息。
+    """
+    def __init__(self, rules):
+        super().__init__()
+        self.rules = rules
+        self._state = {}  # category -> [seen, window_start, window_count]
+        self._lock = threading.Lock()
+        self._dropped = {}
+
+    def _dropped_counter(self, category):
+        counter = self._dropped.get(category)
+        if counter is None:
+            counter = self._dropped[category] = registry.counter(
+                "log_records_suppressed_total", "Log records dropped by sampling/rate limiting", category=category)
+        return counter
+
+    def filter(self, record):
+        category = getattr(record, "category", None)
+        if category is None or record.levelno >= logging.WARNING:
+            return True
+        rule = self.rules.get(category)
+        if not rule:
+            return True
+
+        now = record.created
+        with self._lock:
+            state = self._state.get(category)
+            if state is None:
+                state = self._state[category] = [0, now, 0]
+            state[0] += 1
+            keep = (state[0] - 1) % max(1, rule.get("sample_every", 1)) == 0
+            max_per_second = rule.get("max_per_second", 0)
+            if keep and max_per_second:
+                if now - state[1] >= 1.0:
+                    state[1] = now
+                    state[2] = 0
+                if state[2] >= max_per_second:
+                    keep = False
+                else:
+                    state[2] += 1
+        if not keep:
+            self._dropped_counter(category).inc()
+        return keep
+
+
+class _InProcessQueueHandler(QueueHandler):
+    """
+    标准 QueueHandler.prepare() 为了跨进程传递会先完整格式化整行并复制记录；
+    同进程队列只需提前合并 % 参数 (避免参数对象之后被修改)，其余格式化留给后台线程。
+    """
+    def prepare(self, record):
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+
+class StreamToLogger(object):
+    """
+    Fake file-like stream object that redirects writes to a logger instance.
+    [修改] 按行缓冲：print() 会分多次 write (内容、换行)，凑满一行才记录一条日志。
+    """
+    def __init__(self, logger, level):
+        self.logger = logger
+        self.level = level
+        self.linebuf = ''
+
+    def write(self, buf):
+        self.linebuf += buf
+        if "\n" not in self.linebuf:
+            return
+        *lines, self.linebuf = self.linebuf.split("\n")
+        for line in lines:
+            line = line.rstrip()
+            if line:
+                self.logger.log(self.level, line)
+
+    def flush(self):
+        if self.linebuf.strip():
+            self.logger.log(self.level, self.linebuf.rstrip())
+        self.linebuf = ''
+
+
+def _build_handlers(log_cfg):
+    handlers = [logging.StreamHandler(sys.__stderr__ or sys.stderr)]
+    handlers[0].setFormatter(logging.Formatter(LOG_FORMAT))
+    if log_cfg.get("file_logging", True):
+        path = log_cfg.get("file_path", "app.log")
+        file_handler = RotatingFileHandler(path, maxBytes=int(log_cfg.get("max_bytes", 5 * 1024 * 1024)),
+                                           backupCount=log_cfg.get("backup_count", 3), encoding="utf-8",
+                                           delay=True)
+        # 每次启动开始一个新文件，上次的日志保留为 app.log.1
+        if log_cfg.get("rotate_on_start", True) and os.path.exists(path) and os.path.getsize(path) > 0:
+            file_handler.doRollover()
+        file_handler.setFormatter(PlainFormatter(LOG_FORMAT))
+        handlers.append(file_handler)
+    return handlers
+
+
+def setup_logging(log_cfg: dict):
+    """
+    配置根日志记录器并启动后台写入线程，返回 QueueListener (退出前调用 stop() 刷新剩余日志)。
+    log_cfg 为 config.json 的 logging 段。
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(logging.INFO)
+
+    handlers = _build_handlers(log_cfg)
+    if not log_cfg.get("async", True):
+        for handler in handlers:
+            handler.addFilter(RateLimitFilter(log_cfg.get("rate_limits", DEFAULT_RATE_LIMITS)))
+            root.addHandler(handler)
+        return None
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _InProcessQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(log_cfg.get("rate_limits", DEFAULT_RATE_LIMITS)))
+    root.addHandler(queue_handler)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    registry.gauge("log_queue_depth", "Log records waiting for the background writer", func=log_queue.qsize)
+    return listener
+
+
+def _benchmark(n=3000, interval=0.001):
+    """
+    python log_setup.py：单条日志在调用线程上的耗时 (按 interval 间隔发送，模拟实际事件节奏)。
+    平均值之外更关注 p99/max：同步写入在磁盘抖动时直接阻塞调用线程。
+    """
+    bench_logger = logging.getLogger("Bench")
+    bench_logger.propagate = False
+    bench_logger.setLevel(logging.INFO)
+    text = "so the next thing we are going to look at is the latency of the pipeline"
+
+    def run(label, setup, extra=None):
+        directory = tempfile.mkdtemp()
+        handlers, listener = setup(os.path.join(directory, "bench.log"))
+        for handler in handlers:
+            bench_logger.addHandler(handler)
+        samples = []
+        for i in range(n):
+            start = time.perf_counter()
+            bench_logger.info(f"Receive (Interim): {text} {i}", extra=extra)
+            samples.append((time.perf_counter() - start) * 1e6)
+            time.sleep(interval)
+        samples.sort()
+        if listener:
+            listener.stop()
+        for handler in handlers:
+            bench_logger.removeHandler(handler)
+            handler.close()
+        print(f"{label:34s} mean {sum(samples) / n:6.1f}us  p50 {samples[n // 2]:6.1f}us  "
+              f"p99 {samples[int(n * 0.99)]:6.1f}us  max {samples[-1]:7.1f}us")
+
+    def sync_file(path):
+        handler = logging.FileHandler(path, encoding="utf-8")
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        return [handler], None
+
+    def queued(path, rules=None):
+        log_queue = queue.SimpleQueue()
+        handler = _InProcessQueueHandler(log_queue)
+        handler.addFilter(RateLimitFilter(rules or {}))
+        file_handler = RotatingFileHandler(path, maxBytes=5 * 1024 * 1024, backupCount=1, encoding="utf-8")
+        file_handler.setFormatter(PlainFormatter(LOG_FORMAT))
+        listener = QueueListener(log_queue, file_handler)
+        listener.start()
+        return [handler], listener
+
+    run("sync FileHandler", sync_file)
+    run("QueueHandler (all kept)", queued, extra={"category": "interim"})
+    run("QueueHandler + interim sampling", lambda p: queued(p, DEFAULT_RATE_LIMITS), extra={"category": "interim"})
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -1,13 +1,21 @@
 import json
 import os
 import time
+_process_start = time.time()  # [新增] 启动时间线零点，尽量早于其它导入
 import logging
 import threading
 import queue
 import sys
 import traceback
+import importlib
 # 仅导入轻量级 UI，延迟导入重型服务
 from ui_overlay import OverlayWindow
+from tracing import tracer
+from metrics import registry, MetricsServer
+from pipeline import create_trigger_policy, StabilityGate, Endpointer
+from translation_memory import TranslationMemory
+from log_setup import setup_logging, StreamToLogger
+from bootstrap import Bootstrap
 
 # 配置日志
 def load_config():
@@ -18,36 +26,34 @@ def load_config():
 
 # 预加载配置以设置日志
 _config = load_config()
-_log_handlers = [logging.StreamHandler()]
-if _config.get("logging", {}).get("file_logging", True):
-    # 使用 mode='w' 确保每次启动时覆盖旧日志
-    _log_handlers.append(logging.FileHandler("app.log", mode='w', encoding="utf-8"))
-
-log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-logging.basicConfig(
-    level=logging.INFO,
-    format=log_format,
-    handlers=_log_handlers
-)
+# [修改] 日志改为后台线程写入 (QueueListener)，按大小滚动，中间结果日志采样限流
+_log_listener = setup_logging(_config.get("logging", {}))
 logger = logging.getLogger("Main")
 
-# --- [新增] 全局异常捕获 & Stderr 重定向 ---
-class StreamToLogger(object):
-    """
-    Fake file-like stream object that redirects writes to a logger instance.
-    """
-    def __init__(self, logger, level):
-        self.logger = logger
-        self.level = level
-        self.linebuf = ''
-
-    def write(self, buf):
-        for line in buf.rstrip().splitlines():
-            self.logger.log(self.level, line.rstrip())
-
-    def flush(self):
-        pass
+# [新增] 管线指标
+_dropped_tasks = registry.counter("translation_tasks_dropped_total", "Obsolete translation tasks discarded by the latest-win worker")
+_translate_latency = registry.histogram("translation_latency_seconds", "Time spent in translator.translate()")
+_final_latency = registry.histogram("utterance_latency_seconds", "Browser result event to rendered translation", kind="final")
+_interim_latency = registry.histogram("utterance_latency_seconds", "Browser result event to rendered translation", kind="interim")
+_early_latency = registry.histogram("utterance_latency_seconds", "Browser result event to rendered translation", kind="early")
+_endpointing = {
+    outcome: registry.counter("endpointing_total", "Early-committed pseudo finals and how the real final reconciled", outcome=outcome)
+    for outcome in ("committed", "confirmed", "revised")
+}
+_tm_hits = {
+    kind: registry.counter("translation_memory_hits_total", "Translation memory lookups by outcome", kind=kind)
+    for kind in ("accept", "provisional", "miss")
+}
+_tm_lookup_latency = registry.histogram("translation_memory_lookup_seconds", "Translation memory lookup time",
+                                        buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.01))
+_final_promotions = registry.counter("translation_final_promotions_total",
+                                     "Finals that reused the in-flight interim translation of the same text")
+_triggers = {
+    reason: registry.counter("translation_triggers_total", "Translation tasks submitted by trigger reason", reason=reason.strip("[]").lower())
+    for reason in ("[Final]", "[Len]", "[Time]")
+}
 
+# --- [新增] 全局异常捕获 & Stderr 重定向 ---
 # 重定向 stdout 和 stderr
 sys.stdout = StreamToLogger(logger, logging.INFO)
 sys.stderr = StreamToLogger(logger, logging.ERROR)
@@ -61,10 +67,28 @@ def handle_exception(exc_type, exc_value, exc_traceback):
 def handle_thread_exception(args):
     logger.critical(f"Uncaught exception in thread: {args.thread.name}", exc_info=(args.exc_type, args.exc_value, args.exc_traceback))
 
+def _stop_logging():
+    """os._exit / taskkill 不会执行 atexit，退出前手动把队列中剩余的日志写完"""
+    if _log_listener is not None:
+        try:
+            _log_listener.stop()
+        except Exception:
+            pass
+
 sys.excepthook = handle_exception
 threading.excepthook = handle_thread_exception
 # ---------------------------
 
+# 顺序缓冲中等待的 Final 超过此数时认为缺口对应的 Final 已丢失，跳过缺口继续写出
+_MAX_PENDING_FINALS = 32
+
+# [新增] 配置热更新：这些分区或 translation 中的这些键变化时重建翻译链
+_TRANSLATOR_SECTIONS = {"proxy", "glossary", "shared_cache", "translator_process"}
+_TRANSLATOR_KEYS = ("skip_same_language", "lang_id_min_confidence")
+# 运行中无法应用、需要重启的分区
+_RESTART_SECTIONS = {"logging", "metrics", "chrome", "speech_restart", "transcript", "subtitles", "capture",
+                     "profiling", "config_reload"}
+
 class AppController:
     def __init__(self):
         self.config = _config
@@ -74,6 +98,9 @@ class AppController:
         # 1. 极速启动 UI (显示加载状态)
         logger.info("Starting UI...")
         self.ui = OverlayWindow(self.config, on_close_callback=self.shutdown)
+        # [新增] 启动时间线：各启动步骤并行执行，阶段耗时写入日志与指标
+        self.bootstrap = Bootstrap(_process_start)
+        self.bootstrap.mark("ui_ready")
         
         # [修改] 必须先初始化队列变量，再调用 update
         self.status_queue = []
@@ -88,30 +115,155 @@ class AppController:
         self.translator = None
         self.speech_service = None
         
-        # 状态追踪
-        self.last_translate_time = 0
-        self.last_english_text = ""
-        self.interim_translate_trigger_threshold = self.config.get("translation", {}).get("interim_translate_trigger_threshold", 50)
-        self.interim_translate_min_threshold = self.config.get("translation", {}).get("interim_translate_min_threshold", 20)
-        self.interim_timeout = self.config.get("translation", {}).get("interim_translate_timeout", 2.0)
-        self.interim_debounce_interval = self.config.get("translation", {}).get("interim_debounce_interval", 1.0) # [新增] 冷却时间
+        # [修改] 翻译触发规则抽离到 pipeline 模块，回放基准与此处共用同一实现
+        self.trigger_policy = create_trigger_policy(self.config.get("translation", {}))
+        # [新增] 中间结果只翻译稳定前缀，跳过低置信度和易变的句尾
+        self.stability_gate = StabilityGate(self.config.get("translation", {}))
+        # [新增] 早期断句：停顿且文本稳定时不等浏览器的 isFinal，提前提交伪 Final
+        self.endpointer = Endpointer(self.config.get("translation", {}))
+        self._last_interim = None  # (trace_id, ts)，伪 Final 沿用最后一条中间结果的追踪 id 与时间
+        self._early_translation = None  # (原文, 译文)：最近一次伪 Final 的翻译结果，对账一致时直接写入出口
+
+        # [新增] 模糊翻译记忆：近似句直接复用或先作为临时字幕显示
+        self.tm_cfg = self.config.get("translation_memory", {})
+        self.translation_memory = None
+        if self.tm_cfg.get("enabled", True):
+            self.translation_memory = TranslationMemory(self.tm_cfg.get("max_entries", 200000))
+            registry.gauge("translation_memory_entries", "Segments stored in the translation memory",
+                           func=lambda: len(self.translation_memory))
+            self._load_translation_seeds()
+
+        # [新增] 逐句延迟追踪
+        self.tracing_cfg = self.config.get("tracing", {})
+        tracer.configure(self.tracing_cfg)
+        self.show_latency_suffix = self.tracing_cfg.get("show_latency_suffix", False)
+        self._trace_exported = False
+
+        # [新增] Final 结果的持久化出口 (会话存档等)，均为非阻塞 submit()
+        self.final_sinks = []
+        self.final_backfill = queue.Queue()  # 被 Latest-Win 丢弃或未触发翻译的 Final，补译后写入出口 (退出时只写原文)
+        self._utterance_start_ts = None
+        # 出口按识别顺序写入：Final 在主线程编号，补译/翻译完成的先后不同，由 _emit_final 的顺序缓冲重排
+        self._final_seq = 0
+        self._next_emit_seq = 0
+        self._pending_finals = {}  # seq -> segment
+        self._emit_lock = threading.Lock()
+        # 翻译线程正在翻译的任务；同文本的 Final 到达时挂在其上 (task["promoted"])，不再排队重复翻译
+        self._inflight = None
+        self._inflight_lock = threading.Lock()
+        transcript_cfg = self.config.get("transcript", {})
+        if transcript_cfg.get("enabled", True):
+            try:
+                from transcript_store import TranscriptStore
+                trans_cfg = self.config.get("translation", {})
+                self.final_sinks.append(TranscriptStore(transcript_cfg, trans_cfg.get("source_lang", "en"),
+                                                        trans_cfg.get("target_lang", "zh-CN")))
+            except Exception as e:
+                logger.error(f"Failed to open transcript store: {e}")
+        # [新增] 实时导出双语 SRT / WebVTT 字幕
+        subtitles_cfg = self.config.get("subtitles", {})
+        if subtitles_cfg.get("enabled", False):
+            try:
+                from subtitle_export import SubtitleExporter
+                self.final_sinks.append(SubtitleExporter(subtitles_cfg))
+            except Exception as e:
+                logger.error(f"Failed to open subtitle exporter: {e}")
+
+        # [新增] 本地指标端点 (队列深度等采用抓取时回调，热路径零开销)
+        registry.gauge("queue_depth", "Pending items per pipeline queue", func=self.msg_queue.qsize, queue="msg")
+        registry.gauge("queue_depth", "Pending items per pipeline queue", func=self.trans_queue.qsize, queue="trans")
+        registry.gauge("queue_depth", "Pending items per pipeline queue", func=lambda: len(self.status_queue), queue="status")
+        registry.gauge("trigger_ewma_latency_seconds", "Translation latency EWMA seen by the adaptive trigger policy",
+                       func=lambda: getattr(self.trigger_policy, "ewma_latency", float("nan")))
+        registry.gauge("trigger_interval_seconds", "Current minimum interval between interim translations (adaptive policy)",
+                       func=lambda: getattr(self.trigger_policy, "interval", float("nan")))
+        self.metrics_server = None
+        metrics_cfg = self.config.get("metrics", {})
+        if metrics_cfg.get("enabled", True):
+            self.metrics_server = MetricsServer(registry, metrics_cfg.get("host", "127.0.0.1"), metrics_cfg.get("port", 9108))
+            self.metrics_server.add_route("/trace.json", lambda: ("application/json", json.dumps(tracer.to_chrome_trace(), ensure_ascii=False).encode("utf-8")))
+
+        # [新增] 按需剖析：未触发时不启动采样线程、不开启 tracemalloc
+        self.profiler = None
+        profiling_cfg = self.config.get("profiling", {})
+        if profiling_cfg.get("enabled", True):
+            from profiler import ProfilerControl
+            self.profiler = ProfilerControl(profiling_cfg)
+            if self.metrics_server:
+                # 会改变状态的调试端点只接受带本次运行令牌的 POST
+                for path, func in self.profiler.routes().items():
+                    self.metrics_server.add_route(path, func, method="POST", token=self.profiler.token)
+                self.profiler.write_token()
+            hotkeys = profiling_cfg.get("hotkeys", {})
+            # 写文件可能耗时，放到后台线程执行，避免卡住 Tk 主线程
+            for action, default, func in (("toggle_profile", "<Control-Alt-p>", self.profiler.toggle_profile),
+                                          ("heap_snapshot", "<Control-Alt-m>", self.profiler.snapshot)):
+                sequence = hotkeys.get(action, default)
+                if sequence:
+                    self.ui.add_hotkey(sequence, lambda f=func: threading.Thread(target=f, name="ProfilerControl", daemon=True).start())
+
+        # [新增] config.json 热更新：按分区比较，只在最小范围内应用变化，不重启浏览器
+        self.config_watcher = None
+        reload_cfg = self.config.get("config_reload", {})
+        if reload_cfg.get("enabled", True):
+            from config_watcher import ConfigWatcher
+            self.config_watcher = ConfigWatcher("config.json", self.config, self._apply_config,
+                                                reload_cfg.get("interval", 1.0))
 
     def shutdown(self):
         """
-        通过 taskkill /T 递归终结当前进程树，这是清理 Selenium 残留最彻底且简单的方法。
+        [修改] 语音服务 stop() 会整组结束浏览器进程 (POSIX 进程组 / Windows taskkill /T)；
+        Windows 下最后仍通过 taskkill /T 递归终结当前进程树作为兜底，其他平台直接退出。
         """
         logger.info("Shutdown sequence initiated...")
+        self._export_trace()
+        if self.config_watcher:
+            self.config_watcher.stop()
+        if self.profiler:
+            self.profiler.stop()
+        self.trigger_policy.close()
+        self._drain_final_backfill()
+        self._close_final_sinks()
         
         # 1. 尝试优雅关闭 (可选，为了保存某些状态)
         if self.speech_service:
             try: self.speech_service.stop()
             except: pass
+        if hasattr(self.translator, "stop"):
+            try: self.translator.stop()
+            except: pass
             
         # 2. 终极自杀：连带所有子进程 (chromedriver, chrome) 一起带走
         logger.info("Killing process tree...")
-        pid = os.getpid()
-        # /F 强制, /T 包含子进程
-        os.system(f"taskkill /F /T /PID {pid}")
+        _stop_logging()
+        if os.name == "nt":
+            pid = os.getpid()
+            # /F 强制, /T 包含子进程
+            os.system(f"taskkill /F /T /PID {pid}")
+        os._exit(0)
+
+    def _close_final_sinks(self):
+        for sink in self.final_sinks:
+            try:
+                sink.close()
+            except Exception as e:
+                logger.error(f"Failed to close {type(sink).__name__}: {e}")
+        self.final_sinks = []
+
+    def _export_trace(self):
+        """
+        [新增] 退出时导出追踪环形缓冲区 (Chrome trace-event JSON) 并打印各阶段耗时概要
+        """
+        export_path = self.tracing_cfg.get("export_path", "trace.json")
+        if not tracer.enabled or not export_path or self._trace_exported:
+            return
+        self._trace_exported = True
+        try:
+            for name, stat in sorted(tracer.stage_summary().items()):
+                logger.info(f"Trace span {name}: n={stat['count']} avg={stat['avg_ms']:.1f}ms max={stat['max_ms']:.1f}ms")
+            tracer.export(export_path)
+        except Exception as e:
+            logger.error(f"Failed to export trace: {e}")
 
     def queue_status_update(self, text):
         """
@@ -158,19 +310,23 @@ class AppController:
         
         logger.info("Loading services in background...")
         try:
-            # 延迟导入，减少冷启动时间
-            from translator_service import DeepTranslatorService
-            from speech_service import SpeechService
-            
-            # 初始化翻译服务
-            self.translator = DeepTranslatorService(self.config)
-            
-            # 初始化语音服务 (传入状态回调)
-            self.speech_service = SpeechService(self.config, self.on_speech_result, self.on_speech_status_update)
-            self.speech_service.start() # 启动 Chrome
-            
-            # 启动翻译工作线程
-            threading.Thread(target=self._translation_worker, daemon=True).start()
+            # [修改] 相互独立的启动步骤并行执行：翻译链的导入/初始化/连接预热 与 语音服务 (HTTP/WS 绑定 + Chrome 启动) 互不等待
+            boot = self.bootstrap
+            # [新增] 可选在独立进程中运行整条翻译链，避免与 UI 争抢 GIL
+            use_process = self.config.get("translator_process", {}).get("enabled", False)
+            translator_module = "translator_process" if use_process else "translator_service"
+            boot.add("import_translator", lambda: importlib.import_module(translator_module))
+            boot.add("import_speech", lambda: importlib.import_module("speech_service"))
+            boot.add("translator", lambda: self._init_translator(use_process), deps=["import_translator"])
+            boot.add("speech", self._start_speech, deps=["import_speech"])
+            boot.add("translation_worker",
+                     lambda: threading.Thread(target=self._translation_worker, daemon=True).start(),
+                     deps=["translator"])
+            if self.config.get("translation", {}).get("warmup", True) and not use_process:
+                # 进程模式下由子进程自行预热
+                boot.add("warmup", lambda: importlib.import_module("translator_service").warmup(), deps=["translator"])
+            boot.run()
+            boot.mark("services_loaded")
             
             # 更新 UI 状态 (使用队列)
             self.queue_status_update("Services Loaded")
@@ -186,15 +342,144 @@ class AppController:
             self.queue_status_update("Error loading services")
             self.ui.root.after(0, lambda: self.ui.update_chinese(err_msg))
 
+    def _init_translator(self, use_process):
+        self.translator = self._create_translator(self.config, use_process)
+
+    def _create_translator(self, config, use_process):
+        # 初始化翻译服务 (含术语表保护)
+        if use_process:
+            from translator_process import ProcessTranslator
+            return ProcessTranslator(config, on_glossary_reload=self._on_glossary_reload)
+        from translator_service import create_translator
+        return create_translator(config, on_glossary_reload=self._on_glossary_reload)
+
+    def _start_speech(self):
+        from speech_service import SpeechService
+        # 初始化语音服务 (传入状态回调)
+        self.speech_service = SpeechService(self.config, self.on_speech_result, self.on_speech_status_update,
+                                            on_phase=self.bootstrap.mark)
+        self.speech_service.start() # 启动 Chrome
+
+    def _load_translation_seeds(self):
+        """[新增] 载入 preseed_cache.py 预先翻译的讲稿语句 (原文<TAB>译文)"""
+        seed_file = self.tm_cfg.get("seed_file", "translation_seed.tsv")
+        if not seed_file or not os.path.exists(seed_file):
+            return
+        count = 0
+        with open(seed_file, "r", encoding="utf-8") as f:
+            for line in f:
+                source, sep, translation = line.rstrip("\n").partition("\t")
+                if sep and source and translation:
+                    self.translation_memory.add(source, translation)
+                    count += 1
+        logger.info(f"Loaded {count} pre-translated segments from {seed_file}")
+
+    def _apply_config(self, new_config, sections):
+        """
+        [新增] [配置监视线程] 按变化的分区分别应用：
+        - ui：Tk 主线程中就地修改样式
+        - translation：新建触发策略与稳定性门控，在 Tk 主线程 (decide 的调用方) 中整体替换
+        - 语言 / 代理 / 翻译链相关分区：重建翻译器后替换引用，旧实例延迟关闭，翻译记忆随语言变化清空
+        - speech_recognition：识别语言直接推送到页面，其他参数在浏览器下次重启时生效
+        其他分区需要重启后生效。
+        先构建所有新对象 (可能失败：代理、术语表文件、翻译子进程)，全部成功后再统一替换；
+        构建失败时异常交给 ConfigWatcher 记录，当前配置与各组件保持不变。
+        """
+        old_config = self.config
+        old_trans, new_trans = old_config.get("translation", {}), new_config.get("translation", {})
+        language_changed = any(old_trans.get(k) != new_trans.get(k) for k in ("source_lang", "target_lang"))
+
+        # 1. 构建
+        policy = None
+        if "translation" in sections:
+            policy, gate, endpointer = create_trigger_policy(new_trans), StabilityGate(new_trans), Endpointer(new_trans)
+        translator = None
+        if self.translator is not None and (sections & _TRANSLATOR_SECTIONS or language_changed or
+                                            any(old_trans.get(k) != new_trans.get(k) for k in _TRANSLATOR_KEYS)):
+            use_process = new_config.get("translator_process", {}).get("enabled", False)
+            try:
+                translator = self._create_translator(new_config, use_process)
+            except Exception:
+                if policy is not None:
+                    policy.close()
+                raise
+
+        # 2. 替换
+        self.config = new_config
+        if "ui" in sections:
+            self.ui.root.after(0, lambda: self.ui.apply_config(new_config))
+        else:
+            self.ui.config = new_config  # 退出时保存窗口位置写回的是最新配置
+
+        if policy is not None:
+            def swap_policy():
+                old_policy = self.trigger_policy
+                self.trigger_policy, self.stability_gate, self.endpointer = policy, gate, endpointer
+                old_policy.close()
+            self.ui.root.after(0, swap_policy)
+
+        if translator is not None:
+            # 独立翻译进程模式下由子进程自行建立连接
+            self._swap_translator(translator, clear_memory=language_changed,
+                                  refresh_session="proxy" in sections and not use_process)
+
+        if "translation_memory" in sections:
+            self.tm_cfg = new_config.get("translation_memory", {})
+        if "tracing" in sections:
+            self.tracing_cfg = new_config.get("tracing", {})
+            tracer.configure(self.tracing_cfg)
+            self.show_latency_suffix = self.tracing_cfg.get("show_latency_suffix", False)
+        if "speech_recognition" in sections and self.speech_service is not None:
+            self.speech_service.apply_config(new_config)
+
+        pending = sorted(sections & _RESTART_SECTIONS)
+        if pending:
+            logger.warning(f"Config sections {', '.join(pending)} take effect after restart")
+
+    def _swap_translator(self, translator, clear_memory, refresh_session):
+        """[新增] 配置热更新：整体替换翻译链引用，翻译线程下一个任务即使用新实例"""
+        old_translator = self.translator
+        self.translator = translator
+        if clear_memory and self.translation_memory is not None:
+            self.translation_memory.clear()
+        if refresh_session:
+            # 丢弃经由旧代理建立的连接
+            from translator_service import get_smart_session
+            get_smart_session()._refresh_session()
+        # 旧实例可能仍有翻译在途，稍后再关闭
+        if hasattr(old_translator, "stop"):
+            timer = threading.Timer(10.0, old_translator.stop)
+            timer.daemon = True
+            timer.start()
+        logger.info("Translator rebuilt after config change")
+
+    def _on_glossary_reload(self, version):
+        """
+        [术语表监视线程] 翻译记忆中的译文是按旧术语表还原的，术语表更新后整体作废。
+        内层翻译缓存以屏蔽后的文本为键，不受影响。
+        """
+        if self.translation_memory is not None:
+            self.translation_memory.clear()
+            logger.info(f"Translation memory cleared after glossary reload (v{version})")
+
     def on_speech_status_update(self, status):
         """
         处理语音服务的状态回传 (在非 UI 线程调用，需调度)
         """
         logger.info(f"Speech Status: {status}")
+        if status == "ws_connected":
+            self.bootstrap.mark("browser_connected")
+        elif status == "listening" and self.bootstrap.mark("listening"):
+            # [新增] 首次进入监听状态即视为启动完成，输出完整启动时间线
+            self.bootstrap.report()
         
         display_text = ""
         if status == "listening":
             display_text = "Listening..."
+        elif status == "vad_paused":
+            display_text = "Paused (silence)"
+        elif status == "vad_resumed":
+            display_text = "Listening..."
         elif status == "ws_connected":
             display_text = "Browser Connected (Waiting for Mic...)"
         elif str(status).startswith("Error"):
@@ -213,57 +498,274 @@ class AppController:
         策略：总是只处理队列中最新的任务，丢弃积压的旧任务。
         """
         logger.info("Translation worker started.")
+        live_since_backfill = 0
         while True:
             try:
-                # 1. 阻塞等待任务
-                item = self.trans_queue.get()
-                if isinstance(item, tuple):
-                    text, reason = item
+                # 1. 阻塞等待任务 (有待补译的 Final 时，队列空闲即处理补译；
+                #    连续说话时队列不会空闲，每处理 N 个实时任务穿插补译一条，避免补译饿死)
+                if self.final_backfill.empty():
+                    task = self.trans_queue.get()
                 else:
-                    text = item
-                    reason = ""
+                    backfill_every = self.config.get("translation", {}).get("final_backfill_every", 3)
+                    if backfill_every and live_since_backfill >= backfill_every:
+                        live_since_backfill = 0
+                        self._process_final_backfill()
+                        continue
+                    try:
+                        task = self.trans_queue.get(timeout=0.2)
+                    except queue.Empty:
+                        live_since_backfill = 0
+                        self._process_final_backfill()
+                        continue
+                if task is None:
+                    # 主线程放入补译任务后的唤醒信号 (见 _queue_backfill)
+                    live_since_backfill = 0
+                    self._process_final_backfill()
+                    continue
+                live_since_backfill += 1
+                tracer.mark(task["trace_id"], "trans_dequeue")
                 
                 # 2. 检查队列中是否有更新的任务 (Latest-Win 策略)
                 skipped_count = 0
                 while not self.trans_queue.empty():
                     try:
-                        item = self.trans_queue.get_nowait()
-                        if isinstance(item, tuple):
-                            text, reason = item
-                        else:
-                            text = item
-                            reason = ""
+                        newer = self.trans_queue.get_nowait()
+                        if newer is None:
+                            continue  # 唤醒信号：补译在本轮之后照常处理
+                        tracer.mark(task["trace_id"], "dropped")
+                        self.trigger_policy.on_task_finished(task["reason"], None, time.time())
+                        if task.get("seq") is not None:
+                            self.final_backfill.put(task)
+                        task = newer
+                        tracer.mark(task["trace_id"], "trans_dequeue")
                         skipped_count += 1
                     except queue.Empty:
                         break
                 
                 if skipped_count > 0:
+                    _dropped_tasks.inc(skipped_count)
                     # 使用醒目的红色加粗显示丢弃任务
                     logger.info(f"\033[91;1mDropped {skipped_count} obsolete translation tasks from queue.\033[0m")
 
+                text = task["text"]
+                reason = task["reason"]
+                trace_id = task["trace_id"]
+
                 # 3. 执行翻译
+                zh_text, done_time = "", None
                 if text and self.translator:
+                    with self._inflight_lock:
+                        self._inflight = task
                     try:
                         start_time = time.time()
-                        zh_text = self.translator.translate(text)
-                        duration = time.time() - start_time
-                        
-                        # 附加耗时信息
-                        display_text = f"{zh_text} {reason} (耗时{duration:.2f}s)"
-                        
+                        tracer.mark(trace_id, "translate_start", ts=start_time)
+                        zh_text = self._translate_with_memory(text, trace_id)
+                        end_time = done_time = time.time()
+                        tracer.mark(trace_id, "translate_end", ts=end_time)
+                        duration = end_time - start_time
+                        _translate_latency.observe(duration)
+                        self.trigger_policy.on_task_finished(reason, duration, end_time)
+                    except Exception as e:
+                        logger.error(f"Translation logic error: {e}", exc_info=True)
+                        self.trigger_policy.on_task_finished(reason, None, time.time())
+                    finally:
+                        promoted = self._release_inflight(task)
+
+                    if promoted is not None and done_time is None:
+                        # 翻译失败：挂上的 Final 回到补译队列
+                        if promoted.get("seq") is not None:
+                            self.final_backfill.put(promoted)
+                    elif promoted is not None:
+                        # [新增] 翻译期间到达的同文本 Final 直接沿用本次结果，按 Final 显示并写入出口
+                        _final_promotions.inc()
+                        tracer.mark(promoted["trace_id"], "promoted", from_trace=trace_id)
+                        task, reason, trace_id = promoted, promoted["reason"], promoted["trace_id"]
+
+                    if done_time is not None:
+                        # [修改] 耗时信息已由 tracer 记录，默认不再附加到字幕文本中
+                        if self.show_latency_suffix:
+                            display_text = f"{zh_text} {reason} (耗时{duration:.2f}s)"
+                        else:
+                            display_text = f"{zh_text} {reason}"
+
                         # 4. 调度 UI 更新
                         # 使用默认参数绑定变量，防止闭包延迟绑定导致的不一致
                         is_final = "[Final]" in reason
-                        self.ui.root.after(0, lambda d=display_text, t=text, f=is_final: self.ui.update_translation(d, t, f))
-                    except Exception as e:
-                        logger.error(f"Translation logic error: {e}", exc_info=True)
+                        early = task.get("early", False)
+                        if early and zh_text and not zh_text.startswith("[Err"):
+                            self._early_translation = (text, zh_text)
+                        self.ui.root.after(0, lambda d=display_text, t=text, f=is_final, tid=trace_id, ts=task["ts"], e=early: self._render_translation(d, t, f, tid, ts, e))
+                # 伪 Final 只提交显示 (没有 seq)，存档与字幕等真正的 Final 到达后再写入；
+                # 翻译失败时只写原文，避免后续 Final 卡在顺序缓冲中
+                if task.get("seq") is not None:
+                    self._emit_final(task, zh_text or "", done_time or time.time())
             
             except Exception as e:
                 logger.error(f"Worker crashed: {e}", exc_info=True)
                 time.sleep(1) 
 
-    def on_speech_result(self, text, is_final):
-        self.msg_queue.put({"text": text, "is_final": is_final})
+    def _promote_inflight(self, final_task):
+        """
+        [新增] [主线程] 触发策略对与上次翻译相同的 Final 不再提交任务；若该文本的中间结果正在翻译，
+        把 Final 挂在在途任务上，由翻译线程完成后直接按 Final 处理。返回是否挂上。
+        """
+        with self._inflight_lock:
+            inflight = self._inflight
+            if (inflight is None or "[Final]" in inflight["reason"] or "promoted" in inflight
+                    or inflight["text"] != final_task["text"]):
+                return False
+            inflight["promoted"] = final_task
+            return True
+
+    def _release_inflight(self, task):
+        """[翻译线程] 翻译结束：清除在途任务，返回期间挂上的 Final (没有则为 None)"""
+        with self._inflight_lock:
+            self._inflight = None
+            return task.pop("promoted", None)
+
+    def _emit_final(self, task, zh_text, done_time):
+        """
+        [翻译线程] 把一句完整的 Final (原文 + 译文 + 识别时间) 交给各持久化出口。
+        实时翻译与补译的完成顺序不确定，按 task["seq"] (识别顺序) 缓冲重排后再写入。
+        """
+        if not self.final_sinks:
+            return
+        segment = {
+            "start": task.get("start_ts") or task["ts"], "end": task["ts"],
+            "text": task["text"],
+            "translation": None if not zh_text or zh_text.startswith("[Err") else zh_text,
+            "latency": done_time - task["ts"],
+        }
+        seq = task.get("seq")
+        with self._emit_lock:
+            if seq is None or seq < self._next_emit_seq:
+                # 已被强制跳过的编号迟到了：不再重排，直接写入
+                self._submit_final(segment)
+                return
+            self._pending_finals[seq] = segment
+            self._flush_finals()
+
+    def _flush_finals(self, force=False):
+        """
+        调用方持有 _emit_lock。按编号连续写出；缓冲超过上限 (某句异常丢失) 或 force (退出) 时跳过缺口。
+        """
+        while True:
+            segment = self._pending_finals.pop(self._next_emit_seq, None)
+            if segment is not None:
+                self._submit_final(segment)
+                self._next_emit_seq += 1
+                continue
+            if self._pending_finals and (force or len(self._pending_finals) > _MAX_PENDING_FINALS):
+                next_seq = min(self._pending_finals)
+                logger.warning(f"Finals #{self._next_emit_seq}-{next_seq - 1} never reached the sinks, skipped")
+                self._next_emit_seq = next_seq
+                continue
+            return
+
+    def _submit_final(self, segment):
+        for sink in self.final_sinks:
+            sink.submit(segment)
+
+    def _queue_backfill(self, task):
+        """
+        [主线程] 放入补译队列并唤醒翻译线程：队列为空时翻译线程阻塞在 trans_queue.get() 上，
+        不唤醒的话这条 Final 要等到下一个实时翻译任务才会写入出口。
+        """
+        self.final_backfill.put(task)
+        self.trans_queue.put(None)
+
+    def _process_final_backfill(self):
+        """
+        [翻译线程] 补译一条未显示译文的 Final，只写入持久化出口，不更新 UI。
+        这类文本通常已作为中间结果翻译过，多数直接命中翻译缓存。
+        """
+        try:
+            task = self.final_backfill.get_nowait()
+        except queue.Empty:
+            return
+        try:
+            # 与提前提交的伪 Final 一致时，按当时翻译的文本取译文 (命中缓存)
+            zh_text = self.translator.translate(task.get("translate_text", task["text"])) if self.translator else ""
+        except Exception as e:
+            logger.error(f"Final backfill failed: {e}")
+            zh_text = ""
+        self._emit_final(task, zh_text or "", time.time())
+
+    def _drain_final_backfill(self):
+        """
+        [新增] 退出时仍未补译 (或仍在翻译队列中) 的 Final 只写入原文 (不再等待网络翻译)，
+        在关闭出口之前调用，保证存档与字幕不缺句；随后按顺序写出缓冲中剩余的 Final。
+        """
+        count = 0
+        for pending in (self.trans_queue, self.final_backfill):
+            while True:
+                try:
+                    task = pending.get_nowait()
+                except queue.Empty:
+                    break
+                if task is not None and task.get("seq") is not None:
+                    self._emit_final(task, "", time.time())
+                    count += 1
+        with self._emit_lock:
+            self._flush_finals(force=True)
+        if count:
+            logger.info(f"Wrote {count} untranslated finals to sinks on shutdown")
+
+    def _translate_with_memory(self, text, trace_id):
+        """
+        [翻译线程] 先查翻译记忆：
+        - 相似度 >= accept_threshold：直接使用记忆中的译文，不发网络请求
+        - 相似度 >= provisional_threshold：先把记忆译文作为临时字幕显示，同时请求精确翻译
+        成功的翻译结果写回记忆。
+        """
+        tm = self.translation_memory
+        if tm is None:
+            return self.translator.translate(text)
+
+        accept_threshold = self.tm_cfg.get("accept_threshold", 0.95)
+        provisional_threshold = self.tm_cfg.get("provisional_threshold", 0.6)
+        lookup_start = time.perf_counter()
+        hit = tm.lookup(text, min_score=min(accept_threshold, provisional_threshold))
+        _tm_lookup_latency.observe(time.perf_counter() - lookup_start)
+
+        if hit and hit.score >= accept_threshold:
+            _tm_hits["accept"].inc()
+            tracer.mark(trace_id, "tm_accept", score=round(hit.score, 3))
+            return hit.translation
+
+        if hit and self.tm_cfg.get("provisional", True):
+            _tm_hits["provisional"].inc()
+            tracer.mark(trace_id, "tm_provisional", score=round(hit.score, 3))
+            provisional = f"{hit.translation} [≈]"
+            self.ui.root.after(0, lambda p=provisional: self.ui.update_chinese(p))
+        else:
+            _tm_hits["miss"].inc()
+
+        zh_text = self.translator.translate(text)
+        if zh_text and not zh_text.startswith("[Err"):
+            tm.add(text, zh_text)
+        return zh_text
+
+    def _render_translation(self, display_text, text, is_final, trace_id, event_ts=None, early=False):
+        """
+        [主线程] 渲染译文并记录渲染完成时间点
+        """
+        self.ui.update_translation(display_text, text, is_final)
+        tracer.mark(trace_id, "render")
+        if event_ts:
+            histogram = _early_latency if early else (_final_latency if is_final else _interim_latency)
+            histogram.observe(time.time() - event_ts)
+
+    def on_speech_result(self, text, is_final, meta=None):
+        meta = meta or {}
+        trace_id = meta.get("trace_id")
+        tracer.mark(trace_id, "enqueue")
+        # ts: 浏览器事件时间 (秒)，缺失时退化为入队时间
+        event_ts = meta["ts"] / 1000.0 if meta.get("ts") else time.time()
+        self.msg_queue.put({
+            "text": text, "is_final": is_final, "trace_id": trace_id, "ts": event_ts,
+            "stable_chars": meta.get("stable_chars"), "confidence": meta.get("confidence"),
+        })
 
     def process_queue(self):
         try:
@@ -271,11 +773,32 @@ class AppController:
                 msg = self.msg_queue.get_nowait()
                 text = msg["text"]
                 is_final = msg["is_final"]
+                trace_id = msg.get("trace_id")
+                tracer.mark(trace_id, "dequeue")
+
+                # 句首识别时间 (同一句第一条结果的浏览器时间戳)，用于存档与字幕的起始时间
+                if self._utterance_start_ts is None:
+                    self._utterance_start_ts = msg["ts"]
+                utterance_start_ts = self._utterance_start_ts
+                if is_final:
+                    self._utterance_start_ts = None
 
                 if is_final:
                     logger.info(f"Receive (Final): {text}")
                 else:
-                    logger.info(f"Receive (Interim): {text}")
+                    logger.info(f"Receive (Interim): {text}", extra={"category": "interim"})
+
+                # [新增] 早期断句对账：与提前提交的伪 Final 一致时复用其译文，不再触发翻译
+                endpoint_outcome = ""
+                if is_final:
+                    committed = self.endpointer.committed
+                    endpoint_outcome = self.endpointer.reconcile(text)
+                    if endpoint_outcome:
+                        _endpointing[endpoint_outcome].inc()
+                        tracer.mark(trace_id, "endpoint", outcome=endpoint_outcome)
+                else:
+                    self.endpointer.observe(text, msg["ts"], msg.get("stable_chars"))
+                    self._last_interim = (trace_id, msg["ts"])
                     
                 # [新增] 抢占式更新：一旦有语音进来，立即停止状态消息播放
                 if self.status_display_job:
@@ -288,50 +811,85 @@ class AppController:
 
                 # 1. 立即更新英文 UI
                 self.ui.update_english(text)
+                tracer.mark(trace_id, "render_en")
                 
-                # 2. 判断是否需要翻译
-                should_translate = False
-                trigger_reason = ""
-                current_time = time.time()
-                
-                # 只有当文本内容发生变化时才考虑翻译 (基本去重)
-                if text != self.last_english_text:
-                    if is_final:
-                        # 场景 1: Final 结果 -> 立即翻译 (绿色)
-                        should_translate = True
-                        trigger_reason = "[Final]"
-                        logger.info(f"\033[92mTrigger Translation (Final): {text}\033[0m")
-                    else:
-                        # 场景 2: Interim 结果 -> 混合策略 (青色)
-                        is_long_enough = len(text) >= self.interim_translate_trigger_threshold
-                        is_timeout = (current_time - self.last_translate_time) > self.interim_timeout
-                        
-                        # [Debounce] 计算距离上次翻译的时间
-                        time_since_last = current_time - self.last_translate_time
-
-                        if is_long_enough:
-                             # 只有当冷却时间已过，才允许触发长句中间翻译
-                             if time_since_last > self.interim_debounce_interval:
-                                 should_translate = True
-                                 trigger_reason = "[Len]"
-                                 logger.info(f"\033[93mTrigger Translation (Interim Length): {text}\033[0m")
-                        elif is_timeout and (len(text) >= self.interim_translate_min_threshold):
-                             should_translate = True
-                             trigger_reason = "[Time]"
-                             logger.info(f"\033[93mTrigger Translation (Interim Timeout): {text}\033[0m")
+                if endpoint_outcome == "confirmed":
+                    self.stability_gate.filter(text, is_final)  # 重置稳定性状态
+                    if self.final_sinks:
+                        task = {"text": text, "reason": "[Final]", "trace_id": trace_id, "ts": msg["ts"],
+                                "start_ts": utterance_start_ts, "seq": self._next_final_seq()}
+                        early_translation = self._early_translation
+                        if early_translation and early_translation[0] == committed:
+                            # 伪 Final 已翻译并显示：直接用其译文写入出口，不再重新翻译
+                            self._emit_final(task, early_translation[1], time.time())
+                        else:
+                            # 伪 Final 的翻译仍在途或失败：按提交时的文本补译 (多数命中缓存)
+                            task["translate_text"] = committed
+                            self._queue_backfill(task)
+                    continue
+
+                # 2. 判断是否需要翻译 (interim 先经过稳定性门控，只考虑稳定前缀)
+                candidate = self.stability_gate.filter(text, is_final, msg.get("stable_chars"), msg.get("confidence"))
+                trigger_reason = self.trigger_policy.decide(candidate, is_final, time.time()) if candidate else ""
+                tracer.mark(trace_id, "trigger", reason=trigger_reason or "skip")
 
                 # 3. 提交翻译任务
-                if should_translate:
-                    self.trans_queue.put((text, trigger_reason))
-                    self.last_translate_time = current_time
-                    self.last_english_text = text
+                if trigger_reason:
+                    _triggers[trigger_reason].inc()
+                    task = {"text": candidate, "reason": trigger_reason, "trace_id": trace_id,
+                            "ts": msg["ts"], "start_ts": utterance_start_ts}
+                    if is_final and self.final_sinks:
+                        task["seq"] = self._next_final_seq()
+                    self.trans_queue.put(task)
+                elif is_final and candidate:
+                    task = {"text": candidate, "reason": "[Final]", "trace_id": trace_id,
+                            "ts": msg["ts"], "start_ts": utterance_start_ts}
+                    if self.final_sinks:
+                        task["seq"] = self._next_final_seq()
+                    if self._promote_inflight(task):
+                        tracer.mark(trace_id, "attach_inflight")
+                    elif self.final_sinks:
+                        # 与上次翻译文本相同的 Final 不再显示，但仍需写入存档
+                        self._queue_backfill(task)
 
         except queue.Empty:
             pass
-        
+
+        self._poll_endpointer()
         self.ui.root.after(100, self.process_queue)
 
+    def _next_final_seq(self):
+        """[主线程] 写入出口的 Final 按识别顺序编号"""
+        seq = self._final_seq
+        self._final_seq += 1
+        return seq
+
+    def _poll_endpointer(self):
+        """
+        [新增] [主线程] 最后一条中间结果停顿足够久且已稳定时，提前把它作为 Final 提交翻译 (task["early"])，
+        译文进入历史记录；真正的 Final 到达后在 process_queue 中对账。
+        """
+        text = self.endpointer.poll(time.time())
+        if not text or self._last_interim is None:
+            return
+        _endpointing["committed"].inc()
+        trace_id, event_ts = self._last_interim
+        tracer.mark(trace_id, "early_commit")
+        trigger_reason = self.trigger_policy.decide(text, True, time.time())
+        task = {"text": text, "reason": trigger_reason or "[Final]", "trace_id": trace_id, "ts": event_ts,
+                "start_ts": self._utterance_start_ts, "early": True}
+        if trigger_reason:
+            _triggers[trigger_reason].inc()
+            self.trans_queue.put(task)
+        elif self._promote_inflight(task):
+            tracer.mark(trace_id, "attach_inflight")
+
     def run(self):
+        if self.metrics_server:
+            self.metrics_server.start()
+        if self.config_watcher:
+            self.config_watcher.start()
+
         # 启动后台线程加载重型服务
         threading.Thread(target=self._load_services, daemon=True).start()
         
@@ -345,9 +903,20 @@ class AppController:
             pass
         finally:
             logger.info("Shutting down...")
+            self._export_trace()
+            if self.config_watcher:
+                self.config_watcher.stop()
+            if self.profiler:
+                self.profiler.stop()
+            self.trigger_policy.close()
+            self._drain_final_backfill()
+            self._close_final_sinks()
             if self.speech_service:
                 self.speech_service.stop()
+            if hasattr(self.translator, "stop"):
+                self.translator.stop()
             logger.info("Cleanup complete. Force exiting.")
+            _stop_logging()
             os._exit(0)
 
 if __name__ == "__main__":
@@ -0,0 +1,291 @@
+import hmac
+import time
+import logging
+import threading
+import http.server
+from bisect import bisect_left
+
+logger = logging.getLogger("Metrics")
+
+# 默认延迟直方图分桶 (秒)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{v}"' for k, v in labels)
+    return "{" + inner + "}"
+
+
+class _ThreadCells:
+    """
+    按线程分片的计数单元。
+    每个线程首次写入时分配一个自己的 list，之后只有该线程写它 (单写者)，
+    因此热路径上无需加锁，也不会因为 GIL 切换丢失自增；读取时再把所有分片求和。
+    已退出线程的分片不会再被写入，在新线程注册或读取时并入 _base 后释放，
+    短生命周期线程 (线程池、Timer、HTTP 请求线程) 不会让分片无限累积。
+    """
+    def __init__(self, size):
+        self._size = size
+        self._local = threading.local()
+        self._cells = []  # [(thread, cell)]
+        self._base = [0] * size
+        self._lock = threading.Lock()
+
+    def cell(self):
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = [0] * self._size
+            self._local.cell = cell
+            with self._lock:
+                self._fold_dead()
+                self._cells.append((threading.current_thread(), cell))
+            return cell
+
+    def _fold_dead(self):
+        """调用方持有 _lock"""
+        alive = []
+        for thread, cell in self._cells:
+            if thread.is_alive():
+                alive.append((thread, cell))
+            else:
+                for i, v in enumerate(cell):
+                    self._base[i] += v
+        self._cells = alive
+
+    def totals(self):
+        with self._lock:
+            self._fold_dead()
+            totals = list(self._base)
+            cells = [cell for _, cell in self._cells]
+        for cell in cells:
+            for i, v in enumerate(cell):
+                totals[i] += v
+        return totals
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._cells = _ThreadCells(1)
+
+    def inc(self, n=1):
+        self._cells.cell()[0] += n
+
+    def value(self):
+        return self._cells.totals()[0]
+
+    def samples(self):
+        yield self.name, self.labels, self.value()
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.bounds = tuple(buckets)
+        # 分片布局: [各桶计数..., +Inf 桶计数, 观测值总和]
+        self._cells = _ThreadCells(len(self.bounds) + 2)
+
+    def observe(self, value):
+        cell = self._cells.cell()
+        cell[bisect_left(self.bounds, value)] += 1
+        cell[-1] += value
+
+    def samples(self):
+        totals = self._cells.totals()
+        cumulative = 0
+        for bound, count in zip(self.bounds, totals):
+            cumulative += count
+            yield f"{self.name}_bucket", self.labels + (("le", repr(float(bound))),), cumulative
+        cumulative += totals[len(self.bounds)]
+        yield f"{self.name}_bucket", self.labels + (("le", "+Inf"),), cumulative
+        yield f"{self.name}_sum", self.labels, totals[-1]
+        yield f"{self.name}_count", self.labels, cumulative
+
+
+class Gauge:
+    """
+    瞬时值。可以直接 set()，也可以传入 func 在抓取时回调取值 (热路径零开销，适合队列深度等)。
+    kind 可设为 "counter"，用于暴露由其它组件自行累计的单调计数 (例如 lru_cache 的命中数)。
+    """
+    def __init__(self, name, help_text, labels=(), func=None, kind="gauge"):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.kind = kind
+        self._func = func
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    def value(self):
+        if self._func is None:
+            return self._value
+        try:
+            return self._func()
+        except Exception:
+            return float("nan")
+
+    def samples(self):
+        yield self.name, self.labels, self.value()
+
+
+class RateMeter:
+    """
+    抓取时根据计数器的增量计算每秒速率 (两次抓取之间的平均值)。
+    """
+    def __init__(self, counter):
+        self._counter = counter
+        self._last_value = counter.value()
+        self._last_time = time.monotonic()
+
+    def __call__(self):
+        now = time.monotonic()
+        value = self._counter.value()
+        elapsed = now - self._last_time
+        rate = (value - self._last_value) / elapsed if elapsed > 0 else 0.0
+        self._last_value, self._last_time = value, now
+        return rate
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}  # (name, labels) -> metric
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, labels, **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = cls(name, help_text, labels=key[1], **kwargs)
+                self._metrics[key] = metric
+            return metric
+
+    def counter(self, name, help_text, **labels):
+        return self._get_or_create(Counter, name, help_text, labels)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS, **labels):
+        return self._get_or_create(Histogram, name, help_text, labels, buckets=buckets)
+
+    def gauge(self, name, help_text, func=None, kind="gauge", **labels):
+        gauge = self._get_or_create(Gauge, name, help_text, labels, kind=kind)
+        if func is not None:
+            gauge._func = func
+        return gauge
+
+    def render(self):
+        """生成 Prometheus text exposition (0.0.4) 格式文本"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: (m.name, m.labels))
+        lines = []
+        last_name = None
+        for metric in metrics:
+            if metric.name != last_name:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                last_name = metric.name
+            for sample_name, labels, value in metric.samples():
+                lines.append(f"{sample_name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """
+    本地 HTTP 端点 (默认仅监听 127.0.0.1)，/metrics 输出 Prometheus 文本格式。
+    其他模块可通过 add_route() 挂载额外的端点：GET 只用于只读端点；会改变状态的端点用 POST，
+    并要求请求头 X-Debug-Token 与 token 一致 (浏览器页面无法跨域附带自定义请求头，
+    <img> / 表单 / 简单 fetch 都不能触发)，带 Origin 的跨站请求一律拒绝。
+    """
+    def __init__(self, registry, host="127.0.0.1", port=9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._routes = {("GET", "/metrics"): (self._metrics_route, None)}
+        self._httpd = None
+
+    def _metrics_route(self):
+        return "text/plain; version=0.0.4; charset=utf-8", self.registry.render().encode("utf-8")
+
+    def add_route(self, path, func, method="GET", token=None):
+        """
+        func() -> (content_type, body_bytes)
+        :param token: 非空时请求必须带 X-Debug-Token 请求头且与之相同 (用于 POST 端点)
+        """
+        self._routes[(method, path)] = (func, token)
+
+    def start(self):
+        routes = self._routes
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def _dispatch(self, method):
+                path = self.path.split("?")[0]
+                route = routes.get((method, path))
+                if route is None:
+                    allowed = any(p == path for _, p in routes)
+                    self.send_error(405 if allowed else 404)
+                    return
+                func, token = route
+                if token is not None:
+                    origin = self.headers.get("Origin")
+                    if origin and origin != f"http://{self.headers.get('Host', '')}":
+                        self.send_error(403, "Cross-origin request rejected")
+                        return
+                    if not hmac.compare_digest(self.headers.get("X-Debug-Token", ""), token):
+                        self.send_error(403, "Missing or invalid X-Debug-Token")
+                        return
+                if method == "POST":
+                    # 不使用请求体，读掉以免连接残留数据
+                    length = int(self.headers.get("Content-Length") or 0)
+                    if length:
+                        self.rfile.read(length)
+                try:
+                    content_type, body = func()
+                except Exception as e:
+                    logger.error(f"Metrics route {self.path} failed: {e}", exc_info=True)
+                    self.send_error(500)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            self._httpd = http.server.ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            logger.error(f"Metrics port {self.port} is busy: {e}")
+            return False
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, name="MetricsServer", daemon=True).start()
+        logger.info(f"Metrics endpoint on http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+
+
+# 全局注册表，各模块在导入时声明自己的指标
+registry = MetricsRegistry()
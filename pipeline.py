@@ -0,0 +1,382 @@
+import os
+import re
+import json
+import logging
+import threading
+
+from translation_memory import normalize
+
+logger = logging.getLogger("Pipeline")
+
+
+class DecisionLog:
+    """
+    触发决策日志 (JSONL)，每次 interim/final 判定一行，便于事后回放对照。
+    调用方为 UI 线程，文件写入走缓冲，按条数批量 flush。
+    """
+    def __init__(self, path, flush_every=50):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._pending = 0
+        self.flush_every = flush_every
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self._file.flush()
+            self._pending = 0
+
+    def close(self):
+        self._file.close()
+
+
+# 与 speech_worker 页面中的 STABLE_TOKEN_RE 保持一致：CJK 按字切分，其余按空白切分
+_STABLE_TOKEN_RE = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]|[^\s\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]+")
+
+
+class StabilityTracker:
+    """
+    稳定前缀估计 (页面端 stablePrefixChars 的 Python 版本)。
+    从句首开始，连续 revisions 次修订都未变化的词视为稳定，返回稳定前缀的字符长度。
+    仅在消息未携带 stable_chars 时使用 (旧版页面或旧录制文件)。
+    """
+    def __init__(self, revisions=2):
+        self.revisions = revisions
+        self.reset()
+
+    def reset(self):
+        self._prev_tokens = []
+        self._ages = []
+
+    def update(self, text):
+        matches = list(_STABLE_TOKEN_RE.finditer(text))
+        ages = []
+        stable_end = 0
+        stable_run = True
+        for k, m in enumerate(matches):
+            tok = m.group(0)
+            unchanged = (k < len(self._prev_tokens) and self._prev_tokens[k] == tok
+                         and (k == 0 or ages[k - 1] > 0))
+            ages.append(self._ages[k] + 1 if unchanged else 0)
+            if stable_run and ages[k] >= self.revisions:
+                stable_end = m.end()
+            else:
+                stable_run = False
+        self._prev_tokens = [m.group(0) for m in matches]
+        self._ages = ages
+        return stable_end
+
+
+class StabilityGate:
+    """
+    中间结果的置信度/稳定性门控：
+    - 置信度已知且低于 min_confidence 的 interim 不翻译
+    - 只把稳定前缀交给触发策略，易变的句尾等下一次修订或 Final 再翻译
+    Final 原样通过，并重置稳定性状态。
+    """
+    def __init__(self, trans_cfg: dict):
+        stability_cfg = trans_cfg.get("stability", {})
+        self.enabled = stability_cfg.get("enabled", True)
+        self.min_confidence = stability_cfg.get("min_confidence", 0.0)
+        self.tracker = StabilityTracker(stability_cfg.get("revisions", 2))
+
+    def filter(self, text, is_final, stable_chars=None, confidence=None):
+        """返回应参与翻译判定的文本，空字符串表示本条不翻译"""
+        if is_final:
+            self.tracker.reset()
+            return text
+        if not self.enabled:
+            return text
+        if confidence and confidence < self.min_confidence:
+            return ""
+        if stable_chars is None:
+            stable_chars = self.tracker.update(text)
+        return text[:stable_chars].rstrip()
+
+
+_SENTENCE_END_RE = re.compile(r"[.!?。！？]\s*$")
+
+
+class Endpointer:
+    """
+    早期断句 (伪 Final)：Chrome 在说话人停顿后往往还要等一秒以上才给出 isFinal。
+    最后一条中间结果在 pause 秒内没有再变化 (以句末标点结尾时只等 punctuation_pause)、
+    且稳定前缀覆盖足够比例的文本时，由 poll() 返回该文本，调用方把它当作 Final 提前提交翻译与历史记录；
+    真正的 Final 到达时 reconcile() 对账：归一化后 (忽略大小写/标点) 相同则复用已提交的译文，不同则按正常 Final 处理。
+    时间由调用方传入，回放基准在虚拟时钟下复用同一实现。
+    """
+    def __init__(self, trans_cfg: dict):
+        cfg = trans_cfg.get("endpointing", {})
+        self.enabled = cfg.get("enabled", True)
+        self.pause = cfg.get("pause_ms", 700) / 1000.0
+        self.punctuation_pause = cfg.get("punctuation_pause_ms", 350) / 1000.0
+        self.min_chars = cfg.get("min_chars", 8)
+        self.min_stable_ratio = cfg.get("min_stable_ratio", 0.5)
+        self.reset()
+
+    def reset(self):
+        self._text = ""
+        self._changed_at = None
+        self._stable_chars = None
+        self.committed = ""
+
+    def observe(self, text, current_time, stable_chars=None):
+        """记录一条中间结果；文本变化即重新计时，之前提前提交的文本作废"""
+        if not self.enabled:
+            return
+        if text != self._text:
+            self._text = text
+            self._changed_at = current_time
+            self.committed = ""
+        self._stable_chars = stable_chars
+
+    def due_time(self):
+        """当前文本可以提前提交的时刻，不满足条件时返回 None"""
+        text = self._text
+        if not self.enabled or not text or self.committed or len(text.strip()) < self.min_chars:
+            return None
+        if self._stable_chars is not None and self._stable_chars < len(text) * self.min_stable_ratio:
+            return None
+        pause = self.punctuation_pause if _SENTENCE_END_RE.search(text) else self.pause
+        return self._changed_at + pause
+
+    def poll(self, current_time):
+        """到期时返回应提前提交的文本 (每段文本只返回一次)，否则返回空字符串"""
+        due = self.due_time()
+        if due is None or current_time < due:
+            return ""
+        self.committed = self._text
+        return self.committed
+
+    def reconcile(self, final_text):
+        """
+        真正的 Final 到达时调用并重置状态：
+        返回 "confirmed" (与提前提交的文本一致) / "revised" (不一致) / "" (本句没有提前提交)
+        """
+        committed = self.committed
+        self.reset()
+        if not committed:
+            return ""
+        return "confirmed" if normalize(committed) == normalize(final_text) else "revised"
+
+
+class TriggerPolicy:
+    """
+    触发策略基类。
+    decide() 在 UI 线程调用；on_task_finished() 由翻译线程在任务完成或被 Latest-Win 丢弃时回调，
+    自适应策略据此统计后端延迟和在途请求数。
+    """
+    name = ""
+
+    def __init__(self, trans_cfg: dict):
+        self.decision_log = None
+        log_path = trans_cfg.get("trigger_decision_log")
+        if log_path:
+            self.decision_log = DecisionLog(log_path)
+
+    def decide(self, text, is_final, current_time):
+        raise NotImplementedError
+
+    def on_task_finished(self, reason, latency, current_time):
+        """latency 为 None 表示任务被丢弃，未实际翻译"""
+        pass
+
+    def close(self):
+        if self.decision_log is not None:
+            self.decision_log.close()
+            self.decision_log = None
+
+    def _log_decision(self, current_time, text, is_final, reason, **state):
+        if self.decision_log is None:
+            return
+        record = {"t": current_time, "policy": self.name, "is_final": is_final,
+                  "chars": len(text), "reason": reason}
+        record.update(state)
+        self.decision_log.write(record)
+
+
+class StaticTriggerPolicy(TriggerPolicy):
+    """
+    中间结果翻译触发策略 (原 AppController.process_queue 中的固定阈值规则)：
+    - Final 结果：只要文本变化就立即翻译
+    - Interim 长句：长度达到 trigger_threshold 且距上次翻译超过 debounce 间隔
+    - Interim 停顿：距上次翻译超过 timeout 且长度达到 min_threshold
+    时间由调用方传入，便于回放基准在虚拟时钟下复用同一套逻辑。
+    """
+    name = "static"
+
+    def __init__(self, trans_cfg: dict):
+        super().__init__(trans_cfg)
+        self.interim_translate_trigger_threshold = trans_cfg.get("interim_translate_trigger_threshold", 50)
+        self.interim_translate_min_threshold = trans_cfg.get("interim_translate_min_threshold", 20)
+        self.interim_timeout = trans_cfg.get("interim_translate_timeout", 2.0)
+        self.interim_debounce_interval = trans_cfg.get("interim_debounce_interval", 1.0) # [新增] 冷却时间
+
+        # 状态追踪
+        self.last_translate_time = 0
+        self.last_english_text = ""
+
+    def decide(self, text, is_final, current_time):
+        """
+        判断是否需要翻译，返回触发原因 ("[Final]" / "[Len]" / "[Time]")，不需要时返回空字符串。
+        返回非空时视为任务已提交，内部状态随之更新。
+        """
+        trigger_reason = ""
+
+        # 只有当文本内容发生变化时才考虑翻译 (基本去重)
+        if text != self.last_english_text:
+            if is_final:
+                # 场景 1: Final 结果 -> 立即翻译 (绿色)
+                trigger_reason = "[Final]"
+                logger.info(f"\033[92mTrigger Translation (Final): {text}\033[0m")
+            else:
+                # 场景 2: Interim 结果 -> 混合策略 (青色)
+                is_long_enough = len(text) >= self.interim_translate_trigger_threshold
+                is_timeout = (current_time - self.last_translate_time) > self.interim_timeout
+
+                # [Debounce] 计算距离上次翻译的时间
+                time_since_last = current_time - self.last_translate_time
+
+                if is_long_enough:
+                    # 只有当冷却时间已过，才允许触发长句中间翻译
+                    if time_since_last > self.interim_debounce_interval:
+                        trigger_reason = "[Len]"
+                        logger.info(f"\033[93mTrigger Translation (Interim Length): {text}\033[0m", extra={"category": "trigger"})
+                elif is_timeout and (len(text) >= self.interim_translate_min_threshold):
+                    trigger_reason = "[Time]"
+                    logger.info(f"\033[93mTrigger Translation (Interim Timeout): {text}\033[0m", extra={"category": "trigger"})
+
+        if trigger_reason:
+            self.last_translate_time = current_time
+            self.last_english_text = text
+        self._log_decision(current_time, text, is_final, trigger_reason)
+        return trigger_reason
+
+
+class AdaptiveTriggerPolicy(TriggerPolicy):
+    """
+    根据实测翻译延迟和语速动态调整触发条件的策略：
+    - 用 EWMA 跟踪后端翻译延迟 L 和语速 R (字符/秒)
+    - 两次中间翻译的最小间隔 interval = L * latency_factor (限制在 [min_interval, max_interval])，
+      后端变慢时自动退避，变快时更积极
+    - 长度触发阈值 = 这段间隔内预计新增的字符数 R * interval (限制在 [min_threshold, trigger_threshold])
+    - 同一时刻最多只有 max_inflight 个中间翻译在途，Final 不受限制
+    """
+    name = "adaptive"
+
+    def __init__(self, trans_cfg: dict):
+        super().__init__(trans_cfg)
+        adaptive_cfg = trans_cfg.get("adaptive", {})
+        self.min_chars = trans_cfg.get("interim_translate_min_threshold", 20)
+        self.max_chars = trans_cfg.get("interim_translate_trigger_threshold", 50)
+        self.alpha = adaptive_cfg.get("ewma_alpha", 0.3)
+        self.latency_factor = adaptive_cfg.get("latency_factor", 1.5)
+        self.min_interval = adaptive_cfg.get("min_interval", 0.3)
+        self.max_interval = adaptive_cfg.get("max_interval", 4.0)
+        self.timeout_factor = adaptive_cfg.get("timeout_factor", 2.0)
+        self.max_inflight = adaptive_cfg.get("max_inflight", 1)
+
+        self.ewma_latency = adaptive_cfg.get("initial_latency", 0.5)
+        self.speech_rate = adaptive_cfg.get("initial_speech_rate", 12.0)
+        self.inflight_interims = 0
+        self._lock = threading.Lock()
+
+        self.last_translate_time = 0
+        self.last_english_text = ""
+        self._last_interim_len = 0
+        self._last_interim_time = None
+
+    @property
+    def interval(self):
+        return min(self.max_interval, max(self.min_interval, self.ewma_latency * self.latency_factor))
+
+    @property
+    def length_threshold(self):
+        return min(self.max_chars, max(self.min_chars, self.speech_rate * self.interval))
+
+    def _update_speech_rate(self, text, current_time):
+        length = len(text)
+        if self._last_interim_time is not None and length > self._last_interim_len:
+            dt = current_time - self._last_interim_time
+            if dt > 0.05:
+                sample = (length - self._last_interim_len) / dt
+                self.speech_rate += self.alpha * (sample - self.speech_rate)
+        self._last_interim_len = length
+        self._last_interim_time = current_time
+
+    def decide(self, text, is_final, current_time):
+        trigger_reason = ""
+        skip_reason = ""
+        if is_final:
+            # 新的一句从零开始计算语速增量
+            self._last_interim_len = 0
+            self._last_interim_time = None
+        else:
+            self._update_speech_rate(text, current_time)
+
+        interval = self.interval
+        length_threshold = self.length_threshold
+        if text == self.last_english_text:
+            skip_reason = "unchanged"
+        elif is_final:
+            trigger_reason = "[Final]"
+            logger.info(f"\033[92mTrigger Translation (Final): {text}\033[0m")
+        elif self.inflight_interims >= self.max_inflight:
+            skip_reason = "inflight"
+        else:
+            time_since_last = current_time - self.last_translate_time
+            # 相对上次已翻译文本的新增字符数 (同一句的延续只算增量)
+            if text.startswith(self.last_english_text):
+                new_chars = len(text) - len(self.last_english_text)
+            else:
+                new_chars = len(text)
+
+            if time_since_last < interval:
+                skip_reason = "interval"
+            elif new_chars >= length_threshold:
+                trigger_reason = "[Len]"
+                logger.info(f"\033[93mTrigger Translation (Adaptive Length {length_threshold:.0f}): {text}\033[0m", extra={"category": "trigger"})
+            elif time_since_last > interval * self.timeout_factor and len(text) >= self.min_chars:
+                trigger_reason = "[Time]"
+                logger.info(f"\033[93mTrigger Translation (Adaptive Timeout {interval * self.timeout_factor:.1f}s): {text}\033[0m", extra={"category": "trigger"})
+            else:
+                skip_reason = "short"
+
+        if trigger_reason:
+            self.last_translate_time = current_time
+            self.last_english_text = text
+            if not is_final:
+                with self._lock:
+                    self.inflight_interims += 1
+
+        self._log_decision(current_time, text, is_final, trigger_reason, skip=skip_reason,
+                           interval=round(interval, 3), length_threshold=round(length_threshold, 1),
+                           ewma_latency=round(self.ewma_latency, 3), speech_rate=round(self.speech_rate, 2),
+                           inflight=self.inflight_interims)
+        return trigger_reason
+
+    def on_task_finished(self, reason, latency, current_time):
+        with self._lock:
+            if reason != "[Final]" and self.inflight_interims > 0:
+                self.inflight_interims -= 1
+            if latency is not None:
+                self.ewma_latency += self.alpha * (latency - self.ewma_latency)
+
+
+TRIGGER_POLICIES = {
+    StaticTriggerPolicy.name: StaticTriggerPolicy,
+    AdaptiveTriggerPolicy.name: AdaptiveTriggerPolicy,
+}
+
+
+def create_trigger_policy(trans_cfg: dict):
+    """根据 translation.trigger_policy 配置创建触发策略"""
+    name = trans_cfg.get("trigger_policy", StaticTriggerPolicy.name)
+    policy_cls = TRIGGER_POLICIES.get(name)
+    if policy_cls is None:
+        logger.warning(f"Unknown trigger policy '{name}', falling back to '{StaticTriggerPolicy.name}'")
+        policy_cls = StaticTriggerPolicy
+    return policy_cls(trans_cfg)
@@ -0,0 +1,220 @@
+"""
+翻译缓存预热：活动开始前，把已知的讲稿、幻灯片文本切分成可能的语句，批量翻译后写入缓存，
+现场第一次说到这些句子时就不用再等网络翻译。
+
+流程：读取文本文件 -> 切分为语句 (整句 + 长句按逗号拆出的分句) -> 并发翻译 (并发数与每秒请求数均有上限，
+走与实时模式相同的 ITranslator 翻译链，含术语表) -> 写入种子文件 (启动时载入翻译记忆)；
+开启 shared_cache 时译文同时回写共享缓存服务。
+
+预测命中率：传入之前录制的识别事件 (capture) 时，用种子构建翻译记忆并回放其中的 Final 语句，
+统计可直接复用 (accept) 与可作为临时字幕 (provisional) 的比例。
+
+用法:
+    python preseed_cache.py talk_script.txt slides.md --concurrency 4 --rate 5
+    python preseed_cache.py script.txt --capture captures/rehearsal.jsonl   # 附带预测命中率
+"""
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from translation_memory import TranslationMemory, normalize
+
+logger = logging.getLogger("Preseed")
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?。！？])\s+|\n+")
+_CLAUSE_RE = re.compile(r"(?<=[,;:，；：])\s*")
+_MARKUP_RE = re.compile(r"^\s*(?:[#>*\-+]+|\d+[.)])\s*")  # Markdown 标题/列表/引用标记
+_SUBTITLE_LINE_RE = re.compile(r"^\s*(?:\d+|WEBVTT.*|[\d:.,]+\s*-->\s*[\d:.,]+.*)\s*$")
+
+
+def read_text(path):
+    """读取文本；SRT / WebVTT 去掉序号与时间轴行"""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        lines = f.read().splitlines()
+    if path.lower().endswith((".srt", ".vtt")):
+        lines = [line for line in lines if not _SUBTITLE_LINE_RE.match(line)]
+    return "\n".join(_MARKUP_RE.sub("", line) for line in lines)
+
+
+def segment_text(text, min_words=3, max_words=30):
+    """
+    切分为可能的识别语句：按句末标点和换行断句；超过 max_words 的长句再按逗号/分号拆成分句
+    (识别器常在这些停顿处给出 Final)。少于 min_words 个词的片段跳过。返回去重后的列表 (保持原顺序)。
+    """
+    seen = set()
+    segments = []
+
+    def emit(candidate):
+        candidate = " ".join(candidate.split())
+        key = normalize(candidate)
+        if len(key.split()) >= min_words and key not in seen:
+            seen.add(key)
+            segments.append(candidate)
+
+    for sentence in _SENTENCE_RE.split(text):
+        words = sentence.split()
+        if not words:
+            continue
+        emit(sentence)
+        if len(words) > max_words:
+            for clause in _CLAUSE_RE.split(sentence):
+                emit(clause)
+    return segments
+
+
+class RateLimiter:
+    """令牌桶：平均每秒 rate 次，允许 burst 次突发"""
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate or self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def load_seed_file(path):
+    """种子文件为 TSV：原文<TAB>译文；返回 {原文: 译文}"""
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            source, sep, translation = line.rstrip("\n").partition("\t")
+            if sep and source and translation:
+                entries[source] = translation
+    return entries
+
+
+def project_hit_rate(entries, capture_path, accept_threshold, provisional_threshold):
+    """用种子构建翻译记忆，回放录制中的 Final 语句，返回 (finals, accept, provisional)"""
+    from capture import load_capture
+    tm = TranslationMemory(max(len(entries), 1))
+    for source, translation in entries.items():
+        tm.add(source, translation)
+    finals = [e["text"] for e in load_capture(capture_path) if e.get("is_final") and e.get("text", "").strip()]
+    accept = provisional = 0
+    for text in finals:
+        hit = tm.lookup(text, min_score=provisional_threshold)
+        if hit and hit.score >= accept_threshold:
+            accept += 1
+        elif hit:
+            provisional += 1
+    return len(finals), accept, provisional
+
+
+def _find_layer(translator, attr):
+    """沿装饰器链 (.inner) 查找带有指定方法的一层"""
+    while translator is not None:
+        if hasattr(translator, attr):
+            return translator
+        translator = getattr(translator, "inner", None)
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-translate known scripts/slides into the translation cache")
+    parser.add_argument("inputs", nargs="+", help="text files (.txt/.md/.srt/.vtt)")
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--seed-file", help="output TSV (default: translation_memory.seed_file or translation_seed.tsv)")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent translation requests")
+    parser.add_argument("--rate", type=float, default=5.0, help="max requests per second (0 = unlimited)")
+    parser.add_argument("--min-words", type=int, default=3)
+    parser.add_argument("--max-words", type=int, default=30, help="split longer sentences at commas as well")
+    parser.add_argument("--capture", help="recorded speech events (capture JSONL) to project the hit rate")
+    parser.add_argument("--dry-run", action="store_true", help="only print the segments")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    config = {}
+    if os.path.exists(args.config):
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    tm_cfg = config.get("translation_memory", {})
+    seed_path = args.seed_file or tm_cfg.get("seed_file") or "translation_seed.tsv"
+
+    segments = []
+    for path in args.inputs:
+        segments.extend(segment_text(read_text(path), args.min_words, args.max_words))
+    segments = list(dict.fromkeys(segments))
+    if args.dry_run:
+        print("\n".join(segments))
+        return 0
+
+    existing = load_seed_file(seed_path)
+    known = {normalize(source) for source in existing}
+    todo = [s for s in segments if normalize(s) not in known]
+    print(f"segments:     {len(segments)} from {len(args.inputs)} files, {len(segments) - len(todo)} already seeded")
+
+    added = {}
+    failed = 0
+    if todo:
+        from translator_service import create_translator
+        translator = create_translator(config)
+        limiter = RateLimiter(args.rate, burst=args.concurrency)
+
+        def work(text):
+            limiter.acquire()
+            return text, translator.translate(text)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+            for done, (text, result) in enumerate(pool.map(work, todo), 1):
+                if result and not result.startswith("[Err"):
+                    added[text] = result
+                else:
+                    failed += 1
+                if done % 50 == 0:
+                    print(f"  {done}/{len(todo)}", file=sys.stderr)
+        elapsed = time.perf_counter() - start
+        print(f"translated:   {len(added)} added, {failed} failed in {elapsed:.1f}s "
+              f"({len(todo) / elapsed:.1f} req/s, concurrency {args.concurrency}, rate limit {args.rate or '-'}/s)")
+
+        cache = _find_layer(translator, "flush")
+        if cache is not None:
+            cache.flush()
+            print("shared cache: written back")
+        if hasattr(translator, "stop"):
+            translator.stop()
+
+        if added:
+            with open(seed_path, "a", encoding="utf-8") as f:
+                for source, translation in added.items():
+                    f.write(f"{source}\t{translation}\n")
+    print(f"seed file:    {seed_path} ({len(existing) + len(added)} entries)")
+
+    if args.capture:
+        entries = {**existing, **added}
+        finals, accept, provisional = project_hit_rate(entries, args.capture, tm_cfg.get("accept_threshold", 0.95),
+                                                       tm_cfg.get("provisional_threshold", 0.6))
+        if finals:
+            print(f"projected:    {accept / finals:.1%} of {finals} finals reused directly, "
+                  f"{provisional / finals:.1%} more shown provisionally")
+        else:
+            print("projected:    no final results in capture")
+    return 0 if not failed or added else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+运行时按需性能剖析：不重启进程，在卡顿发生时直接对正在运行的悬浮窗采样。
+
+- CPU：采样线程按固定间隔读取 sys._current_frames()，覆盖全部线程 (Tk 主线程、WS 事件循环、翻译线程、
+  HTTP 服务等)，停止时输出 collapsed stack 文本 (每行 "线程;帧;帧 次数")，
+  可直接用 flamegraph.pl、speedscope (https://www.speedscope.app) 或 inferno 生成火焰图
+- 内存：tracemalloc 快照保存为 .snap (Snapshot.dump，可用本模块 diff 子命令离线比较)，
+  同时输出按分配位置排序的文本，以及与上一次快照的差异文本
+- 未开启时没有采样线程，也不启用 tracemalloc，对运行中的管线零开销；
+  tracemalloc 在第一次请求快照时才启动，stop_heap() 可关闭
+
+控制入口：悬浮窗快捷键 (profiling.hotkeys) 与指标端点上的 /debug/* 路由 (见 ProfilerControl.routes)。
+/debug/* 只接受 POST，且需带本次运行的令牌 (启动时写入 output_dir/debug_token):
+    curl -X POST -H "X-Debug-Token: $(cat profiles/debug_token)" http://127.0.0.1:9108/debug/profile/start
+
+离线比较两次快照:
+    python profiler.py diff profiles/heap_1.snap profiles/heap_2.snap --top 30
+"""
+import os
+import sys
+import time
+import secrets
+import logging
+import argparse
+import itertools
+import threading
+import tracemalloc
+from collections import Counter
+
+from metrics import registry
+
+logger = logging.getLogger("Profiler")
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class SamplingProfiler:
+    """全线程栈采样；相同的 (线程, 调用栈) 累加计数"""
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = Counter()
+        self.sample_count = 0
+        self.started_at = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self.samples = Counter()
+        self.sample_count = 0
+        self.started_at = time.time()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="Profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def write_collapsed(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def write_snapshot_stats(snapshot, path, top=50, previous=None):
+    """把快照 (或与上一次快照的差异) 按分配位置排序写成文本"""
+    with open(path, "w", encoding="utf-8") as f:
+        if previous is None:
+            stats = snapshot.statistics("lineno")
+            total = sum(stat.size for stat in stats)
+            f.write(f"total {total / 1048576:.2f} MB in {len(stats)} allocation sites\n\n")
+            for stat in stats[:top]:
+                f.write(f"{stat.size / 1024:10.1f} KB {stat.count:8d} blocks  {stat.traceback}\n")
+        else:
+            stats = snapshot.compare_to(previous, "lineno")
+            f.write(f"growth since previous snapshot, top {top} sites\n\n")
+            for stat in stats[:top]:
+                f.write(f"{stat.size_diff / 1024:+10.1f} KB {stat.count_diff:+8d} blocks  "
+                        f"(now {stat.size / 1024:.1f} KB)  {stat.traceback}\n")
+
+
+class ProfilerControl:
+    """CPU 采样与内存快照的开关；所有输出写入 output_dir，文件名带时间戳"""
+    def __init__(self, cfg: dict):
+        self.output_dir = cfg.get("output_dir", "profiles")
+        self.interval = cfg.get("interval_ms", 5) / 1000.0
+        self.max_seconds = cfg.get("max_seconds", 300)
+        self.trace_frames = cfg.get("tracemalloc_frames", 10)
+        self.top = cfg.get("top", 50)
+        self.profiler = SamplingProfiler(self.interval)
+        self._lock = threading.Lock()
+        self._timer = None
+        self._last_snapshot = None
+        self._seq = itertools.count(1)  # 同一秒内多次触发时区分文件名
+        self.token = secrets.token_urlsafe(16)  # /debug/* 路由的每次运行令牌
+        registry.gauge("profiler_active", "Whether the sampling profiler is running",
+                       func=lambda: 1 if self.profiler.running else 0)
+        registry.gauge("tracemalloc_active", "Whether tracemalloc is tracing allocations",
+                       func=lambda: 1 if tracemalloc.is_tracing() else 0)
+
+    def _path(self, prefix, ext):
+        os.makedirs(self.output_dir, exist_ok=True)
+        return os.path.join(self.output_dir, f"{prefix}_{time.strftime('%Y%m%d_%H%M%S')}_{next(self._seq)}.{ext}")
+
+    def start_profile(self):
+        with self._lock:
+            if self.profiler.running:
+                return "profiler already running"
+            self.profiler.start()
+            # 忘记关闭时按上限自动停止并写出结果
+            if self.max_seconds:
+                self._timer = threading.Timer(self.max_seconds, self.stop_profile)
+                self._timer.daemon = True
+                self._timer.start()
+        logger.info(f"Sampling profiler started ({self.interval * 1000:.0f}ms interval)")
+        return "profiler started"
+
+    def stop_profile(self):
+        with self._lock:
+            if not self.profiler.running:
+                return "profiler not running"
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self.profiler.stop()
+            path = self._path("cpu", "collapsed")
+            self.profiler.write_collapsed(path)
+        duration = time.time() - self.profiler.started_at
+        logger.info(f"Sampling profiler stopped: {self.profiler.sample_count} samples in {duration:.1f}s -> {path}")
+        return f"wrote {path} ({self.profiler.sample_count} samples, {duration:.1f}s)"
+
+    def toggle_profile(self):
+        return self.stop_profile() if self.profiler.running else self.start_profile()
+
+    def snapshot(self):
+        """第一次调用时启动 tracemalloc (此前的分配不可见)；每次保存快照并与上一次比较"""
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.trace_frames)
+                self._last_snapshot = None
+                logger.info(f"tracemalloc started ({self.trace_frames} frames)")
+            snapshot = tracemalloc.take_snapshot()
+            path = self._path("heap", "snap")
+            snapshot.dump(path)
+            write_snapshot_stats(snapshot, path[:-len(".snap")] + ".txt", self.top)
+            message = f"wrote {path}"
+            if self._last_snapshot is not None:
+                diff_path = path[:-len(".snap")] + ".diff.txt"
+                write_snapshot_stats(snapshot, diff_path, self.top, previous=self._last_snapshot)
+                message += f" and {diff_path}"
+            self._last_snapshot = snapshot
+        logger.info(f"Heap snapshot: {message}")
+        return message
+
+    def stop_heap(self):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                return "tracemalloc not running"
+            tracemalloc.stop()
+            self._last_snapshot = None
+        logger.info("tracemalloc stopped")
+        return "tracemalloc stopped"
+
+    def stop(self):
+        """退出时把正在进行的采样写出"""
+        if self.profiler.running:
+            self.stop_profile()
+
+    def routes(self):
+        """
+        供 MetricsServer.add_route(path, func, method="POST", token=self.token) 挂载。
+        这些操作会改变进程状态并写文件，不能用 GET (任意网页的 <img>/fetch 都能向本机发 GET)。
+        """
+        def text(func):
+            return lambda: ("text/plain; charset=utf-8", (func() + "\n").encode("utf-8"))
+        return {
+            "/debug/profile/start": text(self.start_profile),
+            "/debug/profile/stop": text(self.stop_profile),
+            "/debug/heap/snapshot": text(self.snapshot),
+            "/debug/heap/stop": text(self.stop_heap),
+        }
+
+    def write_token(self):
+        """把令牌写入 output_dir/debug_token (仅当前用户可读)，供 curl 等本机脚本读取"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, "debug_token")
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(self.token)
+        logger.info(f"Debug routes require POST with header X-Debug-Token (token in {path})")
+        return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare tracemalloc snapshots written by the profiler")
+    sub = parser.add_subparsers(dest="command", required=True)
+    diff = sub.add_parser("diff", help="show allocation growth between two .snap files")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.add_argument("--top", type=int, default=30)
+    diff.add_argument("--group", choices=("lineno", "filename", "traceback"), default="lineno")
+    args = parser.parse_args(argv)
+
+    old = tracemalloc.Snapshot.load(args.old)
+    new = tracemalloc.Snapshot.load(args.new)
+    stats = new.compare_to(old, args.group)
+    total = sum(stat.size_diff for stat in stats)
+    print(f"total growth {total / 1048576:+.2f} MB")
+    for stat in stats[:args.top]:
+        print(f"{stat.size_diff / 1024:+10.1f} KB {stat.count_diff:+8d} blocks  {stat.traceback}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,446 @@
+"""
+识别 → 翻译管线的确定性回放基准。
+
+将 capture.enabled 录制的 WS 事件流 (JSONL) 按原始时间轴重新送入与线上相同的触发策略，
+翻译端替换为可配置延迟分布/失败率的 MockTranslator，翻译线程按 Latest-Win 规则建模。
+默认使用虚拟时钟 (--speed 0)，同样的录制文件 + 种子得到完全相同的结果，适合在 CI 中比较回归。
+除 Final 译文延迟外，还统计字幕提交延迟 (time-to-committed-subtitle)：从一句话中间结果最后一次变化
+(约为说话人停顿的时刻) 到该句译文作为 Final 显示的时间，用于比较早期断句 (translation.endpointing) 的效果。
+早期断句已提交的句子在真正的 Final 到达前就已显示，不计入 Final 译文延迟，单独统计为 time-to-early-commit。
+
+用法:
+    python replay_bench.py captures/session.jsonl
+    python replay_bench.py captures/*.jsonl --latency lognormal:-1.0,0.5 --failure-rate 0.02 --max-p95 2.5
+    python replay_bench.py captures/session.jsonl --speed 1    # 按真实速度回放
+    python replay_bench.py captures/session.jsonl --endpointing off   # 关闭早期断句作对照
+    python replay_bench.py --synthetic 20      # 不需要录制文件的合成用例 (覆盖 Final 复用上次译文的路径)
+"""
+import sys
+import json
+import glob
+import math
+import time
+import heapq
+import random
+import logging
+import argparse
+import itertools
+
+from capture import load_capture
+from pipeline import create_trigger_policy, StabilityGate, Endpointer
+from translator_service import ITranslator
+
+logger = logging.getLogger("ReplayBench")
+
+
+def parse_latency(spec):
+    """
+    解析延迟分布描述，返回 sampler(rng) -> 秒。
+    支持: const:0.3 | uniform:0.2,0.8 | normal:0.4,0.1 | lognormal:mu,sigma | exp:0.4 (均值)
+    """
+    kind, _, args = spec.partition(":")
+    params = [float(x) for x in args.split(",") if x.strip()]
+    if kind == "const":
+        return lambda rng: params[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(params[0], params[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(params[0], params[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(params[0], params[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1.0 / params[0])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+class MockTranslator(ITranslator):
+    """
+    本地模拟翻译器：按给定分布采样延迟，并以 failure_rate 概率返回与 DeepTranslatorService 相同格式的错误串。
+    与线上一样带结果缓存 (缓存命中零延迟)，但失败结果不缓存。
+    realtime=False 时不真正 sleep，只把本次延迟记在 last_latency 中，由回放器推进虚拟时钟。
+    """
+    def __init__(self, latency="lognormal:-1.2,0.5", failure_rate=0.0, seed=0, cache=True, realtime=False):
+        self.rng = random.Random(seed)
+        self._sample = parse_latency(latency)
+        self.failure_rate = failure_rate
+        self.cache = {} if cache else None
+        self.realtime = realtime
+        self.last_latency = 0.0
+        self.calls = 0
+        self.cache_hits = 0
+        self.chars_sent = 0
+
+    def translate(self, text: str) -> str:
+        if self.cache is not None and text in self.cache:
+            self.cache_hits += 1
+            self.last_latency = 0.0
+            return self.cache[text]
+
+        self.calls += 1
+        self.chars_sent += len(text)
+        self.last_latency = self._sample(self.rng)
+        if self.realtime:
+            time.sleep(self.last_latency)
+        if self.rng.random() < self.failure_rate:
+            return "[Err: mock failure]"
+
+        result = f"译:{text}"
+        if self.cache is not None:
+            self.cache[text] = result
+        return result
+
+
+def synthetic_events(utterances=20, seed=0):
+    """
+    生成确定性的合成事件流 (不需要录制文件)：每句逐词增长的中间结果 (句尾一词未稳定)，
+    停顿后浏览器把整句标为稳定再发一次，随后给出同文本的 Final。
+    整句中间结果先被翻译，Final (或伪 Final) 与之相同，覆盖“复用上次翻译结果”的分支。
+    """
+    rng = random.Random(seed)
+    vocabulary = ("the quick brown fox jumps over a lazy dog while we talk about "
+                  "latency translation subtitles and the meeting agenda for today").split()
+    events, t = [], 0.0
+    for _ in range(utterances):
+        words = [rng.choice(vocabulary) for _ in range(rng.randint(8, 16))]
+        for n in range(1, len(words) + 1):
+            t += rng.uniform(0.2, 0.35)
+            text = " ".join(words[:n])
+            events.append({"ts": t, "text": text, "is_final": False,
+                           "stable_chars": len(" ".join(words[:n - 1]))})
+        t += 1.2
+        events.append({"ts": t, "text": text, "is_final": False, "stable_chars": len(text)})
+        t += rng.uniform(0.3, 1.5)
+        events.append({"ts": t, "text": text, "is_final": True})
+        t += rng.uniform(0.5, 2.0)
+    return events
+
+
+def percentile(values, p):
+    """最近秩百分位数"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class ReplayHarness:
+    """
+    离散事件模拟：
+    - process_queue 每 poll_interval 轮询一次，消息在下一个轮询时刻被处理
+    - 触发策略与线上 AppController 共用 pipeline.create_trigger_policy
+    - 单翻译线程，空闲时取队列中最新任务，其余任务丢弃 (Latest-Win)
+    - 早期断句与线上共用 pipeline.Endpointer：到期时刻落在下一个轮询点上提前提交伪 Final，
+      真正的 Final 与之一致时直接沿用伪 Final 的译文
+    """
+    def __init__(self, trans_cfg, translator, poll_interval=0.1, speed=0.0):
+        self.trans_cfg = trans_cfg
+        self.translator = translator
+        self.poll_interval = poll_interval
+        self.speed = speed
+
+    def run(self, events):
+        self.policy = create_trigger_policy(self.trans_cfg)
+        self.gate = StabilityGate(self.trans_cfg)
+        self.endpointer = Endpointer(self.trans_cfg)
+        self._early = None          # 最近一次提前提交的伪 Final 记录
+        self._last_interim_ts = None  # 最后一次中间结果文本变化的时刻 (约为说话人停顿的时刻)
+        self._last_interim_text = None
+        self._heap = []
+        self._seq = itertools.count()
+        self._pending = []          # 模拟 trans_queue
+        self._busy = False
+        self._finals = []           # 每个 Final 的结果记录
+        self._waiting = {}          # text -> [final 记录]：等待同文本的翻译完成
+        self._done_texts = set()    # 已成功翻译的文本
+        self._stats = {"interims": 0, "triggers": {}, "dropped_tasks": 0, "reused_finals": 0,
+                       "endpointing": {"committed": 0, "confirmed": 0, "revised": 0}}
+
+        for event in events:
+            t_proc = math.ceil(event["ts"] / self.poll_interval) * self.poll_interval
+            # 同一时刻先处理翻译完成 (0)，再处理新消息 (1)
+            heapq.heappush(self._heap, (t_proc, 1, next(self._seq), "msg", event))
+
+        t0 = events[0]["ts"] if events else 0.0
+        wall_start = time.monotonic()
+        while self._heap:
+            now, _, _, kind, payload = heapq.heappop(self._heap)
+            if self.speed > 0:
+                delay = wall_start + (now - t0) / self.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            if kind == "msg":
+                self._on_message(now, payload)
+            elif kind == "tick":
+                self._on_tick(now)
+            else:
+                self._on_done(now, *payload)
+
+        self.policy.close()
+        return self._report(events)
+
+    def _on_message(self, now, event):
+        text = event.get("text", "")
+        is_final = event.get("is_final", False)
+        record = None
+        if is_final:
+            speech_end = self._last_interim_ts if self._last_interim_ts is not None else event["ts"]
+            record = {"ts": event["ts"], "text": text, "done": None, "status": "pending", "speech_end": speech_end}
+            self._finals.append(record)
+            self._last_interim_ts = self._last_interim_text = None
+            outcome = self.endpointer.reconcile(text)
+            if outcome:
+                self._stats["endpointing"][outcome] += 1
+            if outcome == "confirmed":
+                record["via"] = self._early
+                self.gate.filter(text, True)
+                return
+        else:
+            self._stats["interims"] += 1
+            if text != self._last_interim_text:
+                # 浏览器会重发相同文本 (仅稳定度变化)，停顿从文本最后一次变化算起
+                self._last_interim_ts, self._last_interim_text = event["ts"], text
+            self.endpointer.observe(text, event["ts"], event.get("stable_chars"))
+            due = self.endpointer.due_time()
+            if due is not None:
+                t_tick = math.ceil(due / self.poll_interval) * self.poll_interval
+                heapq.heappush(self._heap, (t_tick, 1, next(self._seq), "tick", None))
+
+        candidate = self.gate.filter(text, is_final, event.get("stable_chars"), event.get("confidence"))
+        self._submit(now, candidate, is_final, record)
+
+    def _on_tick(self, now):
+        text = self.endpointer.poll(now)
+        if not text:
+            return  # 期间文本已变化或已提交，过期的轮询点
+        self._stats["endpointing"]["committed"] += 1
+        self._early = {"ts": self._last_interim_ts, "text": text, "done": None, "status": "pending"}
+        self._submit(now, text, True, self._early)
+
+    def _submit(self, now, candidate, is_final, record):
+        reason = self.policy.decide(candidate, is_final, now) if candidate else ""
+        if reason:
+            triggers = self._stats["triggers"]
+            triggers[reason] = triggers.get(reason, 0) + 1
+            self._pending.append({"text": candidate, "reason": reason, "final": record})
+            if not self._busy:
+                self._start_next(now)
+        elif record is not None:
+            # 与上次提交的文本相同，复用那次翻译的结果
+            self._stats["reused_finals"] += 1
+            if candidate in self._done_texts:
+                record["done"] = now
+                record["status"] = "ok"
+            else:
+                self._waiting.setdefault(candidate, []).append(record)
+
+    def _start_next(self, now):
+        if not self._pending:
+            self._busy = False
+            return
+        task = self._pending[-1]
+        for dropped in self._pending[:-1]:
+            self.policy.on_task_finished(dropped["reason"], None, now)
+            self._stats["dropped_tasks"] += 1
+            if dropped["final"] is not None:
+                dropped["final"]["status"] = "dropped"
+        self._pending.clear()
+
+        self._busy = True
+        result = self.translator.translate(task["text"])
+        latency = self.translator.last_latency
+        heapq.heappush(self._heap, (now + latency, 0, next(self._seq), "done", (task, result, latency)))
+
+    def _on_done(self, now, task, result, latency):
+        self.policy.on_task_finished(task["reason"], latency, now)
+        ok = not result.startswith("[Err")
+        if ok:
+            self._done_texts.add(task["text"])
+        records = self._waiting.pop(task["text"], [])
+        if task["final"] is not None:
+            records.append(task["final"])
+        for record in records:
+            record["status"] = "ok" if ok else "failed"
+            if ok:
+                record["done"] = now
+        self._start_next(now)
+
+    def _report(self, events):
+        latencies = []
+        early_latencies = []
+        commit_latencies = []
+        status_counts = {}
+        for r in self._finals:
+            # 与伪 Final 对账一致的句子，显示的是伪 Final 的译文 (早于真正的 Final 完成，
+            # 不计入 Final 译文延迟，单独统计为从停顿到提前提交显示的延迟)
+            shown = r.get("via") or r
+            if shown["status"] == "ok":
+                if shown is r:
+                    latencies.append(shown["done"] - r["ts"])
+                else:
+                    early_latencies.append(shown["done"] - r["speech_end"])
+                commit_latencies.append(shown["done"] - r["speech_end"])
+            # 回放结束仍未完成的 Final 视同丢弃
+            status = "dropped" if shown["status"] == "pending" else shown["status"]
+            status_counts[status] = status_counts.get(status, 0) + 1
+        return {
+            "policy": self.policy.name,
+            "events": len(events),
+            "duration_s": (events[-1]["ts"] - events[0]["ts"]) if events else 0.0,
+            "interims": self._stats["interims"],
+            "finals": len(self._finals),
+            "triggers": self._stats["triggers"],
+            "translate_calls": self.translator.calls,
+            "cache_hits": self.translator.cache_hits,
+            "chars_sent": self.translator.chars_sent,
+            "final_chars": sum(len(r["text"]) for r in self._finals),
+            "dropped_tasks": self._stats["dropped_tasks"],
+            "reused_finals": self._stats["reused_finals"],
+            "dropped_finals": status_counts.get("dropped", 0),
+            "failed_finals": status_counts.get("failed", 0),
+            "final_latencies": latencies,
+            "early_latencies": early_latencies,
+            "commit_latencies": commit_latencies,
+            "endpointing": dict(self._stats["endpointing"]),
+        }
+
+
+def summarize(reports):
+    """汇总多个录制文件的回放结果"""
+    latencies = [x for r in reports for x in r["final_latencies"]]
+    early_latencies = [x for r in reports for x in r["early_latencies"]]
+    commit_latencies = [x for r in reports for x in r["commit_latencies"]]
+    total = {key: sum(r[key] for r in reports) for key in (
+        "events", "duration_s", "interims", "finals", "translate_calls", "cache_hits",
+        "chars_sent", "final_chars", "dropped_tasks", "reused_finals", "dropped_finals", "failed_finals")}
+    # 每个 Final 字符对应发送给翻译后端的字符数，越接近 1 说明在易变文本上浪费的调用越少
+    total["chars_per_final_char"] = total["chars_sent"] / total["final_chars"] if total["final_chars"] else None
+    triggers = {}
+    for r in reports:
+        for reason, count in r["triggers"].items():
+            triggers[reason] = triggers.get(reason, 0) + count
+    endpointing = {}
+    for r in reports:
+        for outcome, count in r["endpointing"].items():
+            endpointing[outcome] = endpointing.get(outcome, 0) + count
+    total["endpointing"] = endpointing
+    total["policy"] = reports[0]["policy"] if reports else ""
+    total["triggers"] = triggers
+    # Final 译文延迟只含按真正的 Final 显示的句子；早期断句已提交的句子单独成列
+    total["time_to_translated_final"] = _series(latencies)
+    total["time_to_early_commit"] = _series(early_latencies)
+    total["time_to_committed_subtitle"] = _series(commit_latencies)
+    return total
+
+
+def _series(values):
+    return {
+        "n": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.3f}s"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded speech events through the translation trigger pipeline.")
+    parser.add_argument("captures", nargs="*", help="JSONL capture files (glob patterns allowed)")
+    parser.add_argument("--synthetic", type=int, metavar="N",
+                        help="replay N generated utterances instead of (or in addition to) capture files")
+    parser.add_argument("--config", default="config.json", help="config file providing the translation section")
+    parser.add_argument("--policy", help="override translation.trigger_policy (static / adaptive)")
+    parser.add_argument("--decision-log", help="write trigger decisions as JSONL")
+    parser.add_argument("--stability", type=int, help="override translation.stability.revisions (0 disables gating)")
+    parser.add_argument("--endpointing", choices=("on", "off"), help="override translation.endpointing.enabled")
+    parser.add_argument("--latency", default="lognormal:-1.2,0.5", help="mock translator latency distribution")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-cache", action="store_true", help="disable the mock translator result cache")
+    parser.add_argument("--poll-interval", type=float, default=0.1, help="process_queue polling interval (s)")
+    parser.add_argument("--speed", type=float, default=0.0, help="0 = virtual clock, 1 = real time, N = N x faster")
+    parser.add_argument("--json", dest="json_path", help="write the report as JSON")
+    parser.add_argument("--max-p95", type=float, help="fail if p95 time-to-translated-final exceeds this (s)")
+    parser.add_argument("--max-p99", type=float, help="fail if p99 time-to-translated-final exceeds this (s)")
+    parser.add_argument("--max-commit-p95", type=float,
+                        help="fail if p95 time-to-committed-subtitle (all finals, incl. early commits) exceeds this (s)")
+    parser.add_argument("--max-dropped-finals", type=int, help="fail if more finals than this are dropped")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    trans_cfg = {}
+    try:
+        with open(args.config, "r", encoding="utf-8") as f:
+            trans_cfg = dict(json.load(f).get("translation", {}))
+    except FileNotFoundError:
+        logger.warning(f"{args.config} not found, using default trigger thresholds")
+    if args.policy:
+        trans_cfg["trigger_policy"] = args.policy
+    trans_cfg["trigger_decision_log"] = args.decision_log
+    if args.stability is not None:
+        stability_cfg = dict(trans_cfg.get("stability", {}))
+        stability_cfg["enabled"] = args.stability > 0
+        stability_cfg["revisions"] = args.stability
+        trans_cfg["stability"] = stability_cfg
+    if args.endpointing:
+        trans_cfg["endpointing"] = {**trans_cfg.get("endpointing", {}), "enabled": args.endpointing == "on"}
+
+    paths = sorted({p for pattern in args.captures for p in (glob.glob(pattern) or [pattern])})
+    if not paths and not args.synthetic:
+        parser.error("no capture files given (pass capture files or --synthetic N)")
+    sources = [(path, lambda path=path: load_capture(path)) for path in paths]
+    if args.synthetic:
+        sources.append((f"<synthetic:{args.synthetic}>", lambda: synthetic_events(args.synthetic, args.seed)))
+    reports = []
+    for _, load in sources:
+        translator = MockTranslator(args.latency, args.failure_rate, seed=args.seed, cache=not args.no_cache)
+        harness = ReplayHarness(trans_cfg, translator, poll_interval=args.poll_interval, speed=args.speed)
+        reports.append(harness.run(load()))
+
+    total = summarize(reports)
+    ttf = total["time_to_translated_final"]
+    print(f"policy:               {total['policy']}")
+    print(f"captures:             {len(sources)} ({total['duration_s']:.1f}s of speech, {total['events']} events)")
+    print(f"interims / finals:    {total['interims']} / {total['finals']}")
+    print(f"triggers:             {total['triggers']}")
+    print(f"translate calls:      {total['translate_calls']} (cache hits {total['cache_hits']})")
+    ratio = total["chars_per_final_char"]
+    print(f"chars sent:           {total['chars_sent']} ({'-' if ratio is None else f'{ratio:.2f}'} per final char)")
+    print(f"dropped tasks:        {total['dropped_tasks']}")
+    print(f"reused finals:        {total['reused_finals']} (same text as the previous translation)")
+    print(f"dropped / failed fin: {total['dropped_finals']} / {total['failed_finals']}")
+    print(f"time-to-translated-final (n={ttf['n']}) p50 {_fmt(ttf['p50'])}  p95 {_fmt(ttf['p95'])}  p99 {_fmt(ttf['p99'])}  max {_fmt(ttf['max'])}")
+    tte = total["time_to_early_commit"]
+    ttc = total["time_to_committed_subtitle"]
+    ep = total["endpointing"]
+    print(f"endpointing:          {ep.get('committed', 0)} early commits, {ep.get('confirmed', 0)} confirmed, {ep.get('revised', 0)} revised")
+    print(f"time-to-early-commit (n={tte['n']}) p50 {_fmt(tte['p50'])}  p95 {_fmt(tte['p95'])}  p99 {_fmt(tte['p99'])}  max {_fmt(tte['max'])}")
+    print(f"time-to-committed-subtitle (n={ttc['n']}) p50 {_fmt(ttc['p50'])}  p95 {_fmt(ttc['p95'])}  p99 {_fmt(ttc['p99'])}  max {_fmt(ttc['max'])}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(total, f, indent=2)
+
+    failures = []
+    if args.max_p95 is not None and ttf["p95"] is not None and ttf["p95"] > args.max_p95:
+        failures.append(f"p95 {ttf['p95']:.3f}s > {args.max_p95}s")
+    if args.max_p99 is not None and ttf["p99"] is not None and ttf["p99"] > args.max_p99:
+        failures.append(f"p99 {ttf['p99']:.3f}s > {args.max_p99}s")
+    if args.max_commit_p95 is not None and ttc["p95"] is not None and ttc["p95"] > args.max_commit_p95:
+        failures.append(f"committed-subtitle p95 {ttc['p95']:.3f}s > {args.max_commit_p95}s")
+    if args.max_dropped_finals is not None and total["dropped_finals"] > args.max_dropped_finals:
+        failures.append(f"dropped finals {total['dropped_finals']} > {args.max_dropped_finals}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""
+共享翻译缓存客户端 (服务端见 cache_server.py)。
+
+SharedCacheTranslator 装饰内层翻译器，查找顺序：
+    本地近缓存 (进程内 LRU) -> 共享缓存服务 -> 内层翻译器 (自带 lru_cache)，译文异步回写共享缓存
+- 共享缓存的读取走短超时 (默认 150ms)，超时或连接失败即视为未命中，并在 retry_interval 秒内不再尝试，
+  期间退回纯进程内缓存，翻译本身不受影响
+- 回写由后台线程攒批后流水线发送 (连续写入多条再依次读取响应)，不占用翻译线程
+- 缓存键包含源/目标语言，错误结果 ("[Err...") 不缓存
+- 读回的译文会直接显示：服务端开启令牌时 (cache_server.py --token)，shared_cache.token 需与之相同，
+  每条连接建立后先发送 auth 请求
+"""
+import json
+import time
+import queue
+import socket
+import logging
+import threading
+from collections import OrderedDict
+
+from metrics import registry
+from translator_service import ITranslator
+
+logger = logging.getLogger("SharedCache")
+
+_lookups = {
+    result: registry.counter("shared_cache_lookups_total", "Shared translation cache lookups by result", result=result)
+    for result in ("near_hit", "hit", "miss", "error", "bypass")
+}
+_latency = registry.histogram("shared_cache_get_seconds", "Round trip of shared cache reads",
+                              buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25))
+_sets = registry.counter("shared_cache_sets_total", "Entries written back to the shared cache")
+
+
+class CacheClient:
+    """
+    一条 TCP 连接上的流水线客户端 (非线程安全，调用方负责串行化)。
+    任何网络错误都会关闭连接并抛出 OSError，由上层决定退避。
+    """
+    def __init__(self, host, port, timeout=0.15, connect_timeout=0.3, token=""):
+        self.host = host
+        self.port = port
+        self.token = token
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._sock = None
+        self._file = None
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(self.timeout)
+        self._sock = sock
+        self._file = sock.makefile("rb")
+        if self.token:
+            sock.sendall((json.dumps({"op": "auth", "token": self.token}) + "\n").encode("utf-8"))
+            response = json.loads(self._file.readline() or b"{}")
+            if not response.get("ok"):
+                raise ConnectionError(f"cache server rejected the token: {response.get('error', 'no response')}")
+
+    def close(self):
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                self._file.close()
+                sock.close()
+            except OSError:
+                pass
+
+    def pipeline(self, requests):
+        """一次发送全部请求，再按顺序读取同样数量的响应"""
+        if not requests:
+            return []
+        try:
+            if self._sock is None:
+                self._connect()
+            payload = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in requests).encode("utf-8")
+            self._sock.sendall(payload)
+            responses = []
+            for _ in requests:
+                line = self._file.readline()
+                if not line:
+                    raise ConnectionError("cache server closed the connection")
+                response = json.loads(line)
+                if response.get("error") == "unauthorized":  # 服务端要求令牌但本端未配置
+                    raise ConnectionError("cache server requires a token (shared_cache.token)")
+                responses.append(response)
+            return responses
+        except (OSError, ValueError) as e:
+            # 超时后连接上可能还有迟到的响应，直接丢弃整条连接以免错位
+            self.close()
+            raise OSError(str(e)) from e
+
+    def get_many(self, keys):
+        return [r.get("value") for r in self.pipeline([{"op": "get", "key": k} for k in keys])]
+
+    def set_many(self, items):
+        self.pipeline([{"op": "set", "key": k, "value": v} for k, v in items])
+
+
+class SharedCacheTranslator(ITranslator):
+    def __init__(self, inner: ITranslator, cache_cfg: dict, namespace: str):
+        self.inner = inner
+        self.namespace = namespace
+        self.retry_interval = cache_cfg.get("retry_interval", 30.0)
+        self.near_cache_size = cache_cfg.get("near_cache_size", 5000)
+        self.batch_size = cache_cfg.get("write_batch_size", 64)
+        host, port = cache_cfg.get("host", "127.0.0.1"), cache_cfg.get("port", 9110)
+        timeout, connect_timeout = cache_cfg.get("timeout", 0.15), cache_cfg.get("connect_timeout", 0.3)
+        # 读与写各用一条连接：读在翻译线程里同步进行，写在后台线程里攒批
+        token = cache_cfg.get("token", "")
+        self._reader = CacheClient(host, port, timeout, connect_timeout, token)
+        self._writer = CacheClient(host, port, max(timeout, 1.0), connect_timeout, token)
+        self._read_lock = threading.Lock()
+        self._near = OrderedDict()
+        self._near_lock = threading.Lock()
+        self._down_until = 0.0
+        self._write_queue = queue.Queue(maxsize=cache_cfg.get("max_pending_writes", 10000))
+        self._stop_event = threading.Event()
+
+        registry.gauge("shared_cache_up", "Whether the shared cache server is currently considered reachable",
+                       func=lambda: 0 if time.monotonic() < self._down_until else 1)
+        threading.Thread(target=self._write_loop, name="SharedCacheWriter", daemon=True).start()
+        logger.info(f"Shared translation cache: {host}:{port} (namespace {namespace})")
+
+    def _key(self, text):
+        return f"{self.namespace}\t{text}"
+
+    def _mark_down(self, e):
+        if time.monotonic() >= self._down_until:
+            logger.warning(f"Shared cache unreachable ({e}), using local cache for {self.retry_interval:.0f}s")
+        self._down_until = time.monotonic() + self.retry_interval
+
+    def _near_get(self, key):
+        with self._near_lock:
+            value = self._near.get(key)
+            if value is not None:
+                self._near.move_to_end(key)
+            return value
+
+    def _near_put(self, key, value):
+        with self._near_lock:
+            self._near[key] = value
+            self._near.move_to_end(key)
+            while len(self._near) > self.near_cache_size:
+                self._near.popitem(last=False)
+
+    def get_many(self, texts):
+        """批量查询 (近缓存 + 一次流水线读取)，返回 {text: 译文}，仅包含命中的条目"""
+        found = {}
+        missing = []
+        for text in texts:
+            value = self._near_get(self._key(text))
+            if value is not None:
+                found[text] = value
+                _lookups["near_hit"].inc()
+            else:
+                missing.append(text)
+        if not missing:
+            return found
+        if time.monotonic() < self._down_until:
+            _lookups["bypass"].inc(len(missing))
+            return found
+        start = time.perf_counter()
+        try:
+            with self._read_lock:
+                values = self._reader.get_many([self._key(t) for t in missing])
+        except OSError as e:
+            _lookups["error"].inc(len(missing))
+            self._mark_down(e)
+            return found
+        _latency.observe(time.perf_counter() - start)
+        for text, value in zip(missing, values):
+            if value is None:
+                _lookups["miss"].inc()
+                continue
+            _lookups["hit"].inc()
+            found[text] = value
+            self._near_put(self._key(text), value)
+        return found
+
+    def put(self, text, value):
+        """写入近缓存并排队回写共享缓存"""
+        if not value or value.startswith("[Err"):
+            return
+        key = self._key(text)
+        self._near_put(key, value)
+        try:
+            self._write_queue.put_nowait((key, value))
+        except queue.Full:
+            pass  # 服务端长时间不可达时放弃回写，近缓存与内层缓存仍然有效
+
+    def translate(self, text: str) -> str:
+        if not text or not text.strip():
+            return self.inner.translate(text)
+        cached = self.get_many([text]).get(text)
+        if cached is not None:
+            return cached
+        result = self.inner.translate(text)
+        self.put(text, result)
+        return result
+
+    def _write_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                batch = [self._write_queue.get(timeout=1.0)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._write_queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                if time.monotonic() >= self._down_until:  # 不可达期间直接丢弃，恢复后新译文照常回写
+                    self._writer.set_many(batch)
+                    _sets.inc(len(batch))
+            except OSError as e:
+                self._mark_down(e)
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+
+    def flush(self, timeout=10.0):
+        """等待排队中的回写完成 (批量预热等短生命周期进程退出前调用)"""
+        deadline = time.monotonic() + timeout
+        while self._write_queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def stop(self):
+        self._stop_event.set()
+        self._reader.close()
+        self._writer.close()
@@ -0,0 +1,447 @@
+"""
+长时间浸泡 / 内存回归测试：用合成语音事件驱动真实的 AppController (UI、触发策略、翻译线程、翻译记忆、
+Final 出口)，翻译端为本地模拟翻译器，按加速后的时间轴模拟数小时的连续讲话，跟踪资源是否持续增长。
+
+跟踪项 (每个检查点记录一次，预热阶段之后的增长量与预算比较，超出即以退出码 1 失败):
+- 进程 RSS
+- tracemalloc 跟踪的 Python 堆 (失败时打印增长最多的分配位置)
+- 存活线程数
+- Tk 中待执行的 after 回调数
+结束前再按真实时间说一句并停顿 (早期断句提前提交后 Final 与之一致)，之后不再有语音，
+检查这句 Final 仍带着译文写入出口。
+
+显示：Linux 下没有 DISPLAY 时自动启动 Xvfb 虚拟显示；找不到 Xvfb 时可用 --headless，
+以不依赖 Tk 的替身窗口运行 (覆盖除界面控件外的全部逻辑)。
+运行时工作目录为临时目录 (日志、transcripts.db、字幕文件都写在其中)，结束后删除，不影响当前目录。
+
+用法:
+    python soak_test.py --hours 4 --speedup 200
+    python soak_test.py --hours 1 --headless --max-rss-growth-mb 20
+"""
+import os
+import sys
+import json
+import time
+import heapq
+import random
+import shutil
+import tempfile
+import argparse
+import itertools
+import threading
+import subprocess
+import tracemalloc
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_WORDS = ("the we our system latency cluster request model deploy service data team user network update "
+          "release build test memory thread queue cache error metric scale region traffic window speech "
+          "translate subtitle audio stream browser session config server client today next because really "
+          "important question answer example problem solution performance design review").split()
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return 0
+
+
+class _HeadlessRoot:
+    """Tk root 的最小替身：单线程 after 调度器"""
+    def __init__(self):
+        self._jobs = []
+        self._ids = itertools.count(1)
+        self._cancelled = set()
+        self._lock = threading.Lock()
+        self._running = False
+
+    def after(self, ms, func=None, *args):
+        job_id = f"after#{next(self._ids)}"
+        with self._lock:
+            heapq.heappush(self._jobs, (time.monotonic() + ms / 1000.0, job_id, func, args))
+        return job_id
+
+    def after_cancel(self, job_id):
+        with self._lock:
+            self._cancelled.add(job_id)
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for job in self._jobs if job[1] not in self._cancelled)
+
+    def mainloop(self):
+        self._running = True
+        while self._running:
+            with self._lock:
+                job = heapq.heappop(self._jobs) if self._jobs and self._jobs[0][0] <= time.monotonic() else None
+                if job and job[1] in self._cancelled:
+                    self._cancelled.discard(job[1])
+                    continue
+            if job is None:
+                time.sleep(0.002)
+                continue
+            job[2](*job[3])
+
+    def quit(self):
+        self._running = False
+
+
+class HeadlessOverlay:
+    """OverlayWindow 的替身：保留文本状态与历史记录的容量逻辑，不创建任何控件"""
+    def __init__(self, config, on_close_callback=None):
+        self.config = config
+        self.root = _HeadlessRoot()
+        self.history = []
+        self.english = self.chinese = ""
+
+    def update_english(self, text):
+        self.english = text
+
+    def update_chinese(self, text):
+        self.chinese = text
+
+    def update_translation(self, zh_text, en_text, is_final=False):
+        self.chinese, self.english = zh_text, en_text
+        if zh_text and not zh_text.startswith("[Err"):
+            if self.history and zh_text.startswith(self.history[-1]["text"][:3]):
+                self.history[-1]["text"] = zh_text
+            else:
+                self.history.append({"text": zh_text})
+                if len(self.history) > self.config.get("ui", {}).get("history", {}).get("count", 2):
+                    self.history.pop(0)
+
+    def apply_config(self, config):
+        self.config = config
+
+    def add_hotkey(self, sequence, callback):
+        pass
+
+    def start(self):
+        self.root.mainloop()
+
+
+def ensure_display(headless):
+    """返回启动的 Xvfb 进程 (需要在结束时关闭)，或 None"""
+    if headless or os.name != "posix" or sys.platform == "darwin" or os.environ.get("DISPLAY"):
+        return None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        raise SystemExit("No DISPLAY and Xvfb not found; install xvfb or pass --headless")
+    for display in range(99, 120):
+        if os.path.exists(f"/tmp/.X11-unix/X{display}"):
+            continue
+        proc = subprocess.Popen([xvfb, f":{display}", "-screen", "0", "1280x720x24", "-nolisten", "tcp"],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for _ in range(50):
+            if os.path.exists(f"/tmp/.X11-unix/X{display}"):
+                os.environ["DISPLAY"] = f":{display}"
+                return proc
+            time.sleep(0.1)
+        proc.kill()
+    raise SystemExit("Failed to start Xvfb")
+
+
+def build_config(args):
+    config = {}
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    # 关闭对外暴露/依赖外部环境的部分，Final 出口与翻译记忆保持开启 (它们正是需要浸泡的结构)
+    config["metrics"] = {"enabled": False}
+    config["capture"] = {"enabled": False}
+    config["shared_cache"] = {"enabled": False}
+    config["config_reload"] = {"enabled": False}
+    config["tracing"] = {**config.get("tracing", {}), "export_path": ""}
+    config["transcript"] = {**config.get("transcript", {}), "enabled": True, "path": "transcripts.db"}
+    config["subtitles"] = {**config.get("subtitles", {}), "enabled": True, "path": "subtitles/soak"}
+    config["logging"] = {**config.get("logging", {}), "file_path": "app.log"}
+    config.setdefault("translation_memory", {})["seed_file"] = ""
+    return config
+
+
+class SpeechGenerator:
+    """合成识别事件：逐词增长的中间结果 + Final；一部分句子重复出现，覆盖缓存与翻译记忆命中路径"""
+    def __init__(self, seed, repeat_ratio=0.2, words_per_second=2.5):
+        self.rng = random.Random(seed)
+        self.repeat_ratio = repeat_ratio
+        self.word_time = 1.0 / words_per_second
+        self.spoken = []
+        self.seq = 0
+
+    def utterance(self):
+        if self.spoken and self.rng.random() < self.repeat_ratio:
+            return self.rng.choice(self.spoken)
+        words = [self.rng.choice(_WORDS) for _ in range(self.rng.randint(5, 25))]
+        if len(self.spoken) < 2000:
+            self.spoken.append(words)
+        return words
+
+    def events(self, sim_seconds):
+        """生成 (模拟时间, text, is_final, meta)，直到模拟时间用完"""
+        t = 0.0
+        while t < sim_seconds:
+            words = self.utterance()
+            for i in range(1, len(words) + 1):
+                t += self.word_time
+                self.seq += 1
+                is_final = i == len(words)
+                text = " ".join(words[:i])
+                meta = {"trace_id": f"soak-{self.seq}", "ts": time.time() * 1000,
+                        "stable_chars": len(" ".join(words[:max(0, i - 2)])), "confidence": 0.9}
+                yield t, text, is_final, meta
+            t += self.rng.uniform(0.5, 2.0)  # 句间停顿
+
+
+class _RecordingSink:
+    """记录写入出口的 Final (与 TranscriptStore / SubtitleExporter 相同的 submit/close 接口)"""
+    def __init__(self):
+        self.segments = []
+
+    def submit(self, segment):
+        self.segments.append(segment)
+
+    def close(self):
+        pass
+
+
+class Soak:
+    def __init__(self, app, args, is_headless):
+        self.app = app
+        self.args = args
+        self.is_headless = is_headless
+        self.checkpoints = []  # (sim_hours, rss, heap, threads, after_jobs)
+        self.baseline_snapshot = None
+        self.final_snapshot = None
+        self.done = threading.Event()
+        self.quiet_failure = None
+
+    def _pending_after(self):
+        root = self.app.ui.root
+        if self.is_headless:
+            return root.pending()
+        # Tk 调用必须在主线程执行
+        result = {}
+        ready = threading.Event()
+
+        def query():
+            result["n"] = len(root.tk.splitlist(root.tk.call("after", "info")))
+            ready.set()
+        root.after(0, query)
+        ready.wait(5)
+        return result.get("n", -1)
+
+    def _checkpoint(self, sim_seconds):
+        # 等待队列排空后再测量，避免把在途任务算作增长
+        deadline = time.monotonic() + 5
+        while (not self.app.msg_queue.empty() or not self.app.trans_queue.empty()) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        heap, _ = tracemalloc.get_traced_memory()
+        point = (sim_seconds / 3600, rss_bytes(), heap, threading.active_count(), self._pending_after())
+        self.checkpoints.append(point)
+        print(f"  sim {point[0]:6.2f}h  rss {point[1] / 1048576:7.1f}MB  heap {point[2] / 1048576:7.2f}MB  "
+              f"threads {point[3]:3d}  after {point[4]:4d}  tm {len(self.app.translation_memory or ())}",
+              file=sys.__stdout__, flush=True)
+        return point
+
+    def _quiet_final_check(self):
+        """
+        按真实时间说一句后停顿：早期断句提前提交并翻译，随后到达的 Final 与之一致 (confirmed)。
+        此后不再有语音，这句 Final 也必须在几秒内带着译文写入出口，不能滞留在补译队列中。
+        """
+        import main as app_main
+        app = self.app
+        if not app.endpointer.enabled:
+            return None
+        sink = _RecordingSink()
+        app.final_sinks.append(sink)
+        confirmed = app_main._endpointing["confirmed"].value()
+        words = "this sentence checks the quiet tail after an early commit".split()
+        for i in range(1, len(words) + 1):
+            text = " ".join(words[:i])
+            app.on_speech_result(text, False, {"trace_id": f"quiet-{i}", "ts": time.time() * 1000,
+                                               "stable_chars": len(text), "confidence": 0.9})
+            time.sleep(0.05)
+        # 等待早期断句提交并完成翻译
+        time.sleep(app.endpointer.pause + 1.0)
+        app.on_speech_result(text, True, {"trace_id": "quiet-final", "ts": time.time() * 1000})
+        deadline = time.monotonic() + 3
+        # 出口中可能还有浸泡阶段的最后几句，只看这一句
+        segments = []
+        while not segments and time.monotonic() < deadline:
+            time.sleep(0.05)
+            segments = [seg for seg in sink.segments if seg["text"] == text]
+        if app_main._endpointing["confirmed"].value() == confirmed:
+            return "quiet-tail sentence was not confirmed against an early commit"
+        if not segments:
+            return "confirmed final did not reach the sinks without further speech"
+        if not segments[0]["translation"]:
+            return "confirmed final reached the sinks without its translation"
+        return None
+
+    def run(self):
+        args = self.args
+        generator = SpeechGenerator(args.seed, args.repeat_ratio)
+        sim_total = args.hours * 3600
+        warmup = sim_total * args.warmup
+        interval = sim_total / max(1, args.checkpoints)
+        next_checkpoint = warmup
+        start = time.monotonic()
+        statuses = itertools.cycle(["listening", "vad_paused", "vad_resumed", "listening"])
+        utterances = 0
+        try:
+            for sim_t, text, is_final, meta in generator.events(sim_total):
+                delay = start + sim_t / args.speedup - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                self.app.on_speech_result(text, is_final, meta)
+                if is_final:
+                    utterances += 1
+                    if utterances % 50 == 0:
+                        self.app.on_speech_status_update(next(statuses))
+                    if args.session_refresh_every and utterances % args.session_refresh_every == 0:
+                        from translator_service import get_smart_session
+                        get_smart_session()._refresh_session()
+                if sim_t >= next_checkpoint:
+                    self._checkpoint(sim_t)
+                    if self.baseline_snapshot is None:
+                        self.baseline_snapshot = tracemalloc.take_snapshot()
+                    next_checkpoint += interval
+            self._checkpoint(sim_total)
+            self.final_snapshot = tracemalloc.take_snapshot()
+            self.quiet_failure = self._quiet_final_check()
+        finally:
+            self.utterances = utterances
+            self.done.set()
+            self.app.ui.root.after(0, self.app.ui.root.quit)
+
+    def evaluate(self):
+        """返回失败原因列表"""
+        args = self.args
+        if len(self.checkpoints) < 2:
+            return ["not enough checkpoints"]
+        base, last = self.checkpoints[0], self.checkpoints[-1]
+        failures = []
+        rss_growth = (last[1] - base[1]) / 1048576
+        heap_growth = (last[2] - base[2]) / 1048576
+        thread_growth = last[3] - base[3]
+        print(f"growth after warmup: rss {rss_growth:+.1f}MB (budget {args.max_rss_growth_mb}), "
+              f"heap {heap_growth:+.2f}MB (budget {args.max_heap_growth_mb}), threads {thread_growth:+d} "
+              f"(budget {args.max_thread_growth}), after jobs {last[4]} (budget {args.max_after_jobs})",
+              file=sys.__stdout__)
+        if rss_growth > args.max_rss_growth_mb:
+            failures.append(f"RSS grew {rss_growth:.1f}MB")
+        if heap_growth > args.max_heap_growth_mb:
+            failures.append(f"Python heap grew {heap_growth:.2f}MB")
+        if thread_growth > args.max_thread_growth:
+            failures.append(f"thread count grew by {thread_growth}")
+        if last[4] > args.max_after_jobs:
+            failures.append(f"{last[4]} pending after callbacks")
+        if self.quiet_failure:
+            failures.append(self.quiet_failure)
+        if self.baseline_snapshot and self.final_snapshot:
+            stats = self.final_snapshot.compare_to(self.baseline_snapshot, "lineno")
+            print("top allocation growth since warmup:", file=sys.__stdout__)
+            for stat in stats[:args.top]:
+                print(f"  {stat.size_diff / 1024:+9.1f}KB {stat.count_diff:+7d} blocks  {stat.traceback[0]}",
+                      file=sys.__stdout__)
+        return failures
+
+
+def _find_layer(translator, cls):
+    while translator is not None:
+        if isinstance(translator, cls):
+            return translator
+        translator = getattr(translator, "inner", None)
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak AppController with synthetic speech and check resource growth")
+    parser.add_argument("--hours", type=float, default=2.0, help="simulated hours of continuous speech")
+    parser.add_argument("--speedup", type=float, default=100.0, help="simulated seconds per wall-clock second")
+    parser.add_argument("--config", help="base config (default: built-in defaults)")
+    parser.add_argument("--headless", action="store_true", help="run without Tk (stand-in window)")
+    parser.add_argument("--latency", default="const:0.005", help="mock translator latency (replay_bench syntax)")
+    parser.add_argument("--repeat-ratio", type=float, default=0.2, help="fraction of repeated sentences")
+    parser.add_argument("--session-refresh-every", type=int, default=200,
+                        help="refresh the HTTP SmartSession every N utterances (0 = never)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warmup", type=float, default=0.1, help="fraction of the run before the baseline")
+    parser.add_argument("--checkpoints", type=int, default=10)
+    parser.add_argument("--max-rss-growth-mb", type=float, default=30.0)
+    parser.add_argument("--max-heap-growth-mb", type=float, default=10.0)
+    parser.add_argument("--max-thread-growth", type=int, default=2)
+    parser.add_argument("--max-after-jobs", type=int, default=50)
+    parser.add_argument("--top", type=int, default=10, help="allocation sites to print")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary working directory")
+    args = parser.parse_args(argv)
+
+    config = build_config(args)
+    xvfb = ensure_display(args.headless)
+    workdir = tempfile.mkdtemp(prefix="soak-")
+    with open(os.path.join(workdir, "config.json"), "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    tracemalloc.start(5)
+    print(f"soak: {args.hours}h simulated at {args.speedup}x in {workdir}", flush=True)
+
+    import main as app_main
+    # main 模块导入时会把 stdout/stderr 重定向到日志，且控制台输出 INFO；浸泡期间只在控制台保留警告
+    sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    if app_main._log_listener is not None:
+        for handler in app_main._log_listener.handlers:
+            if not hasattr(handler, "baseFilename"):
+                handler.setLevel("WARNING")
+    if args.headless:
+        app_main.OverlayWindow = HeadlessOverlay
+
+    from replay_bench import MockTranslator
+    from translator_service import create_translator, DeepTranslatorService
+    app = app_main.AppController()
+    # 完整翻译链 (术语表、lru_cache、语种识别)，只把最内层的网络翻译换成模拟器
+    translator = create_translator(config)
+    _find_layer(translator, DeepTranslatorService).translator = MockTranslator(args.latency, seed=args.seed,
+                                                                                cache=False, realtime=True)
+    app.translator = translator
+    threading.Thread(target=app._translation_worker, name="TranslationWorker", daemon=True).start()
+    app.ui.root.after(100, app.process_queue)
+
+    soak = Soak(app, args, args.headless)
+    threading.Thread(target=soak.run, name="SoakDriver", daemon=True).start()
+    wall_start = time.monotonic()
+    try:
+        app.ui.start()
+    except KeyboardInterrupt:
+        pass
+    soak.done.wait()
+    print(f"drove {soak.utterances} utterances in {time.monotonic() - wall_start:.0f}s wall time")
+
+    failures = soak.evaluate()
+    app.trigger_policy.close()
+    app._close_final_sinks()
+    app_main._stop_logging()
+    os.chdir(REPO_DIR)
+    if xvfb is not None:
+        xvfb.terminate()
+    if args.keep:
+        print(f"working directory kept: {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if failures:
+        print("FAIL: " + "; ".join(failures))
+        return 1
+    print("PASS")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,10 @@
 import os
 import time
 import json
+import signal
 import logging
 import threading
+import subprocess
 import asyncio
 import websockets
 from selenium import webdriver
@@ -11,14 +13,64 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 import http.server
 import socketserver
+from tracing import tracer
+from metrics import registry, RateMeter
+from capture import EventRecorder
+from browser_supervisor import BrowserSupervisor
+from chrome_profile import ChromeProfileManager
 
 logger = logging.getLogger("SpeechService")
 
-# 配置
+# 配置 (端口可由 speech_recognition.http_port / ws_port 覆盖，便于同机运行多个实例)
 WS_HOST = "127.0.0.1"
 WS_PORT = 8765
 HTTP_PORT = 8001
 
+# [新增] 运行时指标
+_ws_messages = registry.counter("ws_messages_total", "Messages received from the speech worker page")
+_ws_connections = registry.counter("ws_connections_total", "Speech worker WebSocket connections")
+_recognizer_restarts = registry.counter("recognizer_restarts_total", "Recognizer restarts (watchdog or onend) after the first start")
+_vad_pauses = registry.counter("vad_pauses_total", "Recognizer pauses after a long silence detected by the page VAD")
+_vad_paused_seconds = registry.counter("vad_paused_seconds_total", "Time the recognizer spent paused by the page VAD")
+registry.gauge("ws_messages_per_second", "WS message rate since the previous scrape", func=RateMeter(_ws_messages))
+_component_restarts = {
+    name: registry.counter("speech_component_restarts_total", "Speech subsystem components restarted after a failure", component=name)
+    for name in ("ws", "http", "browser")
+}
+_recover_latency = registry.histogram("speech_recover_seconds", "Component failure detected to recognizer listening again",
+                                      buckets=(1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 30.0, 60.0))
+_launch_latency = {
+    stage: registry.histogram("chrome_launch_seconds", "Chrome cold start: driver ready / worker page loaded", stage=stage,
+                              buckets=(0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0))
+    for stage in ("driver", "page")
+}
+
+
+class _ReusableTCPServer(socketserver.TCPServer):
+    # 组件重启时立即重新绑定端口，不等待 TIME_WAIT
+    allow_reuse_address = True
+
+
+def _kill_process_group(process):
+    """
+    [新增] 结束浏览器进程树：POSIX 下 chromedriver 以新会话启动 (进程组 ID = 其 PID)，Chrome 及其子进程同组，
+    一次 killpg 全部结束，即使 chromedriver 已先退出也不会留下孤儿进程；Windows 下使用 taskkill /T。
+    """
+    if process is None:
+        return
+    if os.name == "posix":
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    elif process.poll() is None:
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+    try:
+        process.wait(timeout=2)  # 回收 chromedriver，避免僵尸进程
+    except Exception:
+        pass
+
 # 嵌入的 HTML 模板 (静态部分，不需要 format)
 HTML_TEMPLATE_BODY = """
 <!DOCTYPE html>
@@ -43,6 +95,142 @@ HTML_TEMPLATE_BODY = """
         let ws = null;
         let recognition = null;
 
+        // [新增] 逐句追踪 ID：页面加载时间前缀 + 自增序号，保证重连后不重复
+        const TRACE_PREFIX = Date.now().toString(36);
+        let traceSeq = 0;
+
+        // [新增] 稳定前缀估计：按词 (CJK 按字) 比较相邻两次 interim，
+        // 从句首开始连续 STABILITY_REVISIONS 次修订都未变化的词视为稳定
+        const STABLE_TOKEN_RE = /[\\u3040-\\u30ff\\u3400-\\u9fff\\uac00-\\ud7af]|[^\\s\\u3040-\\u30ff\\u3400-\\u9fff\\uac00-\\ud7af]+/g;
+        let prevTokens = [];
+        let tokenAges = [];
+
+        function stablePrefixChars(text) {
+            const matches = [...text.matchAll(STABLE_TOKEN_RE)];
+            const ages = [];
+            let stableEnd = 0;
+            let stableRun = true;
+            for (let k = 0; k < matches.length; k++) {
+                const tok = matches[k][0];
+                // 前面的词都未变化 (ages[k-1] > 0) 且当前词与上一版相同，才算延续
+                const unchanged = (k < prevTokens.length && prevTokens[k] === tok && (k === 0 || ages[k - 1] > 0));
+                ages.push(unchanged ? tokenAges[k] + 1 : 0);
+                if (stableRun && ages[k] >= STABILITY_REVISIONS) {
+                    stableEnd = matches[k].index + tok.length;
+                } else {
+                    stableRun = false;
+                }
+            }
+            prevTokens = matches.map(m => m[0]);
+            tokenAges = ages;
+            return stableEnd;
+        }
+
+        function resetStability() {
+            prevTokens = [];
+            tokenAges = [];
+        }
+
+        // [新增] 语音活动检测 (VAD)：Web Audio 分析麦克风能量 + 过零率，
+        // 长时间静音时暂停识别 (不再由看门狗反复重启)，检测到语音立即恢复。
+        // 识别器自行采集麦克风，无法把缓冲的音频回灌给它，因此恢复依赖尽早触发 (VAD_START_MS)。
+        let vadActive = false;
+        let vadPaused = false;
+        let vadResuming = false;
+        let vadSpeaking = false;
+        let vadLastSpeech = Date.now();
+        let vadPausedAt = 0;
+
+        function sendStatus(state, extra) {
+            if (ws && ws.readyState === WebSocket.OPEN) {
+                ws.send(JSON.stringify(Object.assign({"type": "status", "state": state}, extra || {})));
+            }
+        }
+
+        async function startVad() {
+            if (!VAD_ENABLED) return;
+            let stream;
+            try {
+                stream = await navigator.mediaDevices.getUserMedia({audio: true});
+            } catch (e) {
+                console.warn("JS: VAD disabled, getUserMedia failed", e);
+                return;
+            }
+            const ctx = new AudioContext();
+            const analyser = ctx.createAnalyser();
+            analyser.fftSize = 1024;
+            ctx.createMediaStreamSource(stream).connect(analyser);
+            const buf = new Float32Array(analyser.fftSize);
+
+            // 最近 VAD_FLOOR_WINDOW_MS 内各帧能量的环形缓冲，噪声底取其低分位数
+            const ringSize = Math.max(16, Math.round(VAD_FLOOR_WINDOW_MS / VAD_FRAME_MS));
+            const ring = new Float32Array(ringSize).fill(-90);
+            let ringPos = 0;
+            let frameCount = 0;
+            let noiseFloor = -90;
+            let speechRun = 0;
+
+            setInterval(() => {
+                analyser.getFloatTimeDomainData(buf);
+                let sum = 0, crossings = 0;
+                for (let i = 0; i < buf.length; i++) {
+                    sum += buf[i] * buf[i];
+                    if (i > 0 && (buf[i] >= 0) !== (buf[i - 1] >= 0)) crossings++;
+                }
+                const energyDb = 10 * Math.log10(sum / buf.length + 1e-12);
+                const zcr = crossings / (buf.length - 1);
+
+                ring[ringPos] = energyDb;
+                ringPos = (ringPos + 1) % ringSize;
+                if (++frameCount % 10 === 0) {
+                    const sorted = Array.from(ring).sort((a, b) => a - b);
+                    noiseFloor = sorted[Math.floor(sorted.length * 0.2)];
+                }
+
+                const loud = energyDb > noiseFloor + VAD_MARGIN_DB;
+                const voiced = loud && (zcr <= VAD_MAX_ZCR || energyDb > noiseFloor + 2 * VAD_MARGIN_DB);
+                speechRun = voiced ? speechRun + VAD_FRAME_MS : 0;
+                const now = Date.now();
+                if (speechRun >= VAD_START_MS) {
+                    vadLastSpeech = now;
+                    vadSpeaking = true;
+                    if (vadPaused) resumeRecognition();
+                } else if (vadSpeaking && now - vadLastSpeech > VAD_HANGOVER_MS) {
+                    vadSpeaking = false;
+                }
+                if (!vadPaused && !vadSpeaking && now - vadLastSpeech > VAD_IDLE_MS) {
+                    pauseRecognition();
+                }
+            }, VAD_FRAME_MS);
+            vadActive = true;
+            console.log("JS: VAD started.");
+        }
+
+        function pauseRecognition() {
+            if (!recognition || vadPaused) return;
+            vadPaused = true;
+            vadPausedAt = Date.now();
+            statusDiv.innerText = "vad_paused";
+            sendStatus("vad_paused");
+            recognition.stop();
+        }
+
+        function resumeRecognition() {
+            vadPaused = false;
+            vadResuming = true;
+            sendStatus("vad_resumed", {"paused_ms": Date.now() - vadPausedAt});
+            try { recognition.start(); } catch (e) { /* 仍在停止过程中，onend 会负责启动 */ }
+        }
+
+        // [新增] 配置热更新：切换识别语言不重新加载页面 (麦克风与 VAD 保持运行)。
+        // stop() 会先把已采集的音频作为 Final 返回，随后 onend 以新语言重新启动识别。
+        function setRecognitionLang(lang) {
+            RECOGNITION_LANG = lang;
+            if (!recognition) return;
+            recognition.lang = lang;
+            if (!vadPaused) recognition.stop();
+        }
+
         function connectWebSocket() {
             ws = new WebSocket(WS_URL);
             ws.onopen = () => {
@@ -75,6 +263,7 @@ HTML_TEMPLATE_BODY = """
             recognition = new webkitSpeechRecognition();
             recognition.continuous = true;
             recognition.interimResults = true;
+            recognition.maxAlternatives = MAX_ALTERNATIVES;
             recognition.lang = RECOGNITION_LANG;
 
             let lastResultTime = Date.now();
@@ -85,7 +274,9 @@ HTML_TEMPLATE_BODY = """
                 const isSilent = (now - lastResultTime > WATCHDOG_SILENCE_MS);
                 const isTooLong = (now - startTime > WATCHDOG_MAX_MS);
                 
-                if (statusDiv.innerText.includes("listening") && (isSilent || isTooLong)) {
+                // [修改] VAD 判定为无人说话时由 VAD 负责暂停，静音看门狗不再反复重启识别
+                const vadQuiet = vadActive && !vadSpeaking;
+                if (statusDiv.innerText.includes("listening") && ((isSilent && !vadQuiet) || isTooLong)) {
                     console.warn("JS: Watchdog triggered.");
                     statusDiv.innerText = "watchdog_restart";
                     recognition.stop(); 
@@ -97,10 +288,9 @@ HTML_TEMPLATE_BODY = """
                 lastResultTime = Date.now();
                 startTime = Date.now();
                 console.log("JS: Speech recognition started.");
-                // [新增] 发送监听状态
-                if (ws && ws.readyState === WebSocket.OPEN) {
-                    ws.send(JSON.stringify({"type": "status", "state": "listening"}));
-                }
+                // [新增] 发送监听状态 (VAD 恢复引起的启动单独标记，不计入重启次数)
+                sendStatus("listening", vadResuming ? {"resume": true} : {});
+                vadResuming = false;
             };
 
             recognition.onerror = (e) => {
@@ -111,34 +301,56 @@ HTML_TEMPLATE_BODY = """
                 }
             };
             recognition.onend = () => {
+                if (vadPaused) return;  // VAD 暂停中，等检测到语音再启动
                 statusDiv.innerText = "stopped";
                 recognition.start();
             };
 
             recognition.onresult = (event) => {
                 lastResultTime = Date.now();
+                // 事件发生时刻 (epoch 毫秒)，作为追踪链路的起点
+                const eventTs = performance.timeOrigin + event.timeStamp;
                 let combinedInterim = "";
+                let interimConfidence = null; // Chrome 的 interim 置信度通常为 0，视为未知
                 for (let i = event.resultIndex; i < event.results.length; ++i) {
                     const transcript = event.results[i][0].transcript;
+                    const confidence = event.results[i][0].confidence;
                     const isFinal = event.results[i].isFinal;
                     
                     if (isFinal) {
                         // 遇到 Final，立即发送，并清空之前的 Interim 暂存
+                        const alternatives = Array.from(event.results[i]).slice(1).map(
+                            a => ({"text": a.transcript, "confidence": a.confidence})
+                        );
                         if (ws && ws.readyState === WebSocket.OPEN) {
-                            ws.send(JSON.stringify({"text": transcript, "is_final": true}));
+                            ws.send(JSON.stringify({
+                                "text": transcript, "is_final": true,
+                                "confidence": confidence, "alternatives": alternatives,
+                                "trace_id": TRACE_PREFIX + "-" + (++traceSeq), "ts": eventTs
+                            }));
                         }
                         combinedInterim = ""; 
+                        interimConfidence = null;
+                        resetStability();
                         outputDiv.innerText = "FINAL: " + transcript;
                     } else {
                         // 累加 Interim
                         combinedInterim += transcript;
+                        if (confidence > 0) {
+                            interimConfidence = (interimConfidence === null) ? confidence : Math.min(interimConfidence, confidence);
+                        }
                     }
                 }
 
                 // 处理循环结束后剩余的 Interim
                 if (combinedInterim.length > 0) {
+                    const stableChars = stablePrefixChars(combinedInterim);
                     if (ws && ws.readyState === WebSocket.OPEN) {
-                        ws.send(JSON.stringify({"text": combinedInterim, "is_final": false}));
+                        ws.send(JSON.stringify({
+                            "text": combinedInterim, "is_final": false,
+                            "confidence": interimConfidence, "stable_chars": stableChars,
+                            "trace_id": TRACE_PREFIX + "-" + (++traceSeq), "ts": eventTs
+                        }));
                     }
                     outputDiv.innerText = "INTERIM: " + combinedInterim;
                 }
@@ -146,56 +358,264 @@ HTML_TEMPLATE_BODY = """
             recognition.start();
         }
         connectWebSocket();
+        startVad();
     </script>
 </body>
 </html>
 """
 
+def render_worker_html(config: dict) -> str:
+    """生成识别页面：把配置以常量脚本的形式插入到 <body> 之后"""
+    sr_cfg = config.get("speech_recognition", {})
+    # [新增] 注入语音识别语言配置
+    sr_lang = sr_cfg.get("language", "en-US")
+    stability_cfg = config.get("translation", {}).get("stability", {})
+    vad_cfg = sr_cfg.get("vad", {})
+    config_script = f"""
+        <script>
+            const WATCHDOG_SILENCE_MS = {sr_cfg.get("watchdog_silence_ms", 8000)};
+            const WATCHDOG_MAX_MS = {sr_cfg.get("watchdog_max_duration_ms", 60000)};
+            let RECOGNITION_LANG = "{sr_lang}";
+            const MAX_ALTERNATIVES = {int(sr_cfg.get("max_alternatives", 3))};
+            const STABILITY_REVISIONS = {int(stability_cfg.get("revisions", 2))};
+            const VAD_ENABLED = {"true" if vad_cfg.get("enabled", True) else "false"};
+            const VAD_FRAME_MS = {int(vad_cfg.get("frame_ms", 30))};
+            const VAD_MARGIN_DB = {float(vad_cfg.get("margin_db", 10.0))};
+            const VAD_MAX_ZCR = {float(vad_cfg.get("max_zcr", 0.35))};
+            const VAD_START_MS = {int(vad_cfg.get("start_ms", 90))};
+            const VAD_HANGOVER_MS = {int(vad_cfg.get("hangover_ms", 800))};
+            const VAD_IDLE_MS = {int(vad_cfg.get("idle_ms", 10000))};
+            const VAD_FLOOR_WINDOW_MS = {int(vad_cfg.get("floor_window_ms", 10000))};
+            const WS_URL = "ws://{WS_HOST}:{sr_cfg.get("ws_port", WS_PORT)}";
+        </script>
+        """
+    # 插入到 <body> 标签后
+    return HTML_TEMPLATE_BODY.replace("<body>", f"<body>{config_script}")
+
+
 class SpeechService:
-    def __init__(self, config: dict, callback, status_callback=None):
+    def __init__(self, config: dict, callback, status_callback=None, on_phase=None):
         self.config = config
         self.callback = callback
         self.status_callback = status_callback
+        # [新增] 启动阶段回调 (http_bound / ws_bound / chrome_launched / page_loaded)，用于启动时间线
+        self.on_phase = on_phase
         self.driver = None
         self.is_running = False
         self._threads = []
+        self._http_ready = threading.Event()
+
+        # [新增] 浏览器资源监督：句间静音判断所需的识别流状态
+        self.supervisor_cfg = self.config.get("chrome", {}).get("supervisor", {})
+        self._recycle_event = threading.Event()
+        # [新增] 组件监督：WS / HTTP / 浏览器各自失败后按退避时间单独重启
+        self.restart_cfg = self.config.get("speech_restart", {})
+        self._stopped = threading.Event()
+        self._recover_started = {}  # 组件名 -> 检测到失败的时刻，恢复到 listening 后记录耗时
+        self.resource_supervisor = None
+        self.html_path = "speech_worker.html"
+        sr_cfg = self.config.get("speech_recognition", {})
+        self.http_port = sr_cfg.get("http_port", HTTP_PORT)
+        self.ws_port = sr_cfg.get("ws_port", WS_PORT)
+
+        # [新增] 每次启动使用模板复制出的临时用户目录 (内存盘)，退出即删除
+        self.profile_manager = None
+        if self.config.get("chrome", {}).get("profile", {}).get("ephemeral", True):
+            self.profile_manager = ChromeProfileManager(self.config.get("chrome", {}).get("profile", {}))
+        self._last_result_time = time.monotonic()
+        self._utterance_open = False  # 收到中间结果后、Final 之前为 True
+        self._vad_paused = False
+
+        # [新增] 可选：录制识别事件流，供 replay_bench.py 回放
+        self.recorder = None
+        capture_cfg = self.config.get("capture", {})
+        if capture_cfg.get("enabled", False):
+            self.recorder = EventRecorder(capture_cfg.get("path", "captures/capture_%Y%m%d_%H%M%S.jsonl"))
 
     def start(self):
         if self.is_running: return
         self.is_running = True
-        
-        # 启动三个服务：WS, HTTP, Chrome
-        targets = [self._run_ws_server, self._run_http_server, self._run_driver]
-        for target in targets:
-            t = threading.Thread(target=target, daemon=True)
+        self._stopped.clear()
+
+        if self.profile_manager:
+            self.profile_manager.cleanup_stale()
+
+        # 准备 HTML (使用注入方式，避免 format 报错)
+        with open(self.html_path, "w", encoding="utf-8") as f:
+            f.write(render_worker_html(self.config))
+
+        # [新增] 资源监督：内存/CPU/运行时长超出预算时，在句间静音时回收浏览器
+        if self.supervisor_cfg.get("enabled", True):
+            self.resource_supervisor = BrowserSupervisor(self.supervisor_cfg, self._root_pid, self.is_quiet,
+                                                         self.recycle_browser)
+            self.resource_supervisor.start()
+
+        # 启动三个服务：WS, HTTP, Chrome (各自由监督循环守护)
+        components = {"ws": self._run_ws_server, "http": self._run_http_server, "browser": self._run_browser}
+        for name, target in components.items():
+            t = threading.Thread(target=self._supervise, args=(name, target), name=f"Speech-{name}", daemon=True)
             t.start()
             self._threads.append(t)
 
+    def _supervise(self, name, target):
+        """
+        [新增] 组件监督循环：组件异常退出后按指数退避重启，运行超过 stable_seconds 后退避时间复位。
+        target() 返回 True 表示计划内的重启 (如浏览器回收)，立即重新启动、不计入失败。
+        """
+        initial = self.restart_cfg.get("initial_backoff", 0.5)
+        backoff = initial
+        while self.is_running:
+            started = time.monotonic()
+            try:
+                planned = target()
+                error = None if planned else "exited unexpectedly"
+            except Exception as e:
+                error = str(e).splitlines()[0] if str(e) else type(e).__name__
+            if not self.is_running:
+                break
+            if error is None:
+                continue
+            failed_at = time.monotonic()
+            self._recover_started.setdefault(name, failed_at)
+            _component_restarts[name].inc()
+            if failed_at - started > self.restart_cfg.get("stable_seconds", 60.0):
+                backoff = initial
+            logger.error(f"Speech component '{name}' failed: {error}; restarting in {backoff:.1f}s")
+            if self.status_callback:
+                self.status_callback(f"Error: {name} failed, restarting")
+            if self._stopped.wait(backoff):
+                break
+            backoff = min(backoff * 2, self.restart_cfg.get("max_backoff", 30.0))
+
+    def _on_listening(self):
+        # 失败的组件已恢复：记录从检测到失败到重新进入监听的耗时
+        now = time.monotonic()
+        for name, failed_at in list(self._recover_started.items()):
+            _recover_latency.observe(now - failed_at)
+            logger.info(f"Speech component '{name}' recovered in {now - failed_at:.2f}s")
+        self._recover_started.clear()
+
+    def _phase(self, name):
+        if self.on_phase:
+            try:
+                self.on_phase(name)
+            except Exception as e:
+                logger.error(f"Phase callback failed: {e}")
+
+    def apply_config(self, config):
+        """
+        [新增] 配置热更新：重写识别页面 (其他识别参数在浏览器下次重启时生效)，
+        识别语言变化时直接推送到当前页面，不重启浏览器
+        """
+        old_lang = self.config.get("speech_recognition", {}).get("language", "en-US")
+        new_lang = config.get("speech_recognition", {}).get("language", "en-US")
+        self.config = config
+        try:
+            with open(self.html_path, "w", encoding="utf-8") as f:
+                f.write(render_worker_html(config))
+        except OSError as e:
+            logger.error(f"Failed to rewrite {self.html_path}: {e}")
+        if new_lang == old_lang:
+            return
+        driver = self.driver
+        if driver is None:
+            return  # 浏览器正在重启，新页面已使用新语言
+        try:
+            driver.execute_script("setRecognitionLang(arguments[0]);", new_lang)
+            logger.info(f"Recognition language switched to {new_lang}")
+        except Exception as e:
+            logger.error(f"Failed to push recognition language: {e}")
+
     def stop(self):
         self.is_running = False
-        if self.driver:
-            try: self.driver.quit()
-            except: pass
+        self._stopped.set()
+        self._recycle_event.set()
+        if self.resource_supervisor:
+            self.resource_supervisor.stop()
+        if self.recorder:
+            self.recorder.close()
+        self._quit_driver()
+
+    def _quit_driver(self, graceful=True):
+        """
+        [修改] 关闭浏览器：先在限时内尝试 driver.quit() (浏览器崩溃时跳过)，再结束整个进程组，
+        保证无论 quit 是否卡住，返回时不残留 Chrome 进程。
+        """
+        driver, self.driver = self.driver, None
+        if driver is None:
+            return
+        process = getattr(driver.service, "process", None)
+        if graceful:
+            def quit_driver():
+                try: driver.quit()
+                except: pass
+            t = threading.Thread(target=quit_driver, daemon=True)
+            t.start()
+            t.join(self.restart_cfg.get("quit_timeout", 2.0))
+        _kill_process_group(process)
+
+    def _root_pid(self):
+        """浏览器进程树的根 (chromedriver) PID，Chrome 为其子进程"""
+        try:
+            return self.driver.service.process.pid
+        except AttributeError:
+            return None
+
+    def is_quiet(self):
+        """
+        [新增] 是否处于句间静音：页面 VAD 已暂停识别，或距最后一条识别结果超过 quiet_seconds 且没有未完成的句子。
+        句子迟迟等不到 Final (识别被重启) 时，静音超过 3 倍 quiet_seconds 也视为安静。
+        """
+        if self._vad_paused:
+            return True
+        silence = time.monotonic() - self._last_result_time
+        quiet_seconds = self.supervisor_cfg.get("quiet_seconds", 2.0)
+        return silence >= quiet_seconds and (not self._utterance_open or silence >= 3 * quiet_seconds)
+
+    def recycle_browser(self, reason="manual"):
+        """请求重启浏览器 (异步执行，由驱动线程关闭并重新拉起 Chrome)"""
+        logger.info(f"Browser recycle requested ({reason})")
+        self._recycle_event.set()
 
     def _run_http_server(self):
         """简单的 HTTP 服务器，让 Chrome 在安全上下文中运行"""
         handler = http.server.SimpleHTTPRequestHandler
         # 屏蔽 HTTP 服务器的控制台日志，避免干扰
         handler.log_message = lambda *args: None 
-        with socketserver.TCPServer((WS_HOST, HTTP_PORT), handler) as httpd:
-            logger.info(f"HTTP Server started on {WS_HOST}:{HTTP_PORT}")
+        with _ReusableTCPServer((WS_HOST, self.http_port), handler) as httpd:
+            httpd.timeout = 1.0  # handle_request 定期返回，以便检查 is_running
+            logger.info(f"HTTP Server started on {WS_HOST}:{self.http_port}")
+            self._http_ready.set()
+            self._phase("http_bound")
             while self.is_running:
                 httpd.handle_request()
+        return True
 
     def _run_ws_server(self):
         async def handler(websocket):
             logger.info("WS: Client connected")
+            _ws_connections.inc()
+            listening_count = 0
             try:
                 async for message in websocket:
+                    _ws_messages.inc()
                     data = json.loads(message)
                     # [新增] 处理状态回传
                     if "type" in data:
                         msg_type = data["type"]
+                        if msg_type == "status" and data.get("state") == "listening":
+                            # 每次 onstart 都会回传 listening，首次之后的均为重启 (VAD 恢复除外)
+                            listening_count += 1
+                            if self._recover_started:
+                                self._on_listening()
+                            if listening_count > 1 and not data.get("resume"):
+                                _recognizer_restarts.inc()
+                        elif msg_type == "status" and data.get("state") == "vad_paused":
+                            _vad_pauses.inc()
+                            self._vad_paused = True
+                        elif msg_type == "status" and data.get("state") == "vad_resumed":
+                            _vad_paused_seconds.inc(data.get("paused_ms", 0) / 1000.0)
+                            self._vad_paused = False
                         if msg_type == "status" and self.status_callback:
                             self.status_callback(data["state"])
                         elif msg_type == "error":
@@ -205,50 +625,78 @@ class SpeechService:
                                 self.status_callback(f"Error: {err_msg}")
                     else:
                         # 兼容旧协议：纯文本识别结果
-                        self.callback(data.get("text", ""), data.get("is_final", False))
+                        text = data.get("text", "")
+                        is_final = data.get("is_final", False)
+                        self._last_result_time = time.monotonic()
+                        self._utterance_open = not is_final
+                        if self.recorder:
+                            self.recorder.record(data)
+                        # [新增] 追踪起点：浏览器事件时间 + WS 接收时间
+                        trace_id = data.get("trace_id")
+                        if trace_id:
+                            tracer.begin(trace_id, is_final=is_final, chars=len(text))
+                            if "ts" in data:
+                                tracer.mark(trace_id, "browser_event", ts=data["ts"] / 1000.0)
+                            tracer.mark(trace_id, "ws_recv")
+                        self.callback(text, is_final, data)
             except: pass
+            # 页面断开 (如浏览器被回收) 后暂停状态随之失效
+            self._vad_paused = False
 
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         async def main():
             try:
-                async with websockets.serve(handler, WS_HOST, WS_PORT):
+                async with websockets.serve(handler, WS_HOST, self.ws_port):
+                    self._phase("ws_bound")
                     await asyncio.get_running_loop().create_future()
             except OSError as e:
-                # [新增] 端口占用捕获
-                logger.error(f"WS Port {WS_PORT} is busy: {e}")
+                # [新增] 端口占用捕获 (由监督循环退避后重试)
                 if self.status_callback:
-                    self.status_callback(f"Port {WS_PORT} Busy!")
+                    self.status_callback(f"Port {self.ws_port} Busy!")
+                raise RuntimeError(f"WS port {self.ws_port} is busy: {e}")
 
         try:
             loop.run_until_complete(main())
-        except Exception as e:
-            logger.error(f"WS Server error: {e}", exc_info=True)
+        finally:
+            loop.close()
 
-    def _run_driver(self):
-        chrome_cfg = self.config.get("chrome", {})
-        sr_cfg = self.config.get("speech_recognition", {})
-        
-        # 1. 准备 HTML (使用注入方式，避免 format 报错)
-        html_path = "speech_worker.html"
-        
-        # 构造配置脚本块
-        # [新增] 注入语音识别语言配置
-        sr_lang = sr_cfg.get("language", "en-US")
-        config_script = f"""
-        <script>
-            const WATCHDOG_SILENCE_MS = {sr_cfg.get("watchdog_silence_ms", 8000)};
-            const WATCHDOG_MAX_MS = {sr_cfg.get("watchdog_max_duration_ms", 60000)};
-            const RECOGNITION_LANG = "{sr_lang}";
-            const WS_URL = "ws://{WS_HOST}:{WS_PORT}";
-        </script>
+    def _run_browser(self):
         """
-        
-        # 插入到 <body> 标签后
-        final_html = HTML_TEMPLATE_BODY.replace("<body>", f"<body>{config_script}")
-        
-        with open(html_path, "w", encoding="utf-8") as f:
-            f.write(final_html)
+        [修改] 一次浏览器生命周期：启动 Chrome 并守护到回收请求 (返回 True) 或崩溃 (抛出异常，由监督循环重启)。
+        崩溃检测：每秒检查 chromedriver 是否退出，每 health_interval 秒在页面中执行一次脚本确认渲染进程存活。
+        """
+        self._recycle_event.clear()
+        crashed = True
+        profile_dir = None
+        try:
+            if self.profile_manager:
+                profile_dir = self.profile_manager.create(mic_origins=[f"http://{WS_HOST}:{self.http_port}"])
+            else:
+                profile_dir = os.path.abspath("chrome_data")
+            self._launch_browser(self._chrome_options(profile_dir), self.html_path)
+            if self.resource_supervisor:
+                self.resource_supervisor.notify_relaunched()
+            health_interval = self.restart_cfg.get("health_interval", 2.0)
+            last_check = time.monotonic()
+            while self.is_running and not self._recycle_event.wait(1):
+                process = getattr(self.driver.service, "process", None)
+                if process is not None and process.poll() is not None:
+                    raise RuntimeError(f"chromedriver exited with code {process.returncode}")
+                if time.monotonic() - last_check >= health_interval:
+                    last_check = time.monotonic()
+                    self.driver.execute_script("return 1")
+            crashed = False
+            if self.is_running:
+                logger.info("Restarting browser...")
+            return True
+        finally:
+            self._quit_driver(graceful=not crashed)
+            if self.profile_manager and profile_dir:
+                self.profile_manager.release(profile_dir)
+
+    def _chrome_options(self, profile_dir):
+        chrome_cfg = self.config.get("chrome", {})
 
         # 2. 配置 Chrome
         options = Options()
@@ -294,37 +742,44 @@ class SpeechService:
                 logger.info(f"Using SOCKS5 Proxy: {socks5_addr}")
 
         # [修复] 解决 DevToolsActivePort 错误 & 权限问题
-        options.add_argument("--remote-debugging-port=9222")
-        options.add_argument(f'--user-data-dir={os.path.abspath("chrome_data")}')
+        # [修改] 调试端口由 Chrome 自选 (写入用户目录下的 DevToolsActivePort)，多个实例不再冲突
+        options.add_argument("--remote-debugging-port=0")
+        options.add_argument(f'--user-data-dir={profile_dir}')
         
         if chrome_cfg.get("use_headless", True):
             options.add_argument("--headless=new")
 
         binary_path = chrome_cfg.get("binary_path", "")
         if os.path.exists(binary_path): options.binary_location = binary_path
+        return options
 
-        try:
-            self.driver = webdriver.Chrome(options=options)
-            
-            # [隐蔽] 终极绝招：通过 CDP 在页面加载前修改 navigator.webdriver
-            # 这比简单的 JS 注入更有效，因为它发生在任何网页脚本运行之前
-            self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
-                "source": """
-                    Object.defineProperty(navigator, 'webdriver', {
-                        get: () => undefined
-                    })
-                """
-            })
-            
-            logger.info(f"Chrome started. Opening http://{WS_HOST}:{HTTP_PORT}/{html_path}")
-            self.driver.get(f"http://{WS_HOST}:{HTTP_PORT}/{html_path}")
-            
-            # [优化] 移除日志轮询，降低 CPU 占用
-            # 仅做简单的存活检查
-            while self.is_running:
-                time.sleep(1)
-                
-        except Exception as e:
-            logger.error(f"Driver error: {e}", exc_info=True)
-        finally:
-            self.stop()
\ No newline at end of file
+    def _launch_browser(self, options, html_path):
+        # [新增] chromedriver 在独立会话/进程组中启动，Chrome 继承该进程组，关闭时可整组结束
+        popen_kw = {"start_new_session": True} if os.name == "posix" else \
+            {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        driver_path = self.config.get("chrome", {}).get("driver_path", "")
+        service = Service(executable_path=driver_path if os.path.exists(driver_path) else None, popen_kw=popen_kw)
+        start = time.perf_counter()
+        self.driver = webdriver.Chrome(service=service, options=options)
+        _launch_latency["driver"].observe(time.perf_counter() - start)
+        self.driver.set_script_timeout(5)  # 健康检查脚本卡住时尽快报错
+        self._phase("chrome_launched")
+        
+        # [隐蔽] 终极绝招：通过 CDP 在页面加载前修改 navigator.webdriver
+        # 这比简单的 JS 注入更有效，因为它发生在任何网页脚本运行之前
+        self.driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {
+            "source": """
+                Object.defineProperty(navigator, 'webdriver', {
+                    get: () => undefined
+                })
+            """
+        })
+        
+        # 三个服务并行启动，Chrome 通常最慢；万一 HTTP 端口尚未绑定，稍等再打开页面
+        if not self._http_ready.wait(5.0):
+            logger.warning("HTTP server not ready after 5s, opening page anyway")
+        logger.info(f"Chrome started. Opening http://{WS_HOST}:{self.http_port}/{html_path}")
+        self.driver.get(f"http://{WS_HOST}:{self.http_port}/{html_path}")
+        _launch_latency["page"].observe(time.perf_counter() - start)
+        logger.info(f"Chrome ready in {time.perf_counter() - start:.2f}s")
+        self._phase("page_loaded")
\ No newline at end of file
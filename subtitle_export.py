@@ -0,0 +1,124 @@
+"""
+实时双语字幕导出 (SRT / WebVTT)。
+
+作为 Final 结果的持久化出口，边识别边追加写入字幕文件，录屏/直播结束后可直接导入剪辑软件。
+- 字幕时间取自浏览器识别时间戳：开始 = 该句第一条识别结果的时间，结束 = Final 结果的时间，
+  与翻译何时完成无关；时间轴以导出器创建时刻 (程序启动) 为零点，可用 offset 校准
+- 每条字幕写完立即 flush 到操作系统 (进程崩溃最多丢失正在写的一条)，fsync 按批进行 (兼顾断电场景与磁盘开销)
+- 写入在后台线程进行，submit() 不阻塞调用方；调用方需按识别顺序提交 (见 main._emit_final)
+"""
+import os
+import time
+import queue
+import logging
+import threading
+
+from metrics import registry
+
+logger = logging.getLogger("SubtitleExport")
+
+_cues_written = registry.counter("subtitle_cues_written_total", "Subtitle cues appended to export files")
+
+
+def format_timestamp(seconds, sep=","):
+    """SRT 使用 "00:01:02,345"，WebVTT 使用 "00:01:02.345" """
+    millis = max(0, int(round(seconds * 1000)))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{sep}{millis:03d}"
+
+
+class SubtitleExporter:
+    """Final 出口：把每句 (原文, 译文, 起止时间) 追加为一条字幕"""
+    def __init__(self, cfg: dict, origin=None):
+        self.origin = origin if origin is not None else time.time()
+        self.offset = cfg.get("offset", 0.0)
+        self.min_duration = cfg.get("min_duration", 1.0)
+        self.translation_first = cfg.get("translation_first", True)
+        self.fsync_every = cfg.get("fsync_every", 10)
+        base = time.strftime(cfg.get("path", "subtitles/session_%Y%m%d_%H%M%S"))
+        directory = os.path.dirname(base)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._files = {}
+        for fmt in cfg.get("formats", ["srt", "vtt"]):
+            if fmt not in ("srt", "vtt"):
+                logger.warning(f"Unknown subtitle format '{fmt}', skipped")
+                continue
+            f = open(f"{base}.{fmt}", "w", encoding="utf-8")
+            if fmt == "vtt":
+                f.write("WEBVTT\n\n")
+                f.flush()
+            self._files[fmt] = f
+        self._index = 0
+        self._last_end = 0.0
+        self._unsynced = 0
+        self._closed = False
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._writer, name="SubtitleWriter", daemon=True)
+        self._thread.start()
+        logger.info(f"Exporting subtitles to {base}.{{{','.join(self._files)}}}")
+
+    def submit(self, segment):
+        if not self._closed:
+            self._queue.put(segment)
+
+    def _cue_times(self, segment):
+        end = segment["end"] - self.origin + self.offset
+        start = (segment.get("start") or segment["end"]) - self.origin + self.offset
+        # 出口按识别顺序提交，只与上一条 (识别顺序相邻) 去重叠；开始时间最多推迟到本句自己的结束时间，
+        # 不会因前面的句子一再顺延而越过后面识别的句子。至少显示 min_duration 秒 (Final 与首个识别结果几乎同时到达时)
+        start = max(min(max(start, self._last_end), end), 0.0)
+        end = max(end, start + self.min_duration)
+        self._last_end = end
+        return start, end
+
+    def _writer(self):
+        while True:
+            segment = self._queue.get()
+            if segment is None:
+                return
+            try:
+                self._write_cue(segment)
+            except Exception as e:
+                logger.error(f"Failed to write subtitle cue: {e}")
+
+    def _write_cue(self, segment):
+        start, end = self._cue_times(segment)
+        self._index += 1
+        lines = [segment["text"]]
+        if segment.get("translation"):
+            if self.translation_first:
+                lines.insert(0, segment["translation"])
+            else:
+                lines.append(segment["translation"])
+        body = "\n".join(line.replace("-->", "->") for line in lines)
+
+        for fmt, f in self._files.items():
+            if fmt == "srt":
+                f.write(f"{self._index}\n{format_timestamp(start)} --> {format_timestamp(end)}\n{body}\n\n")
+            else:
+                f.write(f"{format_timestamp(start, '.')} --> {format_timestamp(end, '.')}\n{body}\n\n")
+            f.flush()
+        _cues_written.inc()
+
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every or self._queue.empty():
+            # 队列空闲或攒满一批时落盘；语速很快时多条字幕共用一次 fsync
+            for f in self._files.values():
+                os.fsync(f.fileno())
+            self._unsynced = 0
+
+    def close(self, timeout=5.0):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+        for f in self._files.values():
+            try:
+                f.close()
+            except Exception:
+                pass
@@ -0,0 +1,133 @@
+import json
+import time
+import logging
+import threading
+import itertools
+from collections import OrderedDict
+
+logger = logging.getLogger("Tracer")
+
+# 一句话在管线中依次经过的打点阶段 (仅用于文档和导出排序，不强制)
+STAGES = [
+    "browser_event",   # recognition.onresult 触发时间 (浏览器时钟)
+    "ws_recv",         # WS 服务端收到消息
+    "enqueue",         # 进入 msg_queue
+    "dequeue",         # process_queue 取出
+    "render_en",       # 原文标签已刷新
+    "trigger",         # 翻译触发决策完成 (args.reason)
+    "trans_dequeue",   # 翻译线程从 trans_queue 取出
+    "translate_start",
+    "translate_end",
+    "render",          # Tk 主线程完成译文渲染
+]
+
+
+class Tracer:
+    """
+    逐句延迟追踪器。
+    每条识别结果携带一个 trace id，沿途各阶段调用 mark() 打点；
+    记录保存在定长环形缓冲区中 (超出容量丢弃最旧的)，可导出为 Chrome trace-event JSON，
+    用 chrome://tracing 或 https://ui.perfetto.dev 打开即可查看每一段耗时。
+    """
+    def __init__(self, capacity=1000, enabled=True):
+        self.enabled = enabled
+        self.capacity = capacity
+        self._traces = OrderedDict()  # trace_id -> {"args": {}, "marks": [(stage, ts)]}
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+
+    def configure(self, cfg: dict):
+        self.enabled = cfg.get("enabled", True)
+        self.capacity = max(1, int(cfg.get("capacity", 1000)))
+
+    def begin(self, trace_id=None, **args):
+        """
+        登记一条新的追踪记录，返回 trace id (未传入时自动生成)。
+        """
+        if not self.enabled:
+            return trace_id
+        if not trace_id:
+            trace_id = f"py-{next(self._seq)}"
+        with self._lock:
+            rec = self._traces.get(trace_id)
+            if rec is None:
+                rec = {"args": {}, "marks": []}
+                self._traces[trace_id] = rec
+                # 环形缓冲：超出容量时淘汰最旧的记录
+                while len(self._traces) > self.capacity:
+                    self._traces.popitem(last=False)
+            if args:
+                rec["args"].update(args)
+        return trace_id
+
+    def mark(self, trace_id, stage, ts=None, **args):
+        """
+        为指定 trace 记录一个阶段时间点 (秒级 epoch 时间戳)。
+        已被淘汰或未登记的 trace 直接忽略。
+        """
+        if not self.enabled or not trace_id:
+            return
+        if ts is None:
+            ts = time.time()
+        with self._lock:
+            rec = self._traces.get(trace_id)
+            if rec is None:
+                return
+            rec["marks"].append((stage, ts))
+            if args:
+                rec["args"].update(args)
+
+    def snapshot(self):
+        """返回当前缓冲区内所有记录的拷贝: [(trace_id, args, marks)]"""
+        with self._lock:
+            return [(tid, dict(rec["args"]), list(rec["marks"])) for tid, rec in self._traces.items()]
+
+    def to_chrome_trace(self):
+        """
+        转换为 Chrome trace-event 格式。
+        每条 trace 是一个异步事件 (ph=b/e)，相邻两个打点之间生成一个嵌套的子区间，
+        名称为 "起点→终点"，这样在时间轴上能直接看到每一段等待/处理的耗时。
+        """
+        events = []
+        for trace_id, args, marks in self.snapshot():
+            if not marks:
+                continue
+            marks.sort(key=lambda m: m[1])
+            t0 = marks[0][1]
+            t_end = marks[-1][1]
+            label = "final" if args.get("is_final") else "interim"
+            base = {"cat": "utterance", "id": trace_id, "pid": 1, "tid": 1}
+            events.append(dict(base, name=label, ph="b", ts=int(t0 * 1e6), args=args))
+            for (stage, ts), (next_stage, next_ts) in zip(marks, marks[1:]):
+                name = f"{stage}→{next_stage}"
+                events.append(dict(base, name=name, ph="b", ts=int(ts * 1e6)))
+                events.append(dict(base, name=name, ph="e", ts=int(next_ts * 1e6)))
+            events.append(dict(base, name=label, ph="e", ts=int(t_end * 1e6)))
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def stage_summary(self):
+        """
+        按 "起点→终点" 汇总各区间的平均/最大耗时 (毫秒)，用于退出时打印概要。
+        """
+        spans = {}
+        for _, _, marks in self.snapshot():
+            marks.sort(key=lambda m: m[1])
+            for (stage, ts), (next_stage, next_ts) in zip(marks, marks[1:]):
+                spans.setdefault(f"{stage}→{next_stage}", []).append((next_ts - ts) * 1000.0)
+        return {
+            name: {"count": len(v), "avg_ms": sum(v) / len(v), "max_ms": max(v)}
+            for name, v in spans.items()
+        }
+
+    def export(self, path):
+        """将环形缓冲区导出到文件，返回写出的 trace 数量"""
+        data = self.to_chrome_trace()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        count = len({e["id"] for e in data["traceEvents"]})
+        logger.info(f"Exported {count} traces to {path}")
+        return count
+
+
+# 全局追踪器 (由 AppController 根据配置初始化)
+tracer = Tracer()
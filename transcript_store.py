@@ -0,0 +1,225 @@
+"""
+会话转写存档 (SQLite + FTS5 全文索引)。
+
+每条 Final 结果 (原文、译文、浏览器识别时间、翻译延迟) 追加写入 transcripts.db，跨会话保存。
+写入全部在后台线程完成：调用方 submit() 只做一次有界队列入队，队列满时丢弃并计数，
+绝不阻塞 UI 线程或翻译线程；后台线程攒批后一次事务提交 (WAL + synchronous=FULL，即每批一次 fsync)。
+
+用法:
+    python transcript_store.py search "kubernetes"          # 全文检索 (原文或译文，支持中文子串)
+    python transcript_store.py search "延迟" --limit 50
+    python transcript_store.py sessions                      # 列出历史会话
+    python transcript_store.py show 12                       # 输出某个会话的完整转写
+"""
+import os
+import sys
+import time
+import queue
+import sqlite3
+import logging
+import argparse
+import threading
+
+from metrics import registry
+
+logger = logging.getLogger("TranscriptStore")
+
+_segments_written = registry.counter("transcript_segments_written_total", "Final segments committed to the transcript store")
+_segments_dropped = registry.counter("transcript_segments_dropped_total", "Final segments dropped because the writer queue was full")
+_commit_latency = registry.histogram("transcript_commit_seconds", "Transcript store batch commit time",
+                                     buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    source_lang TEXT,
+    target_lang TEXT
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    start_ts REAL,
+    end_ts REAL NOT NULL,
+    source TEXT NOT NULL,
+    translation TEXT,
+    latency REAL
+);
+CREATE INDEX IF NOT EXISTS segments_session ON segments(session_id, end_ts);
+"""
+
+
+def _create_fts(conn):
+    """优先使用 trigram 分词 (中文子串可检索)，旧版 SQLite 退回 unicode61"""
+    for tokenizer in ("trigram", "unicode61"):
+        try:
+            conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5("
+                         f"source, translation, content='segments', content_rowid='id', tokenize='{tokenizer}')")
+            return True
+        except sqlite3.OperationalError:
+            continue
+    logger.warning("SQLite FTS5 not available, search falls back to LIKE scans")
+    return False
+
+
+def open_db(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=FULL")
+    conn.execute("PRAGMA cache_size=-4096")  # 页缓存上限 4MB，长时间运行内存不增长
+    conn.executescript(_SCHEMA)
+    has_fts = _create_fts(conn)
+    conn.commit()
+    return conn, has_fts
+
+
+class TranscriptStore:
+    """
+    Final 结果的只追加存档。submit() 线程安全且不阻塞；close() 写完剩余数据并记录会话结束时间。
+    """
+    def __init__(self, cfg: dict, source_lang=None, target_lang=None):
+        self.path = cfg.get("path", "transcripts.db")
+        self.batch_size = cfg.get("batch_size", 20)
+        self.batch_interval = cfg.get("batch_interval", 2.0)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._queue = queue.Queue(maxsize=cfg.get("max_pending", 1000))
+        self._conn, self._has_fts = open_db(self.path)
+        cur = self._conn.execute("INSERT INTO sessions (started_at, source_lang, target_lang) VALUES (?, ?, ?)",
+                                 (time.time(), source_lang, target_lang))
+        self.session_id = cur.lastrowid
+        self._conn.commit()
+        self._closed = False
+
+        registry.gauge("transcript_queue_depth", "Segments waiting for the transcript writer", func=self._queue.qsize)
+        self._thread = threading.Thread(target=self._writer, name="TranscriptWriter", daemon=True)
+        self._thread.start()
+        logger.info(f"Transcript store opened: {self.path} (session {self.session_id})")
+
+    def submit(self, segment):
+        """
+        segment: {"start": 识别开始时间(秒), "end": Final 识别时间(秒), "text": 原文,
+                  "translation": 译文, "latency": Final 到译文的耗时(秒)}
+        """
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait(segment)
+        except queue.Full:
+            _segments_dropped.inc()
+
+    def _writer(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # 批次超时
+            if item is None:  # close() 发出的结束标记
+                self._flush(batch)
+                return
+            if item:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.batch_interval
+            if batch and (len(batch) >= self.batch_size or item is False):
+                self._flush(batch)
+                batch = []
+                deadline = None
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        start = time.perf_counter()
+        try:
+            with self._conn:
+                for seg in batch:
+                    cur = self._conn.execute(
+                        "INSERT INTO segments (session_id, start_ts, end_ts, source, translation, latency) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (self.session_id, seg.get("start"), seg["end"], seg["text"],
+                         seg.get("translation"), seg.get("latency")))
+                    if self._has_fts:
+                        self._conn.execute("INSERT INTO segments_fts (rowid, source, translation) VALUES (?, ?, ?)",
+                                           (cur.lastrowid, seg["text"], seg.get("translation") or ""))
+                self._conn.execute("UPDATE sessions SET ended_at = ? WHERE id = ?", (batch[-1]["end"], self.session_id))
+            _segments_written.inc(len(batch))
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} transcript segments: {e}")
+        _commit_latency.observe(time.perf_counter() - start)
+
+    def close(self, timeout=5.0):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+        try:
+            self._conn.execute("UPDATE sessions SET ended_at = ? WHERE id = ?", (time.time(), self.session_id))
+            self._conn.commit()
+            self._conn.close()
+        except Exception as e:
+            logger.error(f"Failed to close transcript store: {e}")
+
+
+def search(conn, has_fts, query, limit=20):
+    """返回 [(session_id, end_ts, source, translation)]，按时间倒序"""
+    if has_fts and len(query) >= 3:
+        phrase = '"' + query.replace('"', '""') + '"'
+        sql = ("SELECT s.session_id, s.end_ts, s.source, s.translation FROM segments_fts f "
+               "JOIN segments s ON s.id = f.rowid WHERE segments_fts MATCH ? ORDER BY s.end_ts DESC LIMIT ?")
+        return conn.execute(sql, (phrase, limit)).fetchall()
+    # trigram 分词要求至少 3 个字符，更短的查询 (如两个汉字) 走 LIKE
+    pattern = f"%{query}%"
+    sql = ("SELECT session_id, end_ts, source, translation FROM segments "
+           "WHERE source LIKE ? OR translation LIKE ? ORDER BY end_ts DESC LIMIT ?")
+    return conn.execute(sql, (pattern, pattern, limit)).fetchall()
+
+
+def _fmt_time(ts):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)) if ts else "-"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search and browse saved session transcripts")
+    parser.add_argument("--db", default="transcripts.db", help="transcript database path")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_search = sub.add_parser("search", help="full-text search over source and translation")
+    p_search.add_argument("query")
+    p_search.add_argument("--limit", type=int, default=20)
+    sub.add_parser("sessions", help="list sessions")
+    p_show = sub.add_parser("show", help="print one session")
+    p_show.add_argument("session_id", type=int)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"{args.db} not found", file=sys.stderr)
+        return 1
+    conn, has_fts = open_db(args.db)
+    if args.command == "search":
+        start = time.perf_counter()
+        rows = search(conn, has_fts, args.query, args.limit)
+        for session_id, end_ts, source, translation in rows:
+            print(f"[{_fmt_time(end_ts)}] #{session_id} {source}\n    {translation or ''}")
+        print(f"{len(rows)} results in {(time.perf_counter() - start) * 1000:.1f}ms", file=sys.stderr)
+    elif args.command == "sessions":
+        rows = conn.execute("SELECT s.id, s.started_at, s.ended_at, s.source_lang, s.target_lang, COUNT(g.id) "
+                            "FROM sessions s LEFT JOIN segments g ON g.session_id = s.id "
+                            "GROUP BY s.id ORDER BY s.id").fetchall()
+        for session_id, started, ended, src, tgt, count in rows:
+            print(f"#{session_id}  {_fmt_time(started)} -> {_fmt_time(ended)}  {src}->{tgt}  {count} segments")
+    elif args.command == "show":
+        rows = conn.execute("SELECT end_ts, source, translation FROM segments WHERE session_id = ? ORDER BY end_ts",
+                            (args.session_id,)).fetchall()
+        for end_ts, source, translation in rows:
+            print(f"[{_fmt_time(end_ts)}] {source}\n    {translation or ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import re
+import time
+import zlib
+import random
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+
+logger = logging.getLogger("TranslationMemory")
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+# MinHash 参数：32 维签名，分成 8 个 band，每 band 4 行。
+# 相似度 0.8 的文本被召回的概率约 98.5%，无关文本 (相似度 ~0.05) 成为候选的概率约 5e-5，
+# 10 万条记录下每次查询只需核对个位数的候选。
+NUM_PERM = 32            # 必须是 2 的幂
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 4
+_BIN_SHIFT = 32 - (NUM_PERM.bit_length() - 1)
+_VALUE_MASK = (1 << _BIN_SHIFT) - 1
+_EMPTY = 1 << 32
+
+
+def normalize(text):
+    """大小写折叠、去标点、合并空白，使 "Hello, world" 与 "hello world" 视为同一句"""
+    text = _PUNCT_RE.sub(" ", text.casefold())
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def shingles(norm):
+    """字符 n-gram 集合 (对中日韩文本同样有效)，短文本退化为整句"""
+    if len(norm) <= SHINGLE_SIZE:
+        return {norm}
+    return {norm[i:i + SHINGLE_SIZE] for i in range(len(norm) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_set):
+    """
+    One-Permutation MinHash：每个 shingle 只哈希一次，高位决定落入哪个槽，低位参与取最小值，
+    空槽用右侧最近的非空槽填充 (rotation densification)。代价 O(n) 而不是 O(n * NUM_PERM)。
+    crc32 是确定性的 (不受 PYTHONHASHSEED 影响)，签名可跨进程复用。
+    """
+    sig = [_EMPTY] * NUM_PERM
+    for s in shingle_set:
+        h = (zlib.crc32(s.encode("utf-8")) * 0x9E3779B1) & 0xFFFFFFFF
+        b = h >> _BIN_SHIFT
+        v = h & _VALUE_MASK
+        if v < sig[b]:
+            sig[b] = v
+    if _EMPTY in sig:
+        filled = list(sig)
+        for i in range(NUM_PERM):
+            if sig[i] != _EMPTY:
+                continue
+            for d in range(1, NUM_PERM):
+                j = (i + d) % NUM_PERM
+                if sig[j] != _EMPTY:
+                    # 加上距离偏移，避免借用同一槽位的两个空槽总是相等 (d < NUM_PERM，结果仍在 32 位内)
+                    filled[i] = sig[j] + d * (_VALUE_MASK + 1)
+                    break
+        sig = filled
+    return array("I", sig)
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class TMHit:
+    __slots__ = ("source", "translation", "score")
+
+    def __init__(self, source, translation, score):
+        self.source = source
+        self.translation = translation
+        self.score = score
+
+
+class TranslationMemory:
+    """
+    模糊翻译记忆：
+    - 规范化后完全相同的句子走字典直接命中 (score=1.0)
+    - 其余通过 MinHash-LSH 找候选，再用字符 n-gram 的 Jaccard 精确打分，返回最相似的一条
+    容量满后按最久未使用淘汰。
+    """
+    def __init__(self, max_entries=200000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # norm -> (source, translation, signature)
+        self._buckets = [dict() for _ in range(BANDS)]  # band key -> set(norm)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _band_keys(signature):
+        return [tuple(signature[i * ROWS:(i + 1) * ROWS]) for i in range(BANDS)]
+
+    def add(self, source, translation):
+        norm = normalize(source)
+        if not norm:
+            return
+        signature = minhash(shingles(norm))
+        with self._lock:
+            if norm in self._entries:
+                self._remove(norm)
+            self._entries[norm] = (source, translation, signature)
+            for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                bucket.setdefault(key, set()).add(norm)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for bucket in self._buckets:
+                bucket.clear()
+
+    def _remove(self, norm):
+        _, _, signature = self._entries.pop(norm)
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            members = bucket.get(key)
+            if members is not None:
+                members.discard(norm)
+                if not members:
+                    del bucket[key]
+
+    def lookup(self, text, min_score=0.0):
+        """返回相似度不低于 min_score 的最佳匹配 TMHit，没有则返回 None"""
+        norm = normalize(text)
+        if not norm:
+            return None
+        with self._lock:
+            entry = self._entries.get(norm)
+            if entry is not None:
+                self._entries.move_to_end(norm)
+                return TMHit(entry[0], entry[1], 1.0)
+
+        query_shingles = shingles(norm)
+        signature = minhash(query_shingles)
+        with self._lock:
+            candidates = set()
+            for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                members = bucket.get(key)
+                if members:
+                    candidates.update(members)
+            best, best_score = None, min_score
+            for cand in candidates:
+                score = jaccard(query_shingles, shingles(cand))
+                if score >= best_score:
+                    best, best_score = cand, score
+            if best is None:
+                return None
+            self._entries.move_to_end(best)
+            source, translation, _ = self._entries[best]
+        return TMHit(source, translation, best_score)
+
+
+def _benchmark(n=100000, queries=2000):
+    """python translation_memory.py：10 万条随机句子下的查询耗时"""
+    rng = random.Random(1)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    vocab = ["".join(rng.choice(letters) for _ in range(rng.randint(2, 9))) for _ in range(5000)]
+    tm = TranslationMemory(max_entries=n)
+    sentences = []
+    start = time.perf_counter()
+    for i in range(n):
+        sentence = " ".join(rng.choice(vocab) for _ in range(rng.randint(6, 16)))
+        sentences.append(sentence)
+        tm.add(sentence, f"t{i}")
+    build = time.perf_counter() - start
+
+    near = []
+    for s in rng.sample(sentences, queries):
+        words = s.split()
+        words[rng.randrange(len(words))] = rng.choice(vocab)  # 改动一个词
+        near.append(" ".join(words).upper() + "?")
+    misses = [" ".join(rng.choice(vocab) for _ in range(10)) for _ in range(queries)]
+
+    for label, batch in (("near-duplicate", near), ("unrelated", misses)):
+        hits = 0
+        start = time.perf_counter()
+        for q in batch:
+            if tm.lookup(q, min_score=0.5):
+                hits += 1
+        per_query = (time.perf_counter() - start) / len(batch) * 1e6
+        print(f"{label:15s} {per_query:8.1f} us/lookup  hit rate {hits / len(batch):.1%}")
+    print(f"built {n} entries in {build:.1f}s")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,256 @@
+"""
+独立进程中的翻译服务。
+
+主进程里 Tk 主循环、WS 事件循环、指标端点和翻译线程共用一个 GIL，翻译侧的正则/JSON 处理在高负载时
+会挤占 UI 动画帧。开启 translator_process.enabled 后，翻译链 (语种识别、术语表、Google 翻译、LRU 缓存)
+整体运行在子进程中，主进程只通过管道收发 JSON 行：
+
+    请求  {"id": 1, "text": "..."}
+    响应  {"id": 1, "result": "..."}
+    事件  {"event": "glossary_reload", "version": 3}
+
+双向监督：
+- 子进程退出或连续超时时，主进程按指数退避重启它，在途请求立即以错误返回，不会卡住翻译线程
+- 主进程退出时管道关闭，子进程读到 EOF 后自行退出，不会残留
+子进程的日志写到 stderr，由主进程逐行转发到 "TranslatorProcess" 日志记录器 (即 app.log)。
+"""
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import itertools
+import subprocess
+
+from metrics import registry
+from translator_service import ITranslator
+
+logger = logging.getLogger("TranslatorProcess")
+
+_process_restarts = registry.counter("translator_process_restarts_total", "Translator child process restarts")
+_process_timeouts = registry.counter("translator_process_timeouts_total", "Requests that timed out waiting for the translator process")
+_process_latency = registry.histogram("translator_process_roundtrip_seconds", "Request round trip through the translator process")
+
+
+class _Pending:
+    __slots__ = ("event", "result")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class ProcessTranslator(ITranslator):
+    """
+    ITranslator 的跨进程代理。translate() 可被多个线程同时调用，请求按 id 与响应配对。
+    """
+    def __init__(self, config: dict, on_glossary_reload=None):
+        self.config = config
+        proc_cfg = config.get("translator_process", {})
+        self.request_timeout = proc_cfg.get("request_timeout", 30.0)
+        self.max_consecutive_timeouts = proc_cfg.get("max_consecutive_timeouts", 2)
+        self.max_backoff = proc_cfg.get("max_restart_backoff", 30.0)
+        self.on_glossary_reload = on_glossary_reload
+
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._lock = threading.Lock()        # 保护 _pending / _proc
+        self._write_lock = threading.Lock()  # 保证每条请求整行写入
+        self._proc = None
+        self._ready = threading.Event()
+        self._stopped = False
+        self._consecutive_timeouts = 0
+        self._backoff = 1.0
+        self.restarts = 0
+
+        registry.gauge("translator_process_inflight", "Requests waiting for the translator process",
+                       func=lambda: len(self._pending))
+        registry.gauge("translator_process_up", "Whether the translator child process is running",
+                       func=lambda: 1 if self._proc is not None and self._proc.poll() is None else 0)
+        self._spawn()
+
+    # --- 进程管理 ---
+    def _spawn(self):
+        cmd = [sys.executable, "-u", os.path.abspath(__file__)]
+        kwargs = {}
+        if os.name == "nt":
+            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), **kwargs)
+        # 首行发送配置，子进程据此构建与主进程相同的翻译链
+        proc.stdin.write((json.dumps(self.config, ensure_ascii=False) + "\n").encode("utf-8"))
+        proc.stdin.flush()
+        with self._lock:
+            self._proc = proc
+        threading.Thread(target=self._read_results, args=(proc,), name="TranslatorProcessReader", daemon=True).start()
+        threading.Thread(target=self._forward_logs, args=(proc,), name="TranslatorProcessLog", daemon=True).start()
+        self._ready.set()
+        logger.info(f"Translator process started (pid {proc.pid})")
+
+    def _restart(self, proc, reason):
+        """在读线程或超时的翻译线程中调用；同一个子进程只重启一次"""
+        with self._lock:
+            if self._stopped or proc is not self._proc:
+                return
+            self._proc = None
+            self._ready.clear()
+            failed = list(self._pending.values())
+            self._pending.clear()
+        for pending in failed:
+            pending.result = f"[Err: translator process {reason}]"
+            pending.event.set()
+        try:
+            proc.kill()
+        except Exception:
+            pass
+        logger.warning(f"Translator process {reason}, restarting in {self._backoff:.0f}s "
+                       f"({len(failed)} in-flight requests failed)")
+        threading.Thread(target=self._respawn_later, args=(self._backoff,), daemon=True).start()
+        self._backoff = min(self.max_backoff, self._backoff * 2)
+
+    def _respawn_later(self, delay):
+        time.sleep(delay)
+        if self._stopped:
+            return
+        try:
+            self._spawn()
+            _process_restarts.inc()
+            self.restarts += 1
+        except Exception as e:
+            logger.error(f"Failed to restart translator process: {e}")
+            self._respawn_later(min(self.max_backoff, delay * 2))
+
+    def _read_results(self, proc):
+        for raw in proc.stdout:
+            try:
+                msg = json.loads(raw)
+            except ValueError:
+                logger.warning(f"Malformed line from translator process: {raw[:80]!r}")
+                continue
+            if "event" in msg:
+                self._handle_event(msg)
+                continue
+            with self._lock:
+                pending = self._pending.pop(msg.get("id"), None)
+            if pending is not None:
+                pending.result = msg.get("result", "")
+                pending.event.set()
+            # 收到任意响应说明子进程健康，退避时间复位
+            self._backoff = 1.0
+        code = proc.wait()
+        self._restart(proc, f"exited (code {code})")
+
+    def _handle_event(self, msg):
+        if msg["event"] == "glossary_reload" and self.on_glossary_reload:
+            try:
+                self.on_glossary_reload(msg.get("version"))
+            except Exception as e:
+                logger.error(f"Glossary reload callback failed: {e}")
+
+    def _forward_logs(self, proc):
+        for raw in proc.stderr:
+            line = raw.decode("utf-8", errors="replace").rstrip()
+            if line:
+                logger.info(f"[child] {line}")
+
+    # --- ITranslator ---
+    def translate(self, text: str) -> str:
+        if not text or not text.strip():
+            return ""
+        if not self._ready.wait(self.request_timeout):
+            return "[Err: translator process unavailable]"
+
+        request_id = next(self._ids)
+        pending = _Pending()
+        with self._lock:
+            proc = self._proc
+            if proc is None:
+                return "[Err: translator process unavailable]"
+            self._pending[request_id] = pending
+
+        start = time.perf_counter()
+        try:
+            line = json.dumps({"id": request_id, "text": text}, ensure_ascii=False) + "\n"
+            with self._write_lock:
+                proc.stdin.write(line.encode("utf-8"))
+                proc.stdin.flush()
+        except (OSError, ValueError) as e:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            self._restart(proc, f"pipe broken ({e})")
+            return "[Err: translator process unavailable]"
+
+        if not pending.event.wait(self.request_timeout):
+            with self._lock:
+                self._pending.pop(request_id, None)
+            _process_timeouts.inc()
+            self._consecutive_timeouts += 1
+            logger.warning(f"Translator process request timed out after {self.request_timeout}s")
+            if self._consecutive_timeouts >= self.max_consecutive_timeouts:
+                self._consecutive_timeouts = 0
+                self._restart(proc, "not responding")
+            return "[Err: translation timeout]"
+
+        self._consecutive_timeouts = 0
+        _process_latency.observe(time.perf_counter() - start)
+        return pending.result
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+            proc, self._proc = self._proc, None
+        if proc is not None:
+            try:
+                proc.stdin.close()  # 子进程读到 EOF 后自行退出
+                proc.wait(timeout=2)
+            except Exception:
+                proc.kill()
+
+
+def _child_main():
+    """子进程入口：stdin 首行为配置，之后每行一个请求；stdout 只用于协议输出"""
+    from concurrent.futures import ThreadPoolExecutor
+    from translator_service import create_translator
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(name)s - %(levelname)s - %(message)s")
+    stdin = sys.stdin.buffer
+    out = sys.stdout.buffer
+    out_lock = threading.Lock()
+    # 第三方库误用 print 不能污染协议通道
+    sys.stdout = sys.stderr
+
+    def send(msg):
+        data = (json.dumps(msg, ensure_ascii=False) + "\n").encode("utf-8")
+        with out_lock:
+            out.write(data)
+            out.flush()
+
+    config = json.loads(stdin.readline())
+    translator = create_translator(config, on_glossary_reload=lambda v: send({"event": "glossary_reload", "version": v}))
+    workers = config.get("translator_process", {}).get("workers", 2)
+    logging.getLogger("TranslatorProcess").info(f"Translator process ready (pid {os.getpid()}, {workers} workers)")
+
+    def handle(request_id, text):
+        try:
+            result = translator.translate(text)
+        except Exception as e:
+            result = f"[Err: {str(e)[:37]}]"
+        send({"id": request_id, "result": result})
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if config.get("translation", {}).get("warmup", True):
+            # 与等待首个请求并行：提前建立到翻译后端的连接
+            from translator_service import warmup
+            pool.submit(warmup)
+        for raw in stdin:
+            try:
+                msg = json.loads(raw)
+            except ValueError:
+                continue
+            pool.submit(handle, msg["id"], msg["text"])
+    # stdin 关闭 = 主进程已退出或要求停止
+
+
+if __name__ == "__main__":
+    _child_main()
@@ -1,15 +1,29 @@
 import os
+import time
 import logging
 import random
+import threading
 import requests
 from requests.adapters import HTTPAdapter
 from abc import ABC, abstractmethod
 from deep_translator import GoogleTranslator
 from functools import lru_cache
+from metrics import registry
+import lang_id
 
 # 获取日志记录器
 logger = logging.getLogger("Translator")
 
+# [新增] 运行时指标
+_session_retries = registry.counter("smartsession_retries_total", "Failed HTTP attempts retried by SmartSession")
+_session_refreshes = registry.counter("smartsession_refreshes_total", "Session resets triggered after consecutive failures")
+_translate_requests = registry.counter("translation_requests_total", "Translation calls that reached the backend (cache misses)")
+_translate_errors = registry.counter("translation_errors_total", "Translation calls that failed")
+_translate_skips = {
+    reason: registry.counter("translation_skipped_total", "Texts returned as-is without a network request", reason=reason)
+    for reason in ("target_lang", "untranslatable")
+}
+
 # --- [智能网络层] SmartSession 实现 ---
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -65,11 +79,13 @@ class SmartSession:
                 return self.session.request(method, url, **kwargs)
             except Exception as e:
                 last_error = e
+                _session_retries.inc()
                 logger.warning(f"Connection error (Attempt {attempt}/{max_retries}): {e}")
         
         # 如果代码走到这里，说明连续 3 次都失败了
         # 触发备案：重置环境
         logger.warning("3 consecutive errors detected. Activating Backup Plan: Resetting Session...")
+        _session_refreshes.inc()
         self._refresh_session()
         
         # 备案后的“背水一战” (第 4 次尝试)
@@ -79,12 +95,35 @@ class SmartSession:
             # 如果还不行，那通过上层抛出异常
             raise e
 
-# 实例化全局智能会话
-_smart_session = SmartSession()
+# [修改] 全局智能会话改为首次使用时创建，导入本模块不再产生网络层初始化开销
+_smart_session = None
+_smart_session_lock = threading.Lock()
+
+def get_smart_session():
+    global _smart_session
+    if _smart_session is None:
+        with _smart_session_lock:
+            if _smart_session is None:
+                _smart_session = SmartSession()
+    return _smart_session
 
 # Monkey Patch: 动态替换 requests 的核心方法
-requests.get = lambda url, **kwargs: _smart_session.request('GET', url, **kwargs)
-requests.post = lambda url, **kwargs: _smart_session.request('POST', url, **kwargs)
+requests.get = lambda url, **kwargs: get_smart_session().request('GET', url, **kwargs)
+requests.post = lambda url, **kwargs: get_smart_session().request('POST', url, **kwargs)
+
+WARMUP_URL = "https://translate.google.com/m"
+
+def warmup(timeout=3.0):
+    """
+    [新增] 预先建立到翻译后端的连接 (DNS / TCP / TLS / 代理握手)，连接留在会话连接池中，
+    首个翻译请求不再承担这部分延迟。需在代理环境变量设置之后调用。
+    """
+    start = time.perf_counter()
+    try:
+        get_smart_session().session.head(WARMUP_URL, timeout=timeout)
+        logger.info(f"Translator connection warmed up in {(time.perf_counter() - start) * 1000:.0f}ms")
+    except Exception as e:
+        logger.warning(f"Translator warmup failed: {e}")
 # ----------------------------------------------
 
 class ITranslator(ABC):
@@ -95,6 +134,8 @@ class ITranslator(ABC):
     def translate(self, text: str) -> str:
         pass
 
+_proxy_env_set = set()  # 由 _setup_proxy 写入的代理环境变量
+
 class DeepTranslatorService(ITranslator):
     def __init__(self, config: dict):
         """
@@ -108,6 +149,10 @@ class DeepTranslatorService(ITranslator):
         trans_cfg = self.config.get("translation", {})
         source_lang = trans_cfg.get("source_lang", "en")
         target_lang = trans_cfg.get("target_lang", "zh-CN")
+        self.target_lang = target_lang
+        # [新增] 本地语种识别：已是目标语言或没有可翻译内容的文本不走网络
+        self.skip_same_language = trans_cfg.get("skip_same_language", True)
+        self.lang_id_min_confidence = trans_cfg.get("lang_id_min_confidence", 0.2)
         
         logger.info(f"Initializing Translator: {source_lang} -> {target_lang}")
         self.translator = GoogleTranslator(source=source_lang, target=target_lang)
@@ -118,6 +163,10 @@ class DeepTranslatorService(ITranslator):
         deep_translator 底层使用的 requests 库会自动读取这些环境变量。
         """
         proxy_cfg = self.config.get("proxy", {})
+        # [新增] 配置热更新关闭代理时，撤销此前由本服务写入的环境变量 (不动用户自己设置的)
+        for var in list(_proxy_env_set):
+            os.environ.pop(var, None)
+            _proxy_env_set.discard(var)
         if proxy_cfg.get("enabled"):
             http_proxy = proxy_cfg.get("http")
             https_proxy = proxy_cfg.get("https")
@@ -126,36 +175,78 @@ class DeepTranslatorService(ITranslator):
             # 优先使用显式配置的 HTTP/HTTPS 代理
             if http_proxy:
                 os.environ["HTTP_PROXY"] = http_proxy
+                _proxy_env_set.add("HTTP_PROXY")
                 logger.info(f"Set HTTP_PROXY to {http_proxy}")
             elif socks5_proxy:
                 # 如果没配置 HTTP 代理但有 SOCKS5，则将 SOCKS5 应用于 HTTP 协议
                 # requests 库支持 socks5:// 协议头 (需要 PySocks)
                 socks_url = f"socks5://{socks5_proxy}"
                 os.environ["HTTP_PROXY"] = socks_url
+                _proxy_env_set.add("HTTP_PROXY")
                 logger.info(f"Set HTTP_PROXY to {socks_url}")
 
             if https_proxy:
                 os.environ["HTTPS_PROXY"] = https_proxy
+                _proxy_env_set.add("HTTPS_PROXY")
                 logger.info(f"Set HTTPS_PROXY to {https_proxy}")
             elif socks5_proxy:
                 # 同上，应用于 HTTPS
                 socks_url = f"socks5://{socks5_proxy}"
                 os.environ["HTTPS_PROXY"] = socks_url
+                _proxy_env_set.add("HTTPS_PROXY")
                 logger.info(f"Set HTTPS_PROXY to {socks_url}")
 
     @lru_cache(maxsize=1000)
     def translate(self, text: str) -> str:
         if not text or not text.strip():
             return ""
+
+        if self.skip_same_language:
+            skip_reason = lang_id.skip_reason(text, self.target_lang, self.lang_id_min_confidence)
+            if skip_reason:
+                _translate_skips[skip_reason].inc()
+                logger.info(f"Skip translation ({skip_reason}): {text}")
+                return text
         
         try:
             # 执行翻译
+            _translate_requests.inc()
             result = self.translator.translate(text)
             return result
         except Exception as e:
+            _translate_errors.inc()
             logger.error(f"Translation failed: {e}", exc_info=True)
             # 提取错误信息，去除换行，并截断以适应 UI
             err_msg = str(e).replace("\n", " ").replace("\r", "")
             if len(err_msg) > 40:
                 err_msg = err_msg[:37] + "..."
             return f"[Err: {err_msg}]"
+
+def create_translator(config: dict, on_glossary_reload=None) -> ITranslator:
+    """
+    按配置组装翻译链：DeepTranslatorService (+ 共享缓存) (+ 术语表保护)。
+    主进程与独立翻译进程 (translator_process.py) 共用此函数，保证两种模式行为一致。
+    :param on_glossary_reload: 术语表热更新后的回调，参数为新版本号
+    """
+    translator = DeepTranslatorService(config)
+    cache_cfg = config.get("shared_cache", {})
+    if cache_cfg.get("enabled", False):
+        from shared_cache import SharedCacheTranslator
+        trans_cfg = config.get("translation", {})
+        namespace = cache_cfg.get("namespace") or f"{trans_cfg.get('source_lang', 'en')}:{trans_cfg.get('target_lang', 'zh-CN')}"
+        translator = SharedCacheTranslator(translator, cache_cfg, namespace)
+    glossary_cfg = config.get("glossary", {})
+    if glossary_cfg.get("enabled", False):
+        from glossary import GlossaryTranslator
+        translator = GlossaryTranslator(translator, glossary_cfg)
+        if on_glossary_reload:
+            translator.on_reload = lambda glossary: on_glossary_reload(glossary.version)
+    return translator
+
+# [新增] lru_cache 自带命中统计，抓取时回调读取，翻译热路径零额外开销
+registry.gauge("translation_cache_hits_total", "Translation LRU cache hits",
+               func=lambda: DeepTranslatorService.translate.cache_info().hits, kind="counter")
+registry.gauge("translation_cache_misses_total", "Translation LRU cache misses",
+               func=lambda: DeepTranslatorService.translate.cache_info().misses, kind="counter")
+registry.gauge("translation_cache_entries", "Translation LRU cache size",
+               func=lambda: DeepTranslatorService.translate.cache_info().currsize)
@@ -5,10 +5,18 @@ import json
 import os
 import sys
 import re
+import time
 from datetime import datetime
+from metrics import registry
 
 logger = logging.getLogger("OverlayWindow")
 
+# [新增] 运行时指标
+_frames_rendered = registry.counter("ui_frames_rendered_total", "Window geometry frames applied by the animation loop")
+_text_updates = registry.counter("ui_text_updates_total", "Subtitle label updates")
+_frame_delay = registry.histogram("ui_frame_delay_seconds", "Animation frame lateness beyond the 16ms schedule (GIL/main loop contention)",
+                                  buckets=(0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25))
+
 class OverlayWindow:
     def __init__(self, config: dict, on_close_callback=None):
         self.config = config
@@ -27,6 +35,7 @@ class OverlayWindow:
         self.target_height = 0
         self.current_height = 0
         self._animating = False
+        self._last_frame_time = None
         self._shrink_job = None 
         self._pending_shrink_height = None # [新增] 记录正在等待收缩的目标高度
         
@@ -75,53 +84,8 @@ class OverlayWindow:
         self.history_times = [] 
         self.history_row_frames = [] # [新增] 管理行容器的显隐
         
-        for i in range(hi_cfg.get("count", 2)):
-            # 行容器 Frame
-            row_frame = tk.Frame(self.frm_history, bg=bg_color, bd=0, highlightthickness=0)
-            # 初始不 pack，由 _update_history_view 动态控制
-            self.history_row_frames.append(row_frame)
-            
-            # 1. 左侧 Bullet Label
-            lbl_bullet = tk.Label(
-                row_frame,
-                text="", 
-                font=(font_family, hi_cfg.get("font_size", 16)),
-                fg=hi_cfg.get("color", "#BBBBBB"),
-                bg=bg_color,
-                anchor="n", 
-                bd=0, highlightthickness=0
-            )
-            lbl_bullet.pack(side=tk.LEFT, anchor="nw")
-            self.history_bullets.append(lbl_bullet)
-            
-            # 2. 右侧时间 Label
-            lbl_time = tk.Label(
-                row_frame,
-                text="",
-                font=(font_family, hi_cfg.get("time_font_size", 12)),
-                fg=hi_cfg.get("time_color", "#888888"),
-                bg=bg_color,
-                anchor="n",
-                bd=0, highlightthickness=0
-            )
-            lbl_time.pack(side=tk.RIGHT, anchor="ne", padx=(5, 0))
-            self.history_times.append(lbl_time)
-
-            # 3. 中间 Text Label
-            lbl_text = tk.Label(
-                row_frame,
-                text="",
-                font=(font_family, hi_cfg.get("font_size", 16)),
-                fg=hi_cfg.get("color", "#BBBBBB"),
-                bg=bg_color,
-                wraplength=ui_cfg.get("width", 800) - 120, 
-                justify=tk.LEFT,
-                anchor="w", 
-                bd=0, highlightthickness=0
-            )
-            lbl_text.pack(side=tk.LEFT, fill=tk.X, expand=True, anchor="w")
-            
-            self.history_rows.append(lbl_text)
+        for _ in range(hi_cfg.get("count", 2)):
+            self._create_history_row(ui_cfg)
 
         # --- 2. 控制栏 (Layer: Bottom 2) ---
         self.frm_control = tk.Frame(self.root, bg=bg_color)
@@ -197,6 +161,58 @@ class OverlayWindow:
         self.btn_close.bind("<Button-1>", lambda e: self.quit())
         self.btn_close.lift()
 
+    def _create_history_row(self, ui_cfg):
+        """创建一行历史记录 (Bullet + 文本 + 时间)，初始不 pack"""
+        bg_color = ui_cfg.get("bg_color", "#000000")
+        font_family = ui_cfg.get("font_family", "Arial")
+        hi_cfg = ui_cfg.get("history", {"font_size": 16, "color": "#BBBBBB", "count": 2})
+        # 行容器 Frame
+        row_frame = tk.Frame(self.frm_history, bg=bg_color, bd=0, highlightthickness=0)
+        # 初始不 pack，由 _update_history_view 动态控制
+        self.history_row_frames.append(row_frame)
+
+        # 1. 左侧 Bullet Label
+        lbl_bullet = tk.Label(
+            row_frame,
+            text="", 
+            font=(font_family, hi_cfg.get("font_size", 16)),
+            fg=hi_cfg.get("color", "#BBBBBB"),
+            bg=bg_color,
+            anchor="n", 
+            bd=0, highlightthickness=0
+        )
+        lbl_bullet.pack(side=tk.LEFT, anchor="nw")
+        self.history_bullets.append(lbl_bullet)
+
+        # 2. 右侧时间 Label
+        lbl_time = tk.Label(
+            row_frame,
+            text="",
+            font=(font_family, hi_cfg.get("time_font_size", 12)),
+            fg=hi_cfg.get("time_color", "#888888"),
+            bg=bg_color,
+            anchor="n",
+            bd=0, highlightthickness=0
+        )
+        lbl_time.pack(side=tk.RIGHT, anchor="ne", padx=(5, 0))
+        self.history_times.append(lbl_time)
+
+        # 3. 中间 Text Label
+        lbl_text = tk.Label(
+            row_frame,
+            text="",
+            font=(font_family, hi_cfg.get("font_size", 16)),
+            fg=hi_cfg.get("color", "#BBBBBB"),
+            bg=bg_color,
+            wraplength=ui_cfg.get("width", 800) - 120, 
+            justify=tk.LEFT,
+            anchor="w", 
+            bd=0, highlightthickness=0
+        )
+        lbl_text.pack(side=tk.LEFT, fill=tk.X, expand=True, anchor="w")
+
+        self.history_rows.append(lbl_text)
+
     def _setup_drag_events(self):
         def on_start_move(event):
             if self._is_closing: return 
@@ -232,9 +248,77 @@ class OverlayWindow:
                 bind_recursive(child)
 
         bind_recursive(self.root)
+        self._bind_drag = bind_recursive  # 配置热更新新增的历史行同样可拖动
+
+    def apply_config(self, config):
+        """
+        [新增] 配置热更新：就地修改字体、颜色、透明度、宽度与历史行数，不重建窗口 (须在 Tk 主线程调用)
+        """
+        if self._is_closing: return
+        old_ui_cfg = self.config.get("ui", {})
+        self.config = config
+        ui_cfg = config.get("ui", {})
+        bg_color = ui_cfg.get("bg_color", "#000000")
+        font_family = ui_cfg.get("font_family", "Arial")
+        width = ui_cfg.get("width", 800)
+        try:
+            self.root.configure(bg=bg_color)
+            self.root.attributes("-alpha", ui_cfg.get("bg_alpha", 0.6))
+            for widget in (self.frm_history, self.frm_control, self.frm_content, self.btn_toggle, self.btn_close):
+                widget.configure(bg=bg_color)
+
+            # 字体对象原地修改，引用它的标签自动重新布局
+            for lbl, font_obj, key, size, color in ((self.lbl_english, self.en_font, "english", 16, "#FF0000"),
+                                                    (self.lbl_chinese, self.zh_font, "chinese", 24, "#FFFFFF"),
+                                                    (self.lbl_source, self.src_font, "source", 14, "#00FF00")):
+                label_cfg = ui_cfg.get(key, {})
+                font_obj.configure(family=font_family, size=label_cfg.get("font_size", size))
+                lbl.configure(fg=label_cfg.get("color", color), bg=bg_color, wraplength=width - 20)
+
+            # 历史行数变化时增删行，多出的记录丢弃最旧的
+            hi_cfg = ui_cfg.get("history", {"font_size": 16, "color": "#BBBBBB", "count": 2})
+            count = hi_cfg.get("count", 2)
+            while len(self.history_rows) < count:
+                self._create_history_row(ui_cfg)
+                self._bind_drag(self.history_row_frames[-1])
+            while len(self.history_rows) > count:
+                self.history_rows.pop()
+                self.history_bullets.pop()
+                self.history_times.pop()
+                self.history_row_frames.pop().destroy()
+            if len(self.history) > count:
+                self.history = self.history[len(self.history) - count:]
+            text_font = (font_family, hi_cfg.get("font_size", 16))
+            for row_frame, bullet, time_lbl, lbl in zip(self.history_row_frames, self.history_bullets,
+                                                        self.history_times, self.history_rows):
+                row_frame.configure(bg=bg_color)
+                bullet.configure(font=text_font, fg=hi_cfg.get("color", "#BBBBBB"), bg=bg_color)
+                time_lbl.configure(font=(font_family, hi_cfg.get("time_font_size", 12)),
+                                   fg=hi_cfg.get("time_color", "#888888"), bg=bg_color)
+                lbl.configure(font=text_font, fg=hi_cfg.get("color", "#BBBBBB"), bg=bg_color, wraplength=width - 120)
+
+            geometry = f"{width}x{int(self.current_height)}"
+            x, y = ui_cfg.get("x", 100), ui_cfg.get("y", 100)
+            if (x, y) != (old_ui_cfg.get("x", 100), old_ui_cfg.get("y", 100)):
+                geometry += f"+{x}+{y}"  # 只有配置中的位置被修改时才移动，保留拖动后的位置
+            self.root.geometry(geometry)
+            self._update_history_view()
+            self.update_height(immediate=True)
+        except tk.TclError as e:
+            logger.error(f"Failed to apply UI config: {e}")
+
+    def add_hotkey(self, sequence, callback):
+        """
+        [新增] 绑定窗口快捷键 (Tk 事件序列，如 "<Control-Alt-p>")，需要悬浮窗持有键盘焦点
+        """
+        try:
+            self.root.bind_all(sequence, lambda e: callback())
+        except tk.TclError as e:
+            logger.error(f"Invalid hotkey {sequence!r}: {e}")
             
     def update_english(self, text):
         if self._is_closing: return
+        _text_updates.inc()
         try:
             self.lbl_english.config(text=text)
             self.update_height()
@@ -242,6 +326,7 @@ class OverlayWindow:
 
     def update_chinese(self, text):
         if self._is_closing: return
+        _text_updates.inc()
         try:
             self.lbl_chinese.config(text=text)
             self.update_height()
@@ -249,6 +334,7 @@ class OverlayWindow:
 
     def update_translation(self, zh_text, en_text, is_final=False):
         if self._is_closing: return
+        _text_updates.inc()
         try:
             # [重构] 实时同步历史记录逻辑：原地更新或追加
             if zh_text and not zh_text.startswith("[Err"):
@@ -446,6 +532,11 @@ class OverlayWindow:
         动画循环：以阻尼方式逼近目标高度
         """
         if self._is_closing: return
+        # [新增] 记录帧调度延迟：after(16) 实际间隔超出 16ms 的部分
+        now = time.perf_counter()
+        if self._animating and self._last_frame_time is not None:
+            _frame_delay.observe(max(0.0, now - self._last_frame_time - 0.016))
+        self._last_frame_time = now
         try:
             diff = self.target_height - self.current_height
             
@@ -490,6 +581,7 @@ class OverlayWindow:
             self._animating = False
 
     def _apply_geometry(self, height):
+        _frames_rendered.inc()
         w = self.root.winfo_width()
         x = self.root.winfo_x()
         y = self.root.winfo_y()